@@ -0,0 +1,119 @@
+"""
+Benchmark of the memory allocated per call for large XML request and response bodies.
+
+Compares Client, which sends request bodies as built and parses responses from the raw bytes, with the previous
+behaviour of decoding both to str (and having http.client encode the request again). Measured with tracemalloc as the
+peak memory allocated during a call, against a local server running in a separate process that echoes request
+bodies back.
+
+    python -m benchmarks.body_allocations
+"""
+import subprocess
+import sys
+import tracemalloc
+
+from bluesnap.client import Client
+from bluesnap.xmlparser import LxmlXMLParser
+
+from .xml_parsing import CREDIT_CARD_INFO, ORDER
+
+
+SERVER = '''
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['content-length']))
+        self.send_response(200)
+        self.send_header('content-type', 'application/xml')
+        self.send_header('content-length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+print(server.server_address[1], flush=True)
+server.serve_forever()
+'''
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+def large_shopper(cards=200):
+    return ('<shopper xmlns="http://ws.plimus.com"><shopper-info><payment-info><credit-cards-info>' +
+            ''.join(CREDIT_CARD_INFO.format(last_four='%04d' % i) for i in range(cards)) +
+            '</credit-cards-info></payment-info></shopper-info></shopper>').encode('utf-8')
+
+
+def large_order(invoices=100):
+    head, _, tail = ORDER.partition(b'<invoices>')
+    invoice, _, tail = tail.partition(b'</invoices>')
+    return head + b'<invoices>' + invoice * invoices + b'</invoices>' + tail
+
+
+class DecodingXMLParser(LxmlXMLParser):
+    def parse(self, content):
+        return super(DecodingXMLParser, self).parse(content.decode('utf-8'))
+
+
+class DecodingClient(Client):
+    """
+    Previous behaviour: request and response bodies decoded to str
+    """
+
+    def __init__(self, **kwargs):
+        super(DecodingClient, self).__init__(xml_parser=DecodingXMLParser(), **kwargs)
+
+    def _prepare_request(self, method, path, data=None):
+        request, useJsonApi = super(DecodingClient, self)._prepare_request(method, path, data)
+        request.prepare_body(data.decode('utf-8'), None)
+        return request, useJsonApi
+
+
+def peak_allocated(client, payload, calls):
+    # Warm up the connection pool and caches
+    client.request('POST', '/services/2/shoppers', payload)
+
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            client.request('POST', '/services/2/shoppers', payload)
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return min(peaks)
+
+
+def main(calls=20):
+    server = subprocess.Popen([sys.executable, '-c', SERVER], stdout=subprocess.PIPE)
+    try:
+        endpoint_url = 'http://127.0.0.1:%d' % int(server.stdout.readline())
+
+        for name, payload in (('shopper', large_shopper()), ('order', large_order())):
+            for client_class in (DecodingClient, Client):
+                client = client_class(env='live', **DUMMY_CREDENTIALS)
+                client.ENDPOINTS = {'live': endpoint_url}
+                with client:
+                    peak = peak_allocated(client, payload, calls)
+                print('{:8} {:15} payload {:6.0f} KiB  peak allocated per call {:7.0f} KiB ({:.1f}x payload)'.format(
+                    name, client_class.__name__, len(payload) / 1024, peak / 1024, peak / len(payload)))
+    finally:
+        server.kill()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
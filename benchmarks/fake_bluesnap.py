@@ -0,0 +1,52 @@
+"""
+Benchmark of an integration against the in-process fake BlueSnap.
+
+Runs a checkout (payment-fields token, vaulted shopper, auth, capture and retrieval of the transaction) through a
+Client whose transport is bluesnap.fake.FakeBlueSnap, so that only the client and the fake use the CPU: the figures are
+the cost of the client stack per call, without any network.
+
+    python -m benchmarks.fake_bluesnap
+"""
+import timeit
+
+from bluesnap.client import Client
+from bluesnap.fake import FakeBlueSnap
+from bluesnap.resources import CreditCardInfo, PaymentFieldsTokenResource, TransactionResource, VaultedShopperInfo, \
+    VaultedShopperResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+CALLS_PER_CHECKOUT = 5
+
+
+def checkout(client):
+    token = PaymentFieldsTokenResource(client=client).create()
+    vaultedShopper = VaultedShopperResource(client=client).create(
+        VaultedShopperInfo(firstName='Jane', lastName='Doe'), [CreditCardInfo(pfToken=token)])
+
+    transactions = TransactionResource(client=client)
+    auth = transactions.auth(amount='10.00', currency='USD', vaultedShopperId=vaultedShopper['vaultedShopperId'])
+    transactions.capture(auth['transactionId'], amount='10.00')
+    return transactions.retrieve(auth['transactionId'])
+
+
+def main(number=500):
+    fake = FakeBlueSnap(username=DUMMY_CREDENTIALS['username'], password=DUMMY_CREDENTIALS['password'])
+    client = Client(env='sandbox', transport=fake.transport(record=False), **DUMMY_CREDENTIALS)
+    assert checkout(client)['card-transaction-type'] == 'CAPTURE'
+
+    seconds = min(timeit.repeat(lambda: checkout(client), number=number, repeat=5))
+    print('{:10} {:8.1f} us/checkout  {:8.1f} us/call  {:8.0f} calls/s'.format(
+        'fake', seconds / number * 1e6, seconds / number / CALLS_PER_CHECKOUT * 1e6,
+        number * CALLS_PER_CHECKOUT / seconds))
+
+
+if __name__ == '__main__':
+    main()
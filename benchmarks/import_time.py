@@ -0,0 +1,72 @@
+"""
+Benchmark of the time it takes to import bluesnap.
+
+Runs a fresh interpreter with -X importtime for each way of using the package, and reports the total import time
+along with the slowest modules it loaded. Services using the JSON API only should not pay for lxml, xmltodict or
+requests, which are only imported on first use.
+
+    python -m benchmarks.import_time
+"""
+import os
+import subprocess
+import sys
+
+
+SCENARIOS = [
+    ('package', 'import bluesnap'),
+    ('json resources', 'from bluesnap.resources import TransactionResource'),
+    ('client', 'from bluesnap.client import Client'),
+    # What the lazy imports eventually load for XML calls through a blocking Client
+    ('xml and requests', 'from bluesnap.resources import ShopperResource; from lxml import etree; import requests'),
+]
+
+HEAVY_MODULES = ('lxml', 'xmltodict', 'requests', 'urllib3', 'asyncio', 'aiohttp')
+
+
+def import_times(statement, python=sys.executable):
+    """
+    :return: List of (module, depth, self microseconds, cumulative microseconds) in the order imports completed, depth
+        0 for modules imported by the statement itself (or at interpreter startup)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([python, '-X', 'importtime', '-c', statement], cwd=root, stderr=subprocess.PIPE,
+                            check=True, universal_newlines=True)
+
+    times = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        # One space after the separator, then two per level of nesting
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        times.append((module.strip(), depth, int(self_us), int(cumulative_us)))
+    return times
+
+
+def total_time(times, package='bluesnap'):
+    """
+    :return: Microseconds spent importing package and whatever the statement imported after it
+    """
+    total = 0
+    started = False
+    for module, depth, _, cumulative_us in times:
+        started = started or module.split('.')[0] == package
+        if started and depth == 0:
+            total += cumulative_us
+    return total
+
+
+def main(repeat=5, top=8):
+    for name, statement in SCENARIOS:
+        runs = [import_times(statement) for _ in range(repeat)]
+        times = min(runs, key=total_time)
+        heavy = sorted({module.split('.')[0] for module, _, _, _ in times} & set(HEAVY_MODULES))
+
+        print('{:17} {:8.1f} ms  heavy modules: {}'.format(
+            name, total_time(times) / 1000, ', '.join(heavy) or 'none'))
+        for module, _, self_us, cumulative_us in sorted(times, key=lambda t: -t[2])[:top]:
+            print('    {:40} {:8.1f} ms self {:8.1f} ms cumulative'.format(module, self_us / 1000, cumulative_us / 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark of the per-call overhead of preparing requests.
+
+Compares Client, which prepares requests from a prelude computed once per client (URL prefix, Authorization header
+and headers), with the previous behaviour of having requests.Request.prepare() parse the URL and a new HTTPBasicAuth
+encode the credentials for every call. Also compares the cached default user agent of WebInfo with computing it for
+every order.
+
+    python -m benchmarks.request_prelude
+"""
+import timeit
+
+import requests
+
+from bluesnap import client as client_module
+from bluesnap.client import Client
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class UncachedPreludeClient(Client):
+    """
+    Previous behaviour: everything prepared by requests for every call
+    """
+
+    def _prepare_request(self, method, path, data=None):
+        useJsonApi = False
+        body = None
+        if type(data) == dict:
+            body = self.json_codec.dumps(data)
+            useJsonApi = True
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            body = data
+
+        headers = {
+            'content-type': 'application/xml' if not useJsonApi else 'application/json',
+            'accept': 'application/xml' if not useJsonApi else 'application/json',
+        }
+        if not self.keep_alive:
+            headers['connection'] = 'close'
+
+        req = requests.Request(method, self.endpoint_url + path, headers, data=body, auth=self.http_basic_auth)
+        return req.prepare(), useJsonApi
+
+
+CALLS = [
+    ('GET', '/services/2/vaulted-shoppers/19575974', None),
+    ('POST', '/services/2/orders', b'<order xmlns="http://ws.plimus.com"><ordering-shopper/></order>'),
+    ('POST', '/services/2/transactions', {'amount': '10.00', 'currency': 'USD', 'vaultedShopperId': 19575974}),
+]
+
+
+def main(number=20000):
+    clients = [('requests', UncachedPreludeClient(env='live', **DUMMY_CREDENTIALS)),
+               ('prelude', Client(env='live', **DUMMY_CREDENTIALS))]
+
+    for method, path, data in CALLS:
+        prepared = [client._prepare_request(method, path, data)[0] for _, client in clients]
+        assert len({(r.method, r.url, tuple(r.headers.items()), r.body) for r in prepared}) == 1
+
+        timings = {}
+        for name, client in clients:
+            timings[name] = min(timeit.repeat(lambda: client._prepare_request(method, path, data),
+                                              number=number, repeat=5))
+        for name, seconds in timings.items():
+            print('{:6} {:10} {:6.2f} us/call  {:5.2f}x'.format(
+                method, name, seconds / number * 1e6, timings['requests'] / seconds))
+
+    uncached = min(timeit.repeat(client_module.default_user_agent.__wrapped__, number=number, repeat=5))
+    cached = min(timeit.repeat(client_module.default_user_agent, number=number, repeat=5))
+    print('user agent {:10} {:6.2f} us/call'.format('uncached', uncached / number * 1e6))
+    print('user agent {:10} {:6.2f} us/call  {:5.2f}x'.format('cached', cached / number * 1e6, uncached / cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark of the per-call cost of the client transports.
+
+Retrieves a transaction from a local HTTP server through RequestsTransport and Urllib3Transport, over a kept-alive
+connection, and from InMemoryTransport, so that only the client-side work differs between the network transports.
+
+    python -m benchmarks.transports
+"""
+import threading
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bluesnap.client import Client
+from bluesnap.resources import TransactionResource
+from bluesnap.transport import InMemoryTransport, RequestsTransport, Urllib3Transport
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+BODY = b'<card-transaction><transaction-id>1</transaction-id><amount>10.00</amount></card-transaction>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, don't let them wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('content-type', 'application/xml')
+        self.send_header('content-length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main(number=500):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    transports = [
+        ('requests', RequestsTransport()),
+        ('urllib3', Urllib3Transport()),
+        ('in-memory', InMemoryTransport(lambda request: (200, {'content-type': 'application/xml'}, BODY))),
+    ]
+
+    timings = {}
+    for name, transport in transports:
+        client = Client(env='live', transport=transport, **DUMMY_CREDENTIALS)
+        client.ENDPOINTS = {'live': 'http://127.0.0.1:%d' % server.server_address[1]}
+        resource = TransactionResource(client=client)
+        assert resource.retrieve('1') == {'transaction-id': '1', 'amount': '10.00'}
+
+        timings[name] = min(timeit.repeat(lambda: resource.retrieve('1'), number=number, repeat=5))
+        client.close()
+
+    for name, seconds in timings.items():
+        print('{:10} {:8.1f} us/call  {:5.2f}x'.format(name, seconds / number * 1e6, timings['requests'] / seconds))
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark of building shopper and order request documents.
+
+Compares the XML builders using the client's cached tag factories with looking every factory up on the ElementMaker
+and building every element through it, as getattr(E, 'tag-name')(...) did, and serializing orders from their byte
+template with building and serializing their tree.
+
+    python -m benchmarks.xml_building
+"""
+import timeit
+
+from lxml import etree
+
+from bluesnap import models
+from bluesnap.client import Client
+from bluesnap.resources import OrderResource, ShopperResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class UncachedTagFactories(object):
+    """
+    Previous behaviour: a new factory for every element
+    """
+
+    def __init__(self, element_maker):
+        self.element_maker = element_maker
+
+    def __getitem__(self, tag):
+        return getattr(self.element_maker, tag)
+
+
+class BuildingOrderResource(OrderResource):
+    """
+    Builds the request body without sending it
+    """
+
+    def _call(self, method, path, data=None, result=None, deadline=None):
+        return data
+
+
+def build_shopper(client):
+    contact_info = models.ContactInfo(email='jane.doe@example.com', first_name='Jane', last_name='Doe',
+                                      address_1='1 Main Street', city='London', zip_='SW1A 1AA', country='gb',
+                                      phone='+44 20 7946 0000', client=client)
+    credit_card = models.PlainCreditCard('VISA', 12, 2030, '4111111111111111', '123', client=client)
+    element = ShopperResource(client=client)._create_shopper_element(
+        contact_info, credit_card, seller_shopper_id='42', client_ip='62.219.121.253')
+    return etree.tostring(element)
+
+
+def build_order(client):
+    credit_card = models.CreditCardSelection('VISA', '1111', client=client)
+    return BuildingOrderResource(client=client).create(
+        19575974, 2152762, 1250, credit_card=credit_card, description='Example order', client_ip='62.219.121.253')
+
+
+def build_order_tree(client):
+    resource = BuildingOrderResource(client=client)
+    resource.use_template = False
+    credit_card = models.CreditCardSelection('VISA', '1111', client=client)
+    return resource.create(
+        19575974, 2152762, 1250, credit_card=credit_card, description='Example order', client_ip='62.219.121.253')
+
+
+def main(number=5000):
+    clients = []
+    for name, tags_class in (('getattr', UncachedTagFactories), ('cached', None)):
+        client = Client(env='live', **DUMMY_CREDENTIALS)
+        if tags_class is not None:
+            client.tags = tags_class(client.E)
+        clients.append((name, client))
+
+    for document, build in (('shopper', build_shopper), ('order', build_order_tree)):
+        assert len({build(client) for _, client in clients}) == 1
+
+        timings = {}
+        for name, client in clients:
+            timings[name] = min(timeit.repeat(lambda: build(client), number=number, repeat=5))
+
+        for name, seconds in timings.items():
+            print('{:8} {:8} {:8.1f} us/document  {:5.2f}x'.format(
+                document, name, seconds / number * 1e6, timings['getattr'] / seconds))
+
+    client = clients[-1][1]
+    assert build_order(client) == build_order_tree(client)
+    tree = min(timeit.repeat(lambda: build_order_tree(client), number=number, repeat=5))
+    template = min(timeit.repeat(lambda: build_order(client), number=number, repeat=5))
+    print('{:8} {:8} {:8.1f} us/document  {:5.2f}x'.format('order', 'template', template / number * 1e6,
+                                                           tree / template))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmark of the XML response parsers on shopper and order payloads shaped like BlueSnap's.
+
+    python -m benchmarks.xml_parsing
+"""
+import timeit
+
+from bluesnap.xmlparser import LxmlXMLParser, XmltodictXMLParser
+
+
+CREDIT_CARD_INFO = '''
+            <credit-card-info>
+                <billing-contact-info>
+                    <first-name>Jane</first-name>
+                    <last-name>Doe</last-name>
+                    <address1>1 Main Street</address1>
+                    <city>London</city>
+                    <zip>SW1A 1AA</zip>
+                    <country>gb</country>
+                </billing-contact-info>
+                <credit-card>
+                    <card-last-four-digits>{last_four}</card-last-four-digits>
+                    <card-type>VISA</card-type>
+                    <card-sub-type>CREDIT</card-sub-type>
+                    <expiration-month>12</expiration-month>
+                    <expiration-year>2030</expiration-year>
+                </credit-card>
+                <processing-info>
+                    <cvv-response-code>ND</cvv-response-code>
+                    <avs-response-code-zip>U</avs-response-code-zip>
+                    <avs-response-code-address>U</avs-response-code-address>
+                    <avs-response-code-name>U</avs-response-code-name>
+                </processing-info>
+            </credit-card-info>'''
+
+SHOPPER = ('''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<shopper xmlns="http://ws.plimus.com">
+    <shopper-info>
+        <shopper-id>19575974</shopper-id>
+        <seller-shopper-id>42</seller-shopper-id>
+        <shopper-contact-info>
+            <title>Ms</title>
+            <first-name>Jane</first-name>
+            <last-name>Doe</last-name>
+            <email>jane.doe@example.com</email>
+            <company-name>Example Ltd</company-name>
+            <address1>1 Main Street</address1>
+            <address2>Flat 2</address2>
+            <city>London</city>
+            <zip>SW1A 1AA</zip>
+            <country>gb</country>
+            <phone>+44 20 7946 0000</phone>
+        </shopper-contact-info>
+        <store-id>12345</store-id>
+        <vat-code/>
+        <shopper-currency>GBP</shopper-currency>
+        <locale>en</locale>
+        <payment-info>
+            <credit-cards-info>''' + ''.join(CREDIT_CARD_INFO.format(last_four=last_four)
+                                             for last_four in ('1111', '4242', '0005')) + '''
+            </credit-cards-info>
+        </payment-info>
+    </shopper-info>
+</shopper>''').encode('utf-8')
+
+ORDER = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<order xmlns="http://ws.plimus.com">
+    <order-id>10891591</order-id>
+    <ordering-shopper>
+        <shopper-id>19575974</shopper-id>
+        <web-info>
+            <ip>62.219.121.253</ip>
+            <remote-host>www.example.com</remote-host>
+            <user-agent>mayple/bluesnap</user-agent>
+            <accept-language>en-us</accept-language>
+        </web-info>
+    </ordering-shopper>
+    <cart>
+        <charged-currency>GBP</charged-currency>
+        <cart-item>
+            <sku>
+                <sku-id>2152762</sku-id>
+                <sku-charge-price>
+                    <charge-type>initial</charge-type>
+                    <amount>12.50</amount>
+                    <currency>GBP</currency>
+                </sku-charge-price>
+            </sku>
+            <quantity>1</quantity>
+            <url>https://example.com/sku</url>
+            <item-sub-total>12.50</item-sub-total>
+        </cart-item>
+        <tax>0.00</tax>
+        <tax-rate>0</tax-rate>
+        <total-cart-cost>12.50</total-cart-cost>
+    </cart>
+    <expected-total-price>
+        <amount>12.50</amount>
+        <currency>GBP</currency>
+    </expected-total-price>
+    <post-sale-info>
+        <invoices>
+            <invoice>
+                <invoice-id>38502913</invoice-id>
+                <url>https://sandbox.bluesnap.com/jsp/order_locator_info.jsp?invoiceId=38502913</url>
+                <financial-transactions>
+                    <financial-transaction>
+                        <status>Approved</status>
+                        <date-due>01/01/30</date-due>
+                        <date-created>01/01/30</date-created>
+                        <amount>12.50</amount>
+                        <currency>GBP</currency>
+                        <soft-descriptor>BLS*Example</soft-descriptor>
+                        <payment-method>Visa</payment-method>
+                        <target-balance>PLIMUS_ACCOUNT</target-balance>
+                        <credit-card>
+                            <card-last-four-digits>1111</card-last-four-digits>
+                            <card-type>VISA</card-type>
+                        </credit-card>
+                        <paypal-transaction-data/>
+                        <skus>
+                            <sku>
+                                <sku-id>2152762</sku-id>
+                            </sku>
+                        </skus>
+                    </financial-transaction>
+                </financial-transactions>
+            </invoice>
+        </invoices>
+    </post-sale-info>
+    <fraud-info>
+        <fraud-session-id>1234567890</fraud-session-id>
+    </fraud-info>
+</order>'''.encode('utf-8')
+
+
+def main(number=2000):
+    parsers = [('xmltodict', XmltodictXMLParser()), ('lxml', LxmlXMLParser())]
+
+    for name, payload in (('shopper', SHOPPER), ('order', ORDER)):
+        expected = parsers[0][1].parse(payload)
+        timings = {}
+        for parser_name, parser in parsers:
+            assert parser.parse(payload) == expected, parser_name
+            timings[parser_name] = min(timeit.repeat(lambda: parser.parse(payload), number=number, repeat=5))
+
+        for parser_name, seconds in timings.items():
+            print('{:8} {:10} {:8.1f} us/parse  {:5.2f}x'.format(
+                name, parser_name, seconds / number * 1e6, timings['xmltodict'] / seconds))
+
+
+if __name__ == '__main__':
+    main()
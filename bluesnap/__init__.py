@@ -1,3 +1,26 @@
-__all__ = ['constants', 'client', 'exceptions', 'models', 'resources', 'version']
+import sys
 
-from . import constants, client, exceptions, models, resources, version
+__all__ = ['aio', 'breaker', 'bulk', 'cache', 'constants', 'client', 'deadline', 'exceptions', 'fake', 'fakeserver',
+           'hedge', 'jsoncodec', 'logqueue', 'models', 'ratelimit', 'redaction', 'resources', 'retry', 'singleflight',
+           'tokenpool', 'transport', 'version', 'xmlparser', 'xmltemplate']
+
+
+def __getattr__(name):
+    # Submodules are imported on first access, e.g. bluesnap.resources, so that importing the package only loads what
+    # is used
+    if name in __all__:
+        import importlib
+
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):
+    # Module __getattr__ (PEP 562) is ignored before Python 3.7: the submodules which load no heavy dependency are
+    # imported with the package instead. The others (aio, bulk, fake, fakeserver, retry) must be imported explicitly.
+    from . import breaker, cache, constants, client, deadline, exceptions, hedge, jsoncodec, logqueue, models, \
+        ratelimit, redaction, resources, singleflight, tokenpool, transport, version, xmlparser, xmltemplate  # noqa
@@ -0,0 +1,405 @@
+"""
+asyncio support.
+
+AsyncClient shares request preparation, response parsing and error mapping with the blocking Client, and the
+Async*Resource classes are awaitable variants of the resources in bluesnap.resources, using the exact same payload
+builders. Requires aiohttp (pip install bluesnap[async]).
+"""
+import asyncio
+import datetime
+import time
+
+from . import resources
+from .client import BaseClient
+from .deadline import Deadline
+from .exceptions import ImproperlyConfigured
+from .singleflight import AsyncSingleFlight
+from .transport import Request, Response
+
+
+class AsyncClient(BaseClient):
+    def __init__(self,
+                 # Environment
+                 env,
+                 # Authentication
+                 username, password,
+                 # Default store Id
+                 default_store_id,
+                 # Seller id
+                 seller_id,
+                 # Default currency
+                 default_currency,
+                 # Locale
+                 locale='en',
+                 # Logger
+                 logger=None,
+                 # Connection pool
+                 pool_maxsize=100,
+                 keep_alive=True,
+                 # Rate limiting
+                 rate_limiter=None,
+                 # Retries
+                 retry_policy=None,
+                 # Circuit breakers
+                 circuit_breaker=None,
+                 # Timeouts, in seconds
+                 connect_timeout=10,
+                 read_timeout=60,
+                 # Hedged requests
+                 hedge_policy=None,
+                 # Coalescing of concurrent identical GETs
+                 coalesce_requests=False,
+                 # Shopper lookup cache
+                 shopper_cache=None,
+                 # XML response parser
+                 xml_parser=None,
+                 # JSON encoding and decoding
+                 json_codec=None,
+                 # Request and response logging
+                 log_body_limit=None,
+                 log_sample_rates=None,
+                 log_default_sample_rate=1.0,
+                 log_redactor=None,
+                 log_queue=None):
+        super(AsyncClient, self).__init__(
+            env=env,
+            username=username,
+            password=password,
+            default_store_id=default_store_id,
+            seller_id=seller_id,
+            default_currency=default_currency,
+            locale=locale,
+            logger=logger,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            hedge_policy=hedge_policy,
+            coalesce_requests=coalesce_requests,
+            shopper_cache=shopper_cache,
+            xml_parser=xml_parser,
+            json_codec=json_codec,
+            log_body_limit=log_body_limit,
+            log_sample_rates=log_sample_rates,
+            log_default_sample_rate=log_default_sample_rate,
+            log_redactor=log_redactor,
+            log_queue=log_queue)
+
+        self._session = None
+        self._requests_sent = 0
+
+        if coalesce_requests:
+            self.single_flight = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @property
+    def session(self):
+        """
+        Long-lived aiohttp session, created on first use. Must be accessed from within the running event loop.
+
+        :rtype: aiohttp.ClientSession
+        """
+        if self._session is None or self._session.closed:
+            self._session = self._create_session()
+        return self._session
+
+    def _new_request(self, method, url, headers, body):
+        """
+        :rtype: Request
+        """
+        return Request(method, url, headers, body)
+
+    def _create_session(self):
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImproperlyConfigured('AsyncClient requires aiohttp. Please install it with: '
+                                       'pip install bluesnap[async]')
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_maxsize,
+            force_close=not self.keep_alive)
+
+        # Like Client, never carry cookies from one call to the next
+        return aiohttp.ClientSession(
+            connector=connector,
+            cookie_jar=aiohttp.DummyCookieJar())
+
+    async def close(self):
+        """
+        Close all pooled connections. A new pool is created if the client is used again afterwards.
+        """
+        session, self._session = self._session, None
+
+        if session is not None:
+            await session.close()
+
+    def pool_stats(self):
+        """
+        Statistics about the connection pool of this client.
+
+        :return: dict with the number of requests sent and the pool size limit
+        """
+        return {
+            'requests': self._requests_sent,
+            'limit': self.pool_maxsize,
+        }
+
+    async def _send(self, request, path, deadline):
+        import aiohttp
+
+        # Calls failing fast neither wait for a rate limiter token nor spend one
+        breaker = self.circuit_breaker.get(request.method, path) if self.circuit_breaker else None
+        generation = breaker.before_call() if breaker else None
+
+        if self.rate_limiter:
+            try:
+                delay = await self.rate_limiter.acquire_async(path, max_wait=deadline.remaining())
+            except asyncio.CancelledError:
+                if breaker:
+                    breaker.release(generation)
+                raise
+            if delay is None:
+                if breaker:
+                    breaker.release(generation)
+                raise deadline.exceeded(reason='no rate limiter token available in time')
+
+        # Already encoded, aiohttp sends bytes-like bodies as is
+        requestBody = request.body
+
+        async def send():
+            started = time.monotonic()
+            timeout = aiohttp.ClientTimeout(
+                total=deadline.remaining(),
+                sock_connect=deadline.limit(self.connect_timeout),
+                sock_read=deadline.limit(self.read_timeout))
+            async with self.session.request(request.method, request.url, data=requestBody,
+                                            headers=dict(request.headers), timeout=timeout) as res:
+                content = await res.read()
+            self._requests_sent += 1
+            return Response(
+                url=request.url,
+                status_code=res.status,
+                reason=res.reason,
+                headers=res.headers,
+                content=content,
+                elapsed=datetime.timedelta(seconds=time.monotonic() - started))
+
+        started = time.monotonic()
+        try:
+            hedge_delay = self._hedge_delay(request, path, deadline)
+            if hedge_delay is None:
+                response = await send()
+            else:
+                response = await self._send_hedged(send, request, path, hedge_delay)
+        except asyncio.CancelledError:
+            if breaker:
+                breaker.release(generation)
+            raise
+        except Exception:
+            if breaker:
+                breaker.record(False, time.monotonic() - started, generation)
+            raise
+
+        if breaker:
+            breaker.record(response.status_code < 500, time.monotonic() - started, generation)
+
+        return response
+
+    async def _send_hedged(self, send, request, path, delay):
+        """
+        Await send(), and an identical hedge if no response arrived after delay seconds. The first response wins
+        and the other request is cancelled.
+        """
+        hedge_policy = self.hedge_policy
+
+        async def timed():
+            started = time.monotonic()
+            response = await send()
+            hedge_policy.record(request.method, path, time.monotonic() - started)
+            return response
+
+        primary = asyncio.ensure_future(timed())
+        hedge = None
+        pending = {primary}
+
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            # Hedges are extra load, only send one if the rate limiter has a token to spare right away
+            if not done and (not self.rate_limiter or
+                             await self.rate_limiter.acquire_async(path, max_wait=0) is not None):
+                hedge = asyncio.ensure_future(timed())
+                pending.add(hedge)
+                hedge_policy.hedge_fired(request.method, path)
+
+            error = None
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            hedge_policy.hedge_won(request.method, path)
+                        return task.result()
+                    error = error or task.exception()
+
+                if not pending:
+                    raise error
+
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def request(self, method, path, data=None, deadline=None):
+        """
+        API request method
+
+        :param method: HTTP method
+        :param path: URL path
+        :param data: XML data (bytes, bytearray or memoryview) or JSON data (dict)
+        :param deadline: Maximum number of seconds the call may take, including retries
+        :raises DeadlineExceededError: if the deadline passed before a response was received
+        :return: tuple of (Response, parsed body)
+        """
+        deadline = Deadline(deadline)
+
+        if self._coalesced(method, data):
+            return await self.single_flight.do(
+                (method, path), lambda: self._request(method, path, data, deadline), deadline)
+        return await self._request(method, path, data, deadline)
+
+    async def _request(self, method, path, data, deadline):
+        retry_policy = self.retry_policy
+        if retry_policy:
+            data = retry_policy.prepare_data(method, path, data)
+            idempotent = retry_policy.is_idempotent(method, data)
+
+        r, useJsonApi = self._prepare_request(method, path, data)
+
+        logged = self._log_sampled(path)
+        if logged:
+            self._log_request(r)
+
+        while True:
+            deadline.attempts += 1
+            attempt = deadline.attempts
+            started = time.monotonic()
+
+            try:
+                response = await self._send(r, path, deadline)
+            except Exception as e:
+                deadline.check(cause=e)
+
+                if not retry_policy:
+                    raise
+
+                retry_delay = retry_policy.retry_delay(attempt, idempotent, error=e)
+                if retry_delay is not None and not deadline.allows(retry_delay):
+                    retry_delay = None
+                self._log_attempt(r, attempt, time.monotonic() - started, repr(e), retry_delay)
+                if retry_delay is None:
+                    raise
+                await asyncio.sleep(retry_delay)
+                continue
+
+            if not retry_policy:
+                break
+
+            retry_delay = retry_policy.retry_delay(attempt, idempotent, response=response)
+            if retry_delay is not None and not deadline.allows(retry_delay):
+                retry_delay = None
+            self._log_attempt(r, attempt, time.monotonic() - started, response.status_code, retry_delay)
+            if retry_delay is None:
+                break
+
+            if response.status_code in self.THROTTLING_STATUS_CODES and self.rate_limiter:
+                self.rate_limiter.throttled(path, retry_delay)
+            await asyncio.sleep(retry_delay)
+
+        if logged:
+            self._log_response(response)
+
+        # Save request and response for further logging
+        self.last_response = response
+
+        self._handle_throttling(path, response)
+
+        body = self._process_response_body(response, useJsonApi)
+
+        return response, body
+
+
+__client__ = None
+
+
+def default():
+    """:rtype : AsyncClient"""
+    global __client__
+
+    if __client__ is None:
+        raise ImproperlyConfigured('BlueSnap async client not configured yet. Please call bluesnap.aio.configure().')
+
+    return __client__
+
+
+def configure(**config):
+    """:rtype : AsyncClient"""
+    global __client__
+
+    __client__ = AsyncClient(**config)
+
+    return __client__
+
+
+class AsyncResource(resources.Resource):
+    def __init__(self, client=None):
+        self.client = client or default()
+        """:type : AsyncClient"""
+
+    async def request(self, method, path, data=None, deadline=None):
+        response, body = await self.client.request(method, path, data, deadline=deadline)
+        return response, body
+
+    async def _call(self, method, path, data=None, result=None, deadline=None):
+        response, body = await self.request(method, path, data, deadline=deadline)
+        return result(response, body) if result else body
+
+    async def _cached(self, value):
+        return value
+
+
+class AsyncShopperResource(AsyncResource, resources.ShopperResource):
+    """
+    Awaitable variant of ShopperResource
+    """
+
+
+class AsyncOrderResource(AsyncResource, resources.OrderResource):
+    """
+    Awaitable variant of OrderResource
+    """
+
+
+class AsyncPaymentFieldsTokenResource(AsyncResource, resources.PaymentFieldsTokenResource):
+    """
+    Awaitable variant of PaymentFieldsTokenResource
+    """
+
+
+class AsyncVaultedShopperResource(AsyncResource, resources.VaultedShopperResource):
+    """
+    Awaitable variant of VaultedShopperResource
+    """
+
+
+class AsyncTransactionResource(AsyncResource, resources.TransactionResource):
+    """
+    Awaitable variant of TransactionResource
+    """
@@ -0,0 +1,220 @@
+"""
+Circuit breakers around BlueSnap endpoints.
+
+A CircuitBreaker tracks the outcome and latency of the last calls to one endpoint. When too many of them failed
+(connection errors, timeouts, 5xx responses) or were too slow, it opens and calls fail fast with CircuitOpenError
+instead of waiting on a degraded BlueSnap. After open_duration it lets a probe call through (half-open), and closes
+again if the probe succeeds.
+
+A CircuitBreakerRegistry holds one breaker per endpoint path and is what clients are configured with.
+"""
+import collections
+import threading
+import time
+
+from .exceptions import CircuitOpenError
+
+
+class CircuitBreaker(object):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self,
+                 name=None,
+                 failure_rate_threshold=0.5,
+                 slow_call_duration=None,
+                 slow_call_rate_threshold=0.5,
+                 window_size=20,
+                 minimum_calls=10,
+                 open_duration=30.0,
+                 half_open_max_calls=1,
+                 on_state_change=None,
+                 clock=time.monotonic):
+        """
+        :param name: Name reported in CircuitOpenError and state changes, usually the endpoint path
+        :param failure_rate_threshold: Open when at least this fraction of the window failed
+        :param slow_call_duration: Calls that take longer than this many seconds count as slow. None disables the
+            latency threshold.
+        :param slow_call_rate_threshold: Open when at least this fraction of the window was slow
+        :param window_size: Number of most recent calls the rates are computed over
+        :param minimum_calls: Do not open before this many calls were recorded
+        :param open_duration: Seconds to fail fast before letting a probe through
+        :param half_open_max_calls: Number of concurrent probe calls allowed while half-open
+        :param on_state_change: Called with (name, old_state, new_state) on every transition
+        """
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.window_size = window_size
+        self.minimum_calls = minimum_calls
+        self.open_duration = open_duration
+        self.half_open_max_calls = half_open_max_calls
+        self.on_state_change = on_state_change
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probes = 0
+        # Incremented on every transition, to tell the calls admitted in the current state from older ones
+        self._generation = 0
+        # (failed, slow) for each recorded call
+        self._window = collections.deque(maxlen=window_size)
+
+        self.times_opened = 0
+        self.rejected_calls = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.open_duration:
+            self._transition(self.HALF_OPEN)
+        return self._state
+
+    def _transition(self, state):
+        old_state, self._state = self._state, state
+        self._generation += 1
+
+        if state == self.OPEN:
+            self._opened_at = self._clock()
+            self.times_opened += 1
+        if state != self.HALF_OPEN:
+            self._probes = 0
+        if state == self.CLOSED:
+            self._window.clear()
+
+        if self.on_state_change:
+            self.on_state_change(self.name, old_state, state)
+
+    def before_call(self):
+        """
+        Reserve a call, to be followed by exactly one record() once it completes, or release() if abandoned.
+
+        :return: Generation of the breaker the call was admitted in, to pass to record() or release()
+        :raises CircuitOpenError: if the call must fail fast
+        """
+        with self._lock:
+            state = self._current_state()
+
+            if state == self.CLOSED:
+                return self._generation
+
+            if state == self.HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return self._generation
+
+            self.rejected_calls += 1
+            retry_in = 0.0
+            if state == self.OPEN:
+                retry_in = max(0.0, self.open_duration - (self._clock() - self._opened_at))
+
+        raise CircuitOpenError(self.name, retry_in=retry_in)
+
+    def record(self, success, duration, generation=None):
+        """
+        :param success: Whether BlueSnap answered properly (any status below 500)
+        :param duration: Duration of the call, in seconds
+        :param generation: What before_call() returned for the call. Outcomes of calls admitted before the last
+            transition are ignored, e.g. of a call that started while closed and completed while half-open, which is
+            not the probe. If None, the call is taken to have been admitted in the current state.
+        """
+        slow = self.slow_call_duration is not None and duration > self.slow_call_duration
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+
+            if self._state == self.HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._transition(self.CLOSED if success and not slow else self.OPEN)
+                return
+
+            if self._state == self.OPEN:
+                # A call that started before the breaker opened
+                return
+
+            self._window.append((not success, slow))
+
+            if len(self._window) >= self.minimum_calls and self._tripped():
+                self._transition(self.OPEN)
+
+    def release(self, generation=None):
+        """
+        Give back a call reserved by before_call() that was abandoned without an outcome, e.g. cancelled
+
+        :param generation: What before_call() returned for the call, as for record()
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN and generation in (None, self._generation):
+                self._probes = max(0, self._probes - 1)
+
+    def _tripped(self):
+        calls = len(self._window)
+        failures = sum(1 for failed, _ in self._window if failed)
+        slow_calls = sum(1 for _, slow in self._window if slow)
+
+        return (failures / calls >= self.failure_rate_threshold or
+                (self.slow_call_duration is not None and slow_calls / calls >= self.slow_call_rate_threshold))
+
+    def stats(self):
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._window)
+            return {
+                'state': state,
+                'calls': calls,
+                'failure_rate': sum(1 for failed, _ in self._window if failed) / calls if calls else 0.0,
+                'slow_call_rate': sum(1 for _, slow in self._window if slow) / calls if calls else 0.0,
+                'times_opened': self.times_opened,
+                'rejected_calls': self.rejected_calls,
+            }
+
+
+class CircuitBreakerRegistry(object):
+    # Path segments kept as-is when grouping paths by endpoint, all others are treated as ids
+    LITERAL_PATH_SEGMENTS = {'merchant'}
+
+    def __init__(self, **settings):
+        """
+        :param settings: Keyword arguments for every CircuitBreaker created by this registry
+        """
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def endpoint_path(cls, method, path):
+        """
+        Group requests by endpoint, e.g. GET /services/2/vaulted-shoppers/123 into
+        'GET /services/2/vaulted-shoppers/{id}'
+        """
+        parts = path.split('?', 1)[0].split('/')
+        # ['', 'services', '2', '<endpoint class>', ...]
+        parts[4:] = [part if part in cls.LITERAL_PATH_SEGMENTS else '{id}' for part in parts[4:]]
+        return '%s %s' % (method, '/'.join(parts))
+
+    def get(self, method, path):
+        """
+        :rtype: CircuitBreaker
+        """
+        name = self.endpoint_path(method, path)
+
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(name)
+                if breaker is None:
+                    breaker = self._breakers[name] = CircuitBreaker(name=name, **self.settings)
+
+        return breaker
+
+    def stats(self):
+        """
+        :return: dict of endpoint path to the stats of its breaker, for metrics
+        """
+        return {name: breaker.stats() for name, breaker in list(self._breakers.items())}
@@ -0,0 +1,199 @@
+"""
+Bulk execution of transactions.
+
+Runs many TransactionResource calls with a bounded number in flight over the client's shared connection pool, and
+streams a BulkResult back for every transaction as soon as it completes. A failing transaction (e.g. a CardError
+for a declined card), or an invalid spec, is attached to its result and never aborts the rest of the batch.
+"""
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from . import resources
+
+
+class TransactionSpec(object):
+    OPERATIONS = {'authCapture', 'auth', 'capture', 'reverse', 'retrieve'}
+
+    def __init__(self, operation='authCapture', **kwargs):
+        """
+        A single transaction of a batch.
+
+        :param operation: Name of the TransactionResource method to call
+        :param kwargs: Keyword arguments for that method, e.g. amount, currency, vaultedShopperId
+        """
+        if operation not in self.OPERATIONS:
+            raise ValueError('operation must be one of {0}.'.format(sorted(self.OPERATIONS)))
+
+        self.operation = operation
+        self.kwargs = kwargs
+
+    @classmethod
+    def from_value(cls, value):
+        """
+        :param value: TransactionSpec, or a dict of keyword arguments for TransactionResource.authCapture
+        :rtype: TransactionSpec
+        """
+        if isinstance(value, cls):
+            return value
+        return cls(**value)
+
+
+class BulkResult(object):
+    def __init__(self, index, spec, result=None, error=None):
+        """
+        :param index: Position of the transaction in the input iterable
+        :param spec: TransactionSpec that was executed, or the value no TransactionSpec could be made from
+        :param result: Parsed API response, if the transaction succeeded
+        :param error: Exception raised by the transaction (APIError, CardError, ...), or by TransactionSpec for an
+            invalid spec (ValueError, TypeError), if it failed
+        """
+        self.index = index
+        self.spec = spec
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        return '<BulkResult #{0} {1}>'.format(self.index, 'ok' if self.ok else repr(self.error))
+
+
+def _execute(resource, spec):
+    return getattr(resource, spec.operation)(**spec.kwargs)
+
+
+def execute_transactions(specs, concurrency=10, client=None):
+    """
+    Execute transactions using a pool of worker threads, yielding a BulkResult for each as it completes (i.e. not
+    necessarily in input order).
+
+    Specs are read from the iterable lazily, so it may be a generator over a very large batch. Keep concurrency at
+    or below the client's pool_maxsize so every worker gets a pooled connection.
+
+    :param specs: Iterable of TransactionSpec, or dicts of keyword arguments for TransactionResource.authCapture
+    :param concurrency: Maximum number of transactions in flight
+    :param client: Client to use, defaults to the configured client
+    :rtype: collections.Iterator[BulkResult]
+    """
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1.')
+
+    resource = resources.TransactionResource(client=client)
+    indexed_specs = enumerate(specs)
+    pending = {}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        def submit_next():
+            for index, value in indexed_specs:
+                try:
+                    spec = TransactionSpec.from_value(value)
+                except (ValueError, TypeError) as e:
+                    # Reported as the result of that item, like a failed transaction
+                    future = Future()
+                    future.set_exception(e)
+                    pending[future] = (index, value)
+                else:
+                    pending[executor.submit(_execute, resource, spec)] = (index, spec)
+                return True
+            return False
+
+        while len(pending) < concurrency and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index, spec = pending.pop(future)
+                error = future.exception()
+
+                yield BulkResult(index, spec, result=None if error else future.result(), error=error)
+
+                submit_next()
+
+
+def execute_transactions_async(specs, concurrency=10, client=None):
+    """
+    Awaitable variant of execute_transactions, running up to `concurrency` transactions at once on the event loop.
+
+    :param specs: Iterable of TransactionSpec, or dicts of keyword arguments for TransactionResource.authCapture
+    :param concurrency: Maximum number of transactions in flight
+    :param client: AsyncClient to use, defaults to the configured async client
+    :rtype: collections.AsyncIterator[BulkResult]
+    """
+    from .aio import AsyncTransactionResource
+
+    if concurrency < 1:
+        raise ValueError('concurrency must be at least 1.')
+
+    return _AsyncBulkRun(AsyncTransactionResource(client=client), specs, concurrency)
+
+
+async def _execute_async(resource, spec):
+    # Errors raised by the call itself, e.g. a TypeError for unexpected keyword arguments, land on the task
+    return await _execute(resource, spec)
+
+
+class _AsyncBulkRun(object):
+    """
+    Asynchronous iterator of the results of execute_transactions_async. Not an async generator, which Python 3.5
+    lacks.
+    """
+
+    def __init__(self, resource, specs, concurrency):
+        self.resource = resource
+        self.concurrency = concurrency
+        self._indexed_specs = enumerate(specs)
+        self._pending = {}
+        self._done = []
+        self._started = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            if not self._started:
+                self._started = True
+                while len(self._pending) < self.concurrency and self._submit_next():
+                    pass
+
+            if not self._done:
+                if not self._pending:
+                    raise StopAsyncIteration
+                done, _ = await asyncio.wait(self._pending, return_when=asyncio.FIRST_COMPLETED)
+                self._done.extend(done)
+        except asyncio.CancelledError:
+            await self.aclose()
+            raise
+
+        task = self._done.pop()
+        index, spec = self._pending.pop(task)
+        error = task.exception()
+        self._submit_next()
+
+        return BulkResult(index, spec, result=None if error else task.result(), error=error)
+
+    async def aclose(self):
+        """
+        Cancel the transactions in flight, and stop submitting new ones
+        """
+        self._indexed_specs = iter(())
+        for task in self._pending:
+            task.cancel()
+
+    def _submit_next(self):
+        for index, value in self._indexed_specs:
+            try:
+                spec = TransactionSpec.from_value(value)
+            except (ValueError, TypeError) as e:
+                # Reported as the result of that item, like a failed transaction
+                future = asyncio.get_event_loop().create_future()
+                future.set_exception(e)
+                self._pending[future] = (index, value)
+            else:
+                self._pending[asyncio.ensure_future(_execute_async(self.resource, spec))] = (index, spec)
+            return True
+        return False
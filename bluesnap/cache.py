@@ -0,0 +1,132 @@
+"""
+Caching of shopper lookups.
+
+A LookupCache keeps recently retrieved shoppers and vaulted shoppers in memory, bounded in size (least recently used
+entries are evicted first) and in age. Every entry is reachable through several keys, e.g. both the BlueSnap and the
+merchant shopper id, and invalidating any of them drops the whole entry. The resources invalidate entries themselves
+when they update a shopper through the same client.
+
+Entries are deep copied on the way in and out, so callers can modify what they receive.
+"""
+import collections
+import copy
+import threading
+import time
+
+
+class _Entry(object):
+    __slots__ = ('keys', 'value', 'expires')
+
+    def __init__(self, keys, value, expires):
+        self.keys = keys
+        self.value = value
+        self.expires = expires
+
+
+class LookupCache(object):
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        """
+        :param maxsize: Maximum number of cached entries
+        :param ttl: Seconds after which an entry expires
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # First key of each entry to the entry, least recently used first
+        self._lru = collections.OrderedDict()
+        # Every key to its entry
+        self._index = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    def _remove(self, entry):
+        self._lru.pop(entry.keys[0], None)
+        for key in entry.keys:
+            if self._index.get(key) is entry:
+                del self._index[key]
+
+    def get(self, key):
+        """
+        :return: A copy of the cached value, or None
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry.expires <= self._clock():
+                self._remove(entry)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._lru.move_to_end(entry.keys[0])
+            self.hits += 1
+            value = entry.value
+
+        return copy.deepcopy(value)
+
+    def set(self, keys, value):
+        """
+        Cache value under all of keys, replacing the entries any of them pointed to
+        """
+        keys = tuple(collections.OrderedDict.fromkeys(keys))
+        entry = _Entry(keys, copy.deepcopy(value), self._clock() + self.ttl)
+
+        with self._lock:
+            for key in keys:
+                existing = self._index.get(key)
+                if existing is not None:
+                    self._remove(existing)
+
+            self._lru[keys[0]] = entry
+            for key in keys:
+                self._index[key] = entry
+
+            while len(self._lru) > self.maxsize:
+                _, oldest = self._lru.popitem(last=False)
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        """
+        Drop the entries any of keys point to
+        """
+        with self._lock:
+            for key in keys:
+                entry = self._index.get(key)
+                if entry is not None:
+                    self._remove(entry)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._index.clear()
+
+    def stats(self):
+        """
+        :return: dict of counters, for metrics
+        """
+        with self._lock:
+            return {
+                'size': len(self._lru),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
@@ -1,43 +1,211 @@
-import json
-from pyexpat import ExpatError
-from lxml.builder import ElementMaker
-from requests.auth import HTTPBasicAuth
-import requests
-import xmltodict
+"""
+BlueSnap API clients.
+
+lxml, xmltodict and requests are only imported once needed: XML on the first XML document built or parsed, requests
+on the first request of a blocking Client. Services using only the JSON API, or only the AsyncClient, never load the
+XML machinery, and importing the package stays cheap for short-lived processes. See benchmarks/import_time.py.
+"""
+import base64
+import concurrent.futures
+import functools
+import logging
+import random
+import re
+import sys
+import threading
+import time
 from logging import Logger
-from .exceptions import ImproperlyConfigured, ValidationError, APIError, CardError
+from .deadline import Deadline
+from .jsoncodec import default_codec
+from .exceptions import ImproperlyConfigured, ValidationError, APIError, CardError, RateLimitError
+from .ratelimit import RateLimiter, parse_retry_after
+from .redaction import Redactor
+from .singleflight import SingleFlight
+from .transport import RequestsTransport
+from .xmlparser import XMLParseError, default_parser
 
 
+@functools.lru_cache(maxsize=None)
 def default_user_agent():
     """
-    Generate default user agent based on library repo name, Python version and requests version
+    Generate default user agent based on library repo name, Python version and requests version, once
     :return: string
     """
     import platform
+    import requests
     from .version import __version__
     library_versions = 'requests {}; python {}'.format(requests.__version__, platform.version())
     return 'mayple/bluesnap {} ({})'.format(__version__, library_versions)
 
 
-def format_request(req):
-    return '\n'.join([
-        '%s %s' % (req.method, req.url),
-        '\n'.join('%s: %s' % (k, v) for k, v in req.headers.items()),
-        '',
-        req.body or '',
-    ])
+# Endpoints and paths that preparing a URL leaves as they are: nothing to percent-encode or normalize, no dot segments
+# and no fragment
+_PLAIN_ENDPOINT = re.compile(r'https?://[a-z0-9.\-]+(?::[0-9]+)?\Z')
+_PLAIN_PATH = re.compile(r"/[A-Za-z0-9\-._~!$&'()*+,;=:@/]*(?:\?[A-Za-z0-9\-._~!$&'()*+,;=:@/?]+)?\Z")
 
 
-def format_response(res):
-    return '\n'.join([
-        '%d %s' % (res.status_code, res.reason or ''),
-        '\n'.join('%s: %s' % (k, v) for k, v in res.headers.items()),
-        '',
-        res.text,
-    ])
+def _prepare_url(url):
+    from requests.models import PreparedRequest
 
+    request = PreparedRequest()
+    request.prepare_url(url, None)
+    return request.url
+
+
+def _basic_authorization(username, password):
+    """
+    :return: Authorization header value, as requests.auth.HTTPBasicAuth sets it
+    """
+    credentials = []
+    for value in (username, password):
+        if not isinstance(value, (str, bytes)):
+            value = str(value)
+        if isinstance(value, str):
+            value = value.encode('latin1')
+        credentials.append(value)
+    return 'Basic ' + base64.b64encode(b':'.join(credentials)).strip().decode('ascii')
+
+
+class _RequestPrelude(object):
+    """
+    What all requests of a client share, computed once for its endpoint, credentials and connection settings: the
+    prepared endpoint URL, the Authorization header, and the headers of XML and JSON API requests
+    """
+    __slots__ = ('key', 'url_prefix', 'authorization', 'xml_headers', 'json_headers')
+
+    def __init__(self, endpoint_url, username, password, keep_alive):
+        self.key = (endpoint_url, username, password, keep_alive)
+
+        if _PLAIN_ENDPOINT.match(endpoint_url):
+            self.url_prefix = endpoint_url
+        else:
+            self.url_prefix = _prepare_url(endpoint_url + '/')[:-1]
+
+        self.authorization = _basic_authorization(username, password)
+
+        headers = []
+        for content_type in ('application/xml', 'application/json'):
+            headers.append({
+                'content-type': content_type,  # Required by Bluesnap API
+                'accept': content_type,  # Required by Bluesnap API
+            })
+            if not keep_alive:
+                headers[-1]['connection'] = 'close'
+        self.xml_headers, self.json_headers = headers
+
+    def url(self, path):
+        """
+        :return: URL of path, as preparing the request would make it
+        """
+        if _PLAIN_PATH.match(path) and '/.' not in path:
+            return self.url_prefix + path
+        return _prepare_url(self.url_prefix + path)
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _format(first_line, headers, body, body_limit=None, redactor=None):
+    """
+    :param body: Body as str or bytes-like, or None
+    :param body_limit: Maximum number of bytes (or characters, for str bodies) to include, or None for all of it
+    :param redactor: Optional bluesnap.redaction.Redactor applied to the headers and body
+    """
+    body = body or ''
+    truncated = 0
+    unit = 'characters' if isinstance(body, str) else 'bytes'
+    if body_limit is not None and len(body) > body_limit:
+        truncated = len(body) - body_limit
+        # Slicing a memoryview does not copy the part that is left out
+        body = body[:body_limit] if isinstance(body, str) else memoryview(body)[:body_limit]
+    if not isinstance(body, str):
+        body = bytes(body).decode('utf-8', errors='replace')
+
+    if redactor is not None:
+        body = redactor.redact(body)
+        headers = '\n'.join('%s: %s' % (k, redactor.redact_header(k, v)) for k, v in headers.items())
+    else:
+        headers = '\n'.join('%s: %s' % (k, v) for k, v in headers.items())
+    # Appended after redaction, which masks a value cut by the limit up to the end of the body
+    if truncated:
+        body += '... [%d %s truncated]' % (truncated, unit)
+
+    return '\n'.join([first_line, headers, '', body])
+
+
+def format_request(req, body_limit=None, redactor=None):
+    return _format('%s %s' % (req.method, req.url), req.headers, req.body, body_limit, redactor)
+
+
+def format_response(res, body_limit=None, redactor=None):
+    return _format('%d %s' % (res.status_code, res.reason or ''), res.headers, res.content, body_limit, redactor)
+
+
+class TagFactories(dict):
+    """
+    Element factories by tag name, e.g. tags['credit-card'](...), each created once rather than on every
+    getattr(E, 'credit-card'). Elements with a single text, or with element children only, are made directly, other
+    ones by the ElementMaker, with the same result.
+    """
+
+    def __init__(self, element_maker, namespace, nsmap):
+        super(TagFactories, self).__init__()
+        self.element_maker = element_maker
+        self.namespace = namespace
+        self.nsmap = nsmap
+
+    def __missing__(self, tag):
+        factory = self[tag] = self._factory(tag)
+        return factory
+
+    def _factory(self, tag):
+        from lxml import etree
+
+        qualified_tag = '{%s}%s' % (self.namespace, tag)
+        nsmap = self.nsmap
+        make = getattr(self.element_maker, tag)
+
+        def factory(*children, **attrib):
+            if attrib:
+                return make(*children, **attrib)
+
+            if len(children) == 1 and type(children[0]) is str:
+                element = etree.Element(qualified_tag, nsmap=nsmap)
+                element.text = children[0]
+                return element
+
+            for child in children:
+                if type(child) is not etree._Element:
+                    return make(*children)
+            element = etree.Element(qualified_tag, nsmap=nsmap)
+            element.extend(children)
+            return element
+
+        return factory
+
+
+class _LazyFormat(object):
+    """
+    Log record argument formatted only if the record is emitted
+    """
+    __slots__ = ('function', 'args')
+
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __str__(self):
+        return self.function(*self.args)
+
+
+class BaseClient(object):
+    """
+    Configuration, request preparation and response handling shared by the blocking Client and the asyncio
+    AsyncClient. Subclasses only implement the transport.
+    """
 
-class Client(object):
     ENDPOINTS = {
         'live': 'https://ws.bluesnap.com',
         'sandbox': 'https://sandbox.bluesnap.com'
@@ -48,6 +216,9 @@ class Client(object):
     # List of error codes that is considered a card error
     CARD_ERROR_CODES = {'14002'}
 
+    # HTTP status codes BlueSnap uses to throttle requests
+    THROTTLING_STATUS_CODES = {429}
+
     def __init__(self,
                  # Environment
                  env,
@@ -62,7 +233,35 @@ class Client(object):
                  # Locale
                  locale='en',
                  # Logger
-                 logger=None):
+                 logger=None,
+                 # Connection pool
+                 pool_maxsize=10,
+                 keep_alive=True,
+                 # Rate limiting
+                 rate_limiter=None,
+                 # Retries
+                 retry_policy=None,
+                 # Circuit breakers
+                 circuit_breaker=None,
+                 # Timeouts, in seconds
+                 connect_timeout=10,
+                 read_timeout=60,
+                 # Hedged requests
+                 hedge_policy=None,
+                 # Coalescing of concurrent identical GETs
+                 coalesce_requests=False,
+                 # Shopper lookup cache
+                 shopper_cache=None,
+                 # XML response parser
+                 xml_parser=None,
+                 # JSON encoding and decoding
+                 json_codec=None,
+                 # Request and response logging
+                 log_body_limit=None,
+                 log_sample_rates=None,
+                 log_default_sample_rate=1.0,
+                 log_redactor=None,
+                 log_queue=None):
         if env not in self.ENDPOINTS:
             raise ValueError('env not in {0}'.format(self.ENDPOINTS.keys()))
 
@@ -76,18 +275,122 @@ class Client(object):
 
         self.logger = logger if isinstance(logger, Logger) else None
 
-        # ElementMaker for XML builder
-        self.E = ElementMaker(namespace=self.NAMESPACE,
-                              nsmap={None: self.NAMESPACE})
-
         self.last_response = None
 
+        # _RequestPrelude of the current endpoint and credentials, see _request_prelude()
+        self._prelude = None
+
+        # Connection pool, shared by all requests made through this client
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+
+        # Optional bluesnap.ratelimit.RateLimiter, may be shared between clients
+        self.rate_limiter = rate_limiter
+
+        # Optional bluesnap.retry.RetryPolicy, failed calls are not retried without one
+        self.retry_policy = retry_policy
+
+        # Optional bluesnap.breaker.CircuitBreakerRegistry, may be shared between clients
+        self.circuit_breaker = circuit_breaker
+
+        # Per attempt, further limited by the deadline of each call
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        # Optional bluesnap.hedge.HedgePolicy, slow reads are not hedged without one
+        self.hedge_policy = hedge_policy
+
+        # bluesnap.singleflight.SingleFlight or AsyncSingleFlight if enabled, set by subclasses
+        self.coalesce_requests = coalesce_requests
+        self.single_flight = None
+
+        # Optional bluesnap.cache.LookupCache for shopper and vaulted shopper lookups, may be shared between clients
+        # of the same BlueSnap account
+        self.shopper_cache = shopper_cache
+
+        # lxml ElementMaker, TagFactories and bluesnap.xmlparser.XMLParser for XML API requests and responses, created
+        # on first use unless given
+        self._lazy_lock = threading.Lock()
+        self._E = None
+        self._tags = None
+        self._xml_parser = xml_parser
+
+        # bluesnap.jsoncodec.JSONCodec for JSON API requests and responses
+        self.json_codec = json_codec or default_codec()
+
+        # Bodies are logged up to this many bytes, or in full if None
+        self.log_body_limit = log_body_limit
+        # Fraction of calls whose request and response are logged, per endpoint class (e.g. 'vaulted-shoppers'), and
+        # for endpoint classes not listed
+        self.log_sample_rates = dict(log_sample_rates or {})
+        self.log_default_sample_rate = log_default_sample_rate
+        self._log_random = random.random
+        # bluesnap.redaction.Redactor masking card data and credentials in logged requests and responses
+        self.log_redactor = log_redactor or Redactor()
+        # Optional bluesnap.logqueue.LogQueue to format and emit records off the request thread, may be shared between
+        # clients
+        self.log_queue = log_queue
+
+    @property
+    def E(self):
+        """
+        ElementMaker for XML builders, created on first use
+
+        :rtype: lxml.builder.ElementMaker
+        """
+        if self._E is None:
+            with self._lazy_lock:
+                if self._E is None:
+                    from lxml.builder import ElementMaker
+
+                    self._E = ElementMaker(namespace=self.NAMESPACE, nsmap={None: self.NAMESPACE})
+        return self._E
+
+    @E.setter
+    def E(self, value):
+        self._E = value
+
+    @property
+    def tags(self):
+        """
+        Cached factories of self.E, used by all XML builders
+
+        :rtype: TagFactories
+        """
+        if self._tags is None:
+            E = self.E
+            with self._lazy_lock:
+                if self._tags is None:
+                    self._tags = TagFactories(E, self.NAMESPACE, {None: self.NAMESPACE})
+        return self._tags
+
+    @tags.setter
+    def tags(self, value):
+        self._tags = value
+
+    @property
+    def xml_parser(self):
+        """
+        :rtype: bluesnap.xmlparser.XMLParser
+        """
+        if self._xml_parser is None:
+            with self._lazy_lock:
+                if self._xml_parser is None:
+                    self._xml_parser = default_parser()
+        return self._xml_parser
+
+    @xml_parser.setter
+    def xml_parser(self, value):
+        self._xml_parser = value
+
     @property
     def endpoint_url(self):
         return self.ENDPOINTS[self.env]
 
     @property
     def http_basic_auth(self):
+        from requests.auth import HTTPBasicAuth
+
         return HTTPBasicAuth(self.username, self.password)
 
     @property
@@ -100,80 +403,142 @@ class Client(object):
         # TODO ability to change this in the future
         return str(self.default_store_id)
 
-    def request(self, method, path, data=None, useJsonApi=False):
+    def _request_prelude(self):
         """
-        API request method
+        :return: _RequestPrelude of the client, created again if its endpoint, credentials or keep_alive changed
+        """
+        prelude = self._prelude
+        key = (self.endpoint_url, self.username, self.password, self.keep_alive)
+        if prelude is None or prelude.key != key:
+            prelude = self._prelude = _RequestPrelude(*key)
+        return prelude
+
+    def _prepare_request(self, method, path, data=None):
+        """
+        Build the HTTP request for an API call
 
         :param method: HTTP method
         :param path: URL path
-        :param data: XML data
-        :return:
+        :param data: XML data (bytes, bytearray or memoryview) or JSON data (dict)
+        :return: tuple of (request, useJsonApi), the request being what _new_request returns
         """
-        url = self.endpoint_url + path
-
+        # Bodies are encoded exactly once, and sent as is: XML by whoever built it, JSON here
         useJsonApi = False
-        dataString = None
+        body = None
         if type(data) == dict:
-            dataString = json.dumps(data)
+            body = self.json_codec.dumps(data)
             useJsonApi = True
-        if type(data) == bytes:
-            dataString = data.decode('utf-8')
-            useJsonApi = False
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            # Empty bodies are sent as none, as by requests
+            body = data or None
 
-        headers = {
-            'content-type': 'application/xml' if not useJsonApi else 'application/json',  # Required by Bluesnap API
-            'accept': 'application/xml' if not useJsonApi else 'application/json',  # Required by Bluesnap API
-        }
+        method = method.upper()
+        prelude = self._request_prelude()
 
-        # Prepare request
-        req = requests.Request(
-            method, url, headers,
-            data=dataString,
-            auth=self.http_basic_auth)
-        r = req.prepare()
+        # The headers requests.Request.prepare() would set, in the same order
+        headers = dict(prelude.json_headers if useJsonApi else prelude.xml_headers)
+        if body:
+            # In bytes, which len() of a memoryview is not if its items are larger
+            headers['Content-Length'] = str(body.nbytes if isinstance(body, memoryview) else len(body))
+        elif method not in ('GET', 'HEAD'):
+            headers['Content-Length'] = '0'
+        headers['Authorization'] = prelude.authorization
 
-        if self.logger:
-            self.logger.info(
-                'Bluesnap request:\n%s', format_request(r))
+        return self._new_request(method, prelude.url(path), headers, body), useJsonApi
 
-        # Send request, returning response
-        s = requests.Session()
-        response = s.send(r)
+    def _new_request(self, method, url, headers, body):
+        """
+        :param headers: dict of all headers to send, owned by the request
+        :return: Request object for the transport of the client, with at least method, url, headers and body
+        """
+        raise NotImplementedError
 
-        if self.logger:
-            self.logger.info(
-                'Bluesnap response (took %s):\n%s',
-                response.elapsed,
-                format_response(response))
+    def _log_sampled(self, path):
+        """
+        :return: Whether the request and response of a call to path are logged
+        """
+        if not self.logger or not self.logger.isEnabledFor(logging.INFO):
+            return False
+
+        rate = self.log_sample_rates.get(RateLimiter.endpoint_class(path), self.log_default_sample_rate)
+        return rate >= 1 or (rate > 0 and self._log_random() < rate)
+
+    def _log(self, msg, *args):
+        if self.log_queue is not None:
+            self.log_queue.log(self.logger, logging.INFO, msg, *args)
+        else:
+            self.logger.info(msg, *args)
+
+    def _log_request(self, request):
+        self._log('Bluesnap request:\n%s', _LazyFormat(format_request, request, self.log_body_limit, self.log_redactor))
+
+    def _log_response(self, response):
+        self._log(
+            'Bluesnap response (took %s):\n%s',
+            response.elapsed,
+            _LazyFormat(format_response, response, self.log_body_limit, self.log_redactor))
+
+    def _log_attempt(self, request, attempt, elapsed, outcome, retry_delay):
+        if self.logger and self.logger.isEnabledFor(logging.INFO):
+            self._log(
+                'Bluesnap %s %s attempt %d took %.3fs: %s%s',
+                request.method, request.url, attempt, elapsed, outcome,
+                '' if retry_delay is None else ', retrying in %.3fs' % retry_delay)
+
+    def _coalesced(self, method, data):
+        """
+        :return: Whether the request may share the response of an identical one in flight
+        """
+        return self.single_flight is not None and method == 'GET' and data is None
 
-        # Save request and response for further logging
-        self.last_response = response
+    def _hedge_delay(self, request, path, deadline):
+        """
+        :return: Seconds to wait for a response before hedging the request, or None if it must not be hedged
+        """
+        if not self.hedge_policy:
+            return None
 
-        body = self._process_response_body(response, useJsonApi)
+        delay = self.hedge_policy.delay(request.method, path)
+        if delay is None or not deadline.allows(delay):
+            return None
+        return delay
 
-        return response, body
+    def _handle_throttling(self, path, response):
+        """
+        Raise RateLimitError if BlueSnap throttled the request, pausing the rate limiter for its Retry-After
+        """
+        if response.status_code not in self.THROTTLING_STATUS_CODES:
+            return
+
+        retry_after = parse_retry_after(response.headers.get('retry-after'))
+
+        if self.rate_limiter:
+            self.rate_limiter.throttled(path, retry_after)
+
+        raise RateLimitError(
+            description=response.text or 'Too many requests',
+            status_code=response.status_code,
+            retry_after=retry_after
+        )
 
     def _process_response_body(self, response, useJsonApi):
         body = None
 
         if response.content:  # There's content, parse it as XML
-            responseContent = response.content
-            if type(response.content) == bytes:
-                responseContent = response.content.decode('utf-8')
-
             if not useJsonApi:
                 try:
-                    body = xmltodict.parse(responseContent)
-                except ExpatError as ee:
+                    # Straight from the raw bytes, the parser handles the document's encoding
+                    body = self.xml_parser.parse(response.content)
+                except XMLParseError:
                     # Cannot parse body as XML, could be a text
-                    raise APIError(description=responseContent, status_code=response.status_code)
+                    raise APIError(description=response.text, status_code=response.status_code)
 
             if useJsonApi:
                 try:
-                    body = json.loads(responseContent)
+                    body = self.json_codec.loads(response.content)
                 except Exception:
                     # Cannot parse body as JSON, could be a text
-                    raise APIError(description=responseContent, status_code=response.status_code)
+                    raise APIError(description=response.text, status_code=response.status_code)
 
         if not (200 <= response.status_code < 300):
             self._handle_api_error(response, body, useJsonApi)
@@ -240,6 +605,318 @@ class Client(object):
                 status_code=response.status_code
             )
 
+
+class Client(BaseClient):
+    def __init__(self,
+                 # Environment
+                 env,
+                 # Authentication
+                 username, password,
+                 # Default store Id
+                 default_store_id,
+                 # Seller id
+                 seller_id,
+                 # Default currency
+                 default_currency,
+                 # Locale
+                 locale='en',
+                 # Logger
+                 logger=None,
+                 # Connection pool
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 pool_block=False,
+                 keep_alive=True,
+                 # Rate limiting
+                 rate_limiter=None,
+                 # Retries
+                 retry_policy=None,
+                 # Circuit breakers
+                 circuit_breaker=None,
+                 # Timeouts, in seconds
+                 connect_timeout=10,
+                 read_timeout=60,
+                 # Hedged requests
+                 hedge_policy=None,
+                 # Coalescing of concurrent identical GETs
+                 coalesce_requests=False,
+                 # Shopper lookup cache
+                 shopper_cache=None,
+                 # XML response parser
+                 xml_parser=None,
+                 # JSON encoding and decoding
+                 json_codec=None,
+                 # Request and response logging
+                 log_body_limit=None,
+                 log_sample_rates=None,
+                 log_default_sample_rate=1.0,
+                 log_redactor=None,
+                 log_queue=None,
+                 # HTTP transport
+                 transport=None):
+        """
+        :param transport: bluesnap.transport.Transport sending requests, a RequestsTransport using the pool settings
+            if None. The pool settings are ignored otherwise.
+        """
+        super(Client, self).__init__(
+            env=env,
+            username=username,
+            password=password,
+            default_store_id=default_store_id,
+            seller_id=seller_id,
+            default_currency=default_currency,
+            locale=locale,
+            logger=logger,
+            pool_maxsize=pool_maxsize,
+            keep_alive=keep_alive,
+            rate_limiter=rate_limiter,
+            retry_policy=retry_policy,
+            circuit_breaker=circuit_breaker,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            hedge_policy=hedge_policy,
+            coalesce_requests=coalesce_requests,
+            shopper_cache=shopper_cache,
+            xml_parser=xml_parser,
+            json_codec=json_codec,
+            log_body_limit=log_body_limit,
+            log_sample_rates=log_sample_rates,
+            log_default_sample_rate=log_default_sample_rate,
+            log_redactor=log_redactor,
+            log_queue=log_queue)
+
+        self.pool_connections = pool_connections
+        self.pool_block = pool_block
+
+        # bluesnap.transport.Transport sending requests, and holding the connection pool
+        self.transport = transport or RequestsTransport(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block)
+
+        self._session_lock = threading.Lock()
+        self._requests_sent = 0
+        self._hedge_executor = None
+
+        if coalesce_requests:
+            self.single_flight = SingleFlight()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def session(self):
+        """
+        Long-lived HTTP session of the default RequestsTransport
+
+        :rtype: requests.Session
+        """
+        return self.transport.session
+
+    def _new_request(self, method, url, headers, body):
+        return self.transport.new_request(method, url, headers, body)
+
+    @property
+    def hedge_executor(self):
+        """
+        Threads sending hedged requests, created on first use
+
+        :rtype: concurrent.futures.ThreadPoolExecutor
+        """
+        if self._hedge_executor is None:
+            with self._session_lock:
+                if self._hedge_executor is None:
+                    # Threads can only be named from Python 3.6
+                    options = {'thread_name_prefix': 'bluesnap-hedge'} if sys.version_info >= (3, 6) else {}
+                    self._hedge_executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=2 * self.pool_maxsize, **options)
+        return self._hedge_executor
+
+    def close(self):
+        """
+        Close all pooled connections. A new pool is created if the client is used again afterwards.
+        """
+        with self._session_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+
+        if executor is not None:
+            executor.shutdown(wait=False)
+        self.transport.close()
+
+    def pool_stats(self):
+        """
+        Statistics about the connection pool of this client.
+
+        :return: dict with the number of requests sent, connections created and reused, and a 'pools' list with
+            the state of each per-host pool
+        """
+        pools = self.transport.pool_stats()
+
+        connections_created = sum(pool['connections_created'] for pool in pools)
+
+        return {
+            'requests': self._requests_sent,
+            'connections_created': connections_created,
+            'connections_reused': max(0, sum(pool['requests'] for pool in pools) - connections_created),
+            'pools': pools,
+        }
+
+    def _send(self, request, path, deadline):
+        # Calls failing fast neither wait for a rate limiter token nor spend one
+        breaker = self.circuit_breaker.get(request.method, path) if self.circuit_breaker else None
+        generation = breaker.before_call() if breaker else None
+
+        if self.rate_limiter:
+            if self.rate_limiter.acquire(path, max_wait=deadline.remaining()) is None:
+                if breaker:
+                    breaker.release(generation)
+                raise deadline.exceeded(reason='no rate limiter token available in time')
+
+        # Send request over the pooled connections of the transport, returning response
+        started = time.monotonic()
+        try:
+            hedge_delay = self._hedge_delay(request, path, deadline)
+            if hedge_delay is None:
+                response = self.transport.send(
+                    request, (deadline.limit(self.connect_timeout), deadline.limit(self.read_timeout)))
+            else:
+                response = self._send_hedged(request, path, deadline, hedge_delay)
+        except Exception:
+            if breaker:
+                breaker.record(False, time.monotonic() - started, generation)
+            raise
+
+        if breaker:
+            breaker.record(response.status_code < 500, time.monotonic() - started, generation)
+
+        with self._session_lock:
+            self._requests_sent += 1
+
+        return response
+
+    def _send_hedged(self, request, path, deadline, delay):
+        """
+        Send request from the hedge executor, and an identical hedge if no response arrived after delay seconds.
+        The first response wins. A request that already started cannot be interrupted, so the losing one is
+        abandoned and its connection released once it completes.
+        """
+        hedge_policy = self.hedge_policy
+
+        def send():
+            started = time.monotonic()
+            response = self.transport.send(
+                request.copy(), (deadline.limit(self.connect_timeout), deadline.limit(self.read_timeout)))
+            hedge_policy.record(request.method, path, time.monotonic() - started)
+            return response
+
+        primary = self.hedge_executor.submit(send)
+        hedge = None
+
+        done, pending = concurrent.futures.wait({primary}, timeout=delay)
+        # Hedges are extra load, only send one if the rate limiter has a token to spare right away
+        if not done and (not self.rate_limiter or self.rate_limiter.acquire(path, max_wait=0) is not None):
+            hedge = self.hedge_executor.submit(send)
+            pending.add(hedge)
+            hedge_policy.hedge_fired(request.method, path)
+
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        hedge_policy.hedge_won(request.method, path)
+                    for loser in pending:
+                        if not loser.cancel():
+                            loser.add_done_callback(_close_response)
+                    return future.result()
+                error = error or future.exception()
+
+            if not pending:
+                raise error
+
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+
+    def request(self, method, path, data=None, useJsonApi=False, deadline=None):
+        """
+        API request method
+
+        :param method: HTTP method
+        :param path: URL path
+        :param data: XML data
+        :param deadline: Maximum number of seconds the call may take, including retries
+        :raises DeadlineExceededError: if the deadline passed before a response was received
+        :return:
+        """
+        deadline = Deadline(deadline)
+
+        if self._coalesced(method, data):
+            return self.single_flight.do((method, path), lambda: self._request(method, path, data, deadline), deadline)
+        return self._request(method, path, data, deadline)
+
+    def _request(self, method, path, data, deadline):
+        retry_policy = self.retry_policy
+        if retry_policy:
+            data = retry_policy.prepare_data(method, path, data)
+            idempotent = retry_policy.is_idempotent(method, data)
+
+        r, useJsonApi = self._prepare_request(method, path, data)
+
+        logged = self._log_sampled(path)
+        if logged:
+            self._log_request(r)
+
+        while True:
+            deadline.attempts += 1
+            attempt = deadline.attempts
+            started = time.monotonic()
+
+            try:
+                response = self._send(r, path, deadline)
+            except Exception as e:
+                deadline.check(cause=e)
+
+                if not retry_policy:
+                    raise
+
+                retry_delay = retry_policy.retry_delay(attempt, idempotent, error=e)
+                if retry_delay is not None and not deadline.allows(retry_delay):
+                    retry_delay = None
+                self._log_attempt(r, attempt, time.monotonic() - started, repr(e), retry_delay)
+                if retry_delay is None:
+                    raise
+                retry_policy.sleep(retry_delay)
+                continue
+
+            if not retry_policy:
+                break
+
+            retry_delay = retry_policy.retry_delay(attempt, idempotent, response=response)
+            if retry_delay is not None and not deadline.allows(retry_delay):
+                retry_delay = None
+            self._log_attempt(r, attempt, time.monotonic() - started, response.status_code, retry_delay)
+            if retry_delay is None:
+                break
+
+            if response.status_code in self.THROTTLING_STATUS_CODES and self.rate_limiter:
+                self.rate_limiter.throttled(path, retry_delay)
+            retry_policy.sleep(retry_delay)
+
+        if logged:
+            self._log_response(response)
+
+        # Save request and response for further logging
+        self.last_response = response
+
+        self._handle_throttling(path, response)
+
+        body = self._process_response_body(response, useJsonApi)
+
+        return response, body
+
+
 __client__ = None
 
 
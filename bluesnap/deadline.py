@@ -0,0 +1,71 @@
+"""
+Per-call time budgets.
+
+A Deadline is created by Client.request for every API call. Rate limiting, every attempt's socket timeouts and the
+backoff between retries are all bounded by what is left of it, and running out raises DeadlineExceededError.
+"""
+import time
+
+from .exceptions import DeadlineExceededError
+
+
+class Deadline(object):
+    def __init__(self, seconds=None, clock=time.monotonic):
+        """
+        :param seconds: Time budget of the call, or None for no deadline
+        """
+        if seconds is not None and seconds <= 0:
+            raise ValueError('deadline must be positive.')
+
+        self.seconds = seconds
+        self._clock = clock
+        self.started = clock()
+        self.attempts = 0
+
+    @property
+    def elapsed(self):
+        return self._clock() - self.started
+
+    def remaining(self):
+        """
+        :return: Seconds left, or None if there is no deadline
+        """
+        if self.seconds is None:
+            return None
+        return max(0.0, self.seconds - self.elapsed)
+
+    def limit(self, timeout):
+        """
+        :param timeout: Timeout in seconds, or None for no timeout
+        :return: The timeout, shortened so it does not run past the deadline
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        if timeout is None:
+            return remaining
+        return min(timeout, remaining)
+
+    def allows(self, delay):
+        """
+        :return: Whether waiting delay seconds still leaves time for another attempt
+        """
+        remaining = self.remaining()
+        return remaining is None or delay < remaining
+
+    def exceeded(self, reason=None):
+        """
+        :rtype: DeadlineExceededError
+        """
+        return DeadlineExceededError(
+            deadline=self.seconds,
+            elapsed=self.elapsed,
+            attempts=self.attempts,
+            reason=reason)
+
+    def check(self, cause=None):
+        """
+        :raises DeadlineExceededError: if no time is left, chained to cause
+        """
+        if self.seconds is not None and self.elapsed >= self.seconds:
+            raise self.exceeded(reason=repr(cause) if cause is not None else None) from cause
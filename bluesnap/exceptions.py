@@ -44,6 +44,16 @@ class APIError(Exception):
         return outputString
 
 
+class RateLimitError(APIError):
+    """
+    BlueSnap throttled the request. retry_after is the number of seconds it asked to wait, if it said so.
+    """
+    def __init__(self, messages=None, description=None, code=None, status_code=None, retry_after=None):
+        super(RateLimitError, self).__init__(
+            messages=messages, description=description, code=code, status_code=status_code)
+        self.retry_after = retry_after
+
+
 class CardError(Exception):
     simple_description_matcher = re.compile(
         'Order creation could not be completed because of payment processing failure: (\w+) - (.*)')
@@ -71,6 +81,45 @@ class CardError(Exception):
         return string
 
 
+class CircuitOpenError(Exception):
+    """
+    The circuit breaker of an endpoint is open, so the call failed fast without reaching BlueSnap.
+    retry_in is the number of seconds until a probe call will be let through.
+    """
+    def __init__(self, endpoint, retry_in=None):
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+    def __str__(self):
+        string = 'Circuit breaker for {} is open'.format(self.endpoint)
+
+        if self.retry_in:
+            string += ' (retry in {:.1f}s)'.format(self.retry_in)
+
+        return string
+
+
+class DeadlineExceededError(Exception):
+    """
+    A call ran out of its time budget. elapsed is the time spent on it, in seconds, over the given number of
+    attempts.
+    """
+    def __init__(self, deadline, elapsed, attempts=0, reason=None):
+        self.deadline = deadline
+        self.elapsed = elapsed
+        self.attempts = attempts
+        self.reason = reason
+
+    def __str__(self):
+        string = 'Deadline of {:.3f}s exceeded after {:.3f}s and {} attempt(s)'.format(
+            self.deadline, self.elapsed, self.attempts)
+
+        if self.reason:
+            string += ': {}'.format(self.reason)
+
+        return string
+
+
 class ImproperlyConfigured(Exception):
     pass
 
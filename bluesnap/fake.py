@@ -0,0 +1,696 @@
+"""
+Stateful in-process stand-in for the BlueSnap API.
+
+FakeBlueSnap answers the requests the resources of this package send the way BlueSnap does, and keeps what they create
+in memory, so that an integration can be run, benchmarked and load-tested at full CPU speed without the sandbox:
+
+    fake = FakeBlueSnap(username='username', password='password')
+    client = Client(env='sandbox', username='username', password='password', ..., transport=fake.transport())
+
+It implements what the resources use, as far as they rely on it:
+
+* XML API: creating, retrieving (by BlueSnap or seller shopper id) and updating shoppers, and placing orders.
+* JSON API: auth only, auth capture, capture, auth reversal and retrieval of transactions, creating, retrieving (by
+  vaulted or merchant shopper id) and updating vaulted shoppers, and creating Hosted Payment Fields tokens.
+
+Responses are XML or JSON, as the Accept header of the request asks, and errors are sent in the same shape as
+BlueSnap's. Card errors are those of the sandbox test cards, see DECLINED_CARDS, and any card can be declined at
+random with decline_rate. The names and codes of the other errors only approximate BlueSnap's.
+
+Hosted Payment Fields tokens don't carry card numbers in requests: cards are bound to tokens with bind_card(), and a
+token no card was bound to stands for default_card. Encrypted card numbers can't be read either, they are taken to be
+'encrypted_' followed by the card number, as in the tests.
+
+Any object with the attributes of bluesnap.transport.Request can be handled, such as a requests.PreparedRequest, so the
+fake can also answer requests intercepted by responses, or received by a server.
+"""
+import base64
+import collections
+import datetime
+import itertools
+import re
+import threading
+import uuid
+from urllib.parse import urlsplit
+
+from .client import BaseClient, _basic_authorization
+
+
+NAMESPACE = BaseClient.NAMESPACE
+
+# (error name, code, description) by scenario. Descriptions are formatted with the arguments of the error.
+ERRORS = {
+    'card_expired': (
+        'EXPIRED_CARD', '14002',
+        'Order creation could not be completed because of payment processing failure: 430306 - The expiration date '
+        'entered is invalid. Enter valid expiration date or try another card'),
+    'insufficient_funds': (
+        'INSUFFICIENT_FUNDS', '14002',
+        'Order creation could not be completed because of payment processing failure: 430360 - Insufficient funds. '
+        'Please use another card or contact your bank for assistance'),
+    'invalid_card_number': (
+        'INVALID_CARD_NUMBER', '14002',
+        'Order creation could not be completed because of payment processing failure: 430330 - Invalid card number. '
+        'Please check the number and try again, or use a different card'),
+    'incorrect_information': (
+        'INCORRECT_INFORMATION', '14002',
+        'Order creation could not be completed because of payment processing failure: 430285 - Authorization has '
+        'failed for this transaction. Please try again or contact your bank for assistance'),
+    'order_failed__wrong_payment_details': (
+        None, '10000', 'The order failed because shopper payment details were incorrect or insufficient.'),
+    'order_failed__no_payment_method': (
+        None, '15009', 'Order creation failure, since no payment information was provided.'),
+    'invalid_request': (
+        'VALIDATION_GENERAL_FAILURE', '10001', '{}'),
+    'shopper_not_found': (
+        'SHOPPER_NOT_FOUND', '10000', 'Shopper {} could not be found.'),
+    'transaction_not_found': (
+        'TRANSACTION_NOT_FOUND', '10000', 'Transaction {} could not be found.'),
+    'invalid_transaction_state': (
+        'INVALID_TRANSACTION_STATE', '10000', 'Transaction {} is {} and cannot be {}.'),
+    'credit_card_not_found': (
+        'CREDIT_CARD_NOT_FOUND', '10000', 'No credit card of vaulted shopper {} matches the request.'),
+    'token_not_found': (
+        'TOKEN_NOT_FOUND', '14041', 'Could not find token'),
+    'token_without_payment_method': (
+        'NO_PAYMENT_METHOD', '14042', 'Token is not associated with a payment method'),
+}
+
+# Card errors of the sandbox test cards, by (card number, expiration month, expiration year)
+DECLINED_CARDS = {
+    ('4917484589897107', 4, 2018): 'card_expired',
+    ('4917484589897107', 5, 2018): 'insufficient_funds',
+    ('4917484589897107', 8, 2018): 'invalid_card_number',
+    ('378282246310005', 5, 2018): 'incorrect_information',
+}
+
+# Scenarios of ERRORS raised as CardError
+CARD_DECLINES = ('card_expired', 'insufficient_funds', 'invalid_card_number', 'incorrect_information')
+
+Card = collections.namedtuple('Card', ['card_type', 'card_number', 'expiration_month', 'expiration_year'])
+
+DEFAULT_CARD = Card('VISA', '4111111111111111', 12, 2030)
+
+_CARD_TYPES = {'3': 'AMEX', '4': 'VISA', '5': 'MASTERCARD', '6': 'DISCOVER'}
+
+_UPPERCASE = re.compile('([A-Z])')
+
+
+class FakeError(Exception):
+    """
+    Raised while handling a request to answer it with an error
+    """
+
+    def __init__(self, status_code, scenario, *args):
+        super(FakeError, self).__init__(scenario, *args)
+        self.status_code = status_code
+        self.scenario = scenario
+        self.arguments = args
+
+
+class _Call(object):
+    """
+    A request being handled
+    """
+
+    def __init__(self, request):
+        url = urlsplit(request.url)
+        self.method = request.method
+        self.path = url.path
+        self.base_url = '{}://{}'.format(url.scheme, url.netloc)
+        self.headers = {name.lower(): value for name, value in request.headers.items()}
+        self.body = request.body
+        self.json = 'json' in self.headers.get('accept', '')
+
+    @property
+    def username(self):
+        try:
+            credentials = base64.b64decode(self.headers['authorization'].split(' ', 1)[1]).decode('utf-8')
+        except (KeyError, IndexError, ValueError):
+            return ''
+        return credentials.split(':', 1)[0]
+
+
+class FakeBlueSnap(object):
+    ROUTES = [
+        ('POST', re.compile(r'/services/2/shoppers'), '_create_shopper'),
+        ('GET', re.compile(r'/services/2/shoppers/([^/]+)'), '_retrieve_shopper'),
+        ('PUT', re.compile(r'/services/2/shoppers/([^/]+)'), '_update_shopper'),
+        ('POST', re.compile(r'/services/2/orders'), '_create_order'),
+        ('POST', re.compile(r'/services/2/payment-fields-tokens'), '_create_token'),
+        ('POST', re.compile(r'/services/2/vaulted-shoppers'), '_create_vaulted_shopper'),
+        ('GET', re.compile(r'/services/2/vaulted-shoppers/merchant/([^/]+)'), '_retrieve_merchant_shopper'),
+        ('GET', re.compile(r'/services/2/vaulted-shoppers/([^/]+)'), '_retrieve_vaulted_shopper'),
+        ('PUT', re.compile(r'/services/2/vaulted-shoppers/([^/]+)'), '_update_vaulted_shopper'),
+        ('POST', re.compile(r'/services/2/transactions'), '_execute_transaction'),
+        ('PUT', re.compile(r'/services/2/transactions'), '_execute_transaction'),
+        ('GET', re.compile(r'/services/2/transactions/([^/]+)'), '_retrieve_transaction'),
+    ]
+
+    def __init__(self, username=None, password=None, declined_cards=None, default_card=DEFAULT_CARD,
+                 decline_rate=0.0, json_codec=None, random=None):
+        """
+        :param username: API username requests must be authenticated with, any if None
+        :param password: API password requests must be authenticated with
+        :param declined_cards: dict of scenarios of ERRORS by (card number, expiration month, expiration year) of the
+            cards to decline, DECLINED_CARDS if None
+        :param default_card: Card of the Hosted Payment Fields tokens no card was bound to, or None to refuse them
+        :param decline_rate: Fraction of the other cards charged or vaulted to decline with one of CARD_DECLINES
+        :param json_codec: bluesnap.jsoncodec.JSONCodec of JSON bodies, the fastest installed if None
+        :param random: random.Random picking the cards to decline, seeded from the system if None
+        """
+        import random as random_module
+
+        import xmltodict
+
+        from .jsoncodec import default_codec
+
+        self.authorization = _basic_authorization(username, password) if username is not None else None
+        self.declined_cards = DECLINED_CARDS if declined_cards is None else declined_cards
+        self.default_card = default_card
+        self.decline_rate = decline_rate
+        self.json_codec = json_codec or default_codec()
+        self.random = random or random_module.Random()
+        self._xmltodict = xmltodict
+
+        # What BlueSnap would store, by id. Shoppers and orders as the XML documents parsed by xmltodict, vaulted
+        # shoppers and transactions as the JSON objects of their responses.
+        self.shoppers = {}
+        self.orders = {}
+        self.vaulted_shoppers = {}
+        self.transactions = {}
+        # Card bound to each Hosted Payment Fields token not used yet, or None
+        self.tokens = {}
+
+        self._ids = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def transport(self, **kwargs):
+        """
+        :param kwargs: Arguments of InMemoryTransport
+        :return: bluesnap.transport.InMemoryTransport answering requests with this fake
+        """
+        from .transport import InMemoryTransport
+
+        kwargs.setdefault('json_codec', self.json_codec)
+        return InMemoryTransport(self.handle, **kwargs)
+
+    def bind_card(self, token, card_number, expiration_month, expiration_year, card_type=None):
+        """
+        Enter a card in the Hosted Payment Fields of token, as a shopper would
+
+        :param card_type: Guessed from card_number if None
+        """
+        with self._lock:
+            if token not in self.tokens:
+                raise KeyError(token)
+            self.tokens[token] = Card(card_type or _CARD_TYPES.get(card_number[:1], 'VISA'), card_number,
+                                      int(expiration_month), int(expiration_year))
+
+    def handle(self, request):
+        """
+        :param request: bluesnap.transport.Request, or any object with its method, url, headers and body
+        :return: Tuple of (status code, headers dict, body bytes)
+        """
+        call = _Call(request)
+        if self.authorization is not None and call.headers.get('authorization') != self.authorization:
+            return self.text(401, 'Unauthorized')
+
+        for method, pattern, name in self.ROUTES:
+            if method != call.method:
+                continue
+            match = pattern.fullmatch(call.path)
+            if match is None:
+                continue
+
+            with self._lock:
+                try:
+                    return getattr(self, name)(call, *match.groups())
+                except FakeError as e:
+                    return self.error(e.status_code, e.scenario, *e.arguments, json=call.json)
+
+        return self.text(404, 'Not Found')
+
+    # ------------------
+    # Responses
+    # ------------------
+
+    def text(self, status_code, text, headers=None):
+        return status_code, dict(headers or {}, **{'content-type': 'text/plain'}), text.encode('utf-8')
+
+    def json(self, status_code, value, headers=None):
+        return status_code, dict(headers or {}, **{'content-type': 'application/json'}), self.json_codec.dumps(value)
+
+    def xml(self, status_code, document, headers=None):
+        """
+        :param document: dict shaped like xmltodict.parse() output, with a single root element
+        """
+        body = self._xmltodict.unparse(document).encode('utf-8')
+        return status_code, dict(headers or {}, **{'content-type': 'application/xml'}), body
+
+    def error(self, status_code, scenario, *args, json=False):
+        """
+        :param scenario: Key of ERRORS
+        :param args: Arguments of its description
+        :param json: Whether to answer a JSON API request
+        """
+        error_name, code, description = ERRORS[scenario]
+        description = description.format(*args)
+
+        if json:
+            message = {'errorName': error_name, 'code': code, 'description': description}
+            if error_name is None:
+                del message['errorName']
+            return self.json(status_code, {'message': [message]})
+
+        message = {'error-name': error_name, 'code': code, 'description': description}
+        if error_name is None:
+            del message['error-name']
+        return self.xml(status_code, {'messages': {'@xmlns': NAMESPACE, 'message': message}})
+
+    def _resource(self, call, status_code, root, value, headers=None):
+        """
+        Answer with a JSON API object, in XML with dashed names if the request asked for XML
+        """
+        if call.json:
+            return self.json(status_code, value, headers)
+        return self.xml(status_code, {root: dict({'@xmlns': NAMESPACE}, **_dashed(value))}, headers)
+
+    def _parse_json(self, call):
+        try:
+            data = self.json_codec.loads(call.body or b'')
+        except ValueError:
+            raise FakeError(400, 'invalid_request', 'The request body is not valid JSON.')
+        if not isinstance(data, dict):
+            raise FakeError(400, 'invalid_request', 'The request body is not a JSON object.')
+        return data
+
+    def _parse_xml(self, call):
+        from pyexpat import ExpatError
+
+        try:
+            return self._xmltodict.parse(call.body or b'')
+        except ExpatError:
+            raise FakeError(400, 'invalid_request', 'The request body is not valid XML.')
+
+    def _decline(self, card=None):
+        """
+        :param card: Card charged or vaulted, None if only its last four digits are known
+        :raises FakeError: if card is one of the declined cards, or drawn to be declined
+        """
+        scenario = None
+        if card is not None:
+            scenario = self.declined_cards.get((card.card_number, card.expiration_month, card.expiration_year))
+        if scenario is None and self.decline_rate and self.random.random() < self.decline_rate:
+            scenario = self.random.choice(CARD_DECLINES)
+        if scenario is not None:
+            raise FakeError(400, scenario)
+
+    # ------------------
+    # XML API
+    # ------------------
+
+    def _xml_card(self, credit_card):
+        """
+        :param credit_card: <credit-card> of a shopper document
+        :return: Card entered, with an empty number if it cannot be read
+        """
+        card_number = credit_card.get('card-number')
+        if card_number is None:
+            encrypted_card_number = credit_card.get('encrypted-card-number') or ''
+            card_number = encrypted_card_number[10:] if encrypted_card_number.startswith('encrypted_') else ''
+        return Card(credit_card.get('card-type'), card_number,
+                    int(credit_card.get('expiration-month') or 0), int(credit_card.get('expiration-year') or 0))
+
+    def _vault_xml_card(self, credit_card_info):
+        """
+        Check the card of a <credit-card-info>, and replace its details by the ones BlueSnap keeps
+        """
+        card = self._xml_card(credit_card_info['credit-card'])
+        self._decline(card)
+        credit_card_info['credit-card'] = {'card-type': card.card_type, 'card-last-four-digits': card.card_number[-4:]}
+        return credit_card_info
+
+    def _find_shopper(self, raw_shopper_id):
+        """
+        :param raw_shopper_id: BlueSnap shopper id, or seller shopper id and seller id separated by a comma
+        :return: Shopper document, or None
+        """
+        shopper_id, _, seller_id = raw_shopper_id.partition(',')
+        if not seller_id:
+            return self.shoppers.get(shopper_id)
+
+        for shopper in self.shoppers.values():
+            if shopper['shopper']['shopper-info'].get('seller-shopper-id') == shopper_id:
+                return shopper
+        return None
+
+    def _not_authorized(self, call, action, raw_shopper_id):
+        """
+        BlueSnap answers requests about shoppers of other merchants, or that don't exist, with a text
+        """
+        shopper_id, _, seller_id = raw_shopper_id.partition(',')
+        return self.text(403, 'User: {} is not authorized to {} {}shopper: {}.'.format(
+            call.username, action, 'seller ' if seller_id else '', shopper_id if seller_id else raw_shopper_id))
+
+    def _create_shopper(self, call):
+        body = self._parse_xml(call)
+        shopper_info = body['shopper']['shopper-info']
+
+        credit_cards_info = (shopper_info.get('payment-info') or {}).get('credit-cards-info') or {}
+        credit_card_infos = _as_list(credit_cards_info.get('credit-card-info'))
+        credit_card_infos = [self._vault_xml_card(credit_card_info) for credit_card_info in credit_card_infos]
+
+        shopper_id = str(next(self._ids))
+        shopper_info['shopper-id'] = shopper_id
+        shopper_info['username'] = 'username_%s' % shopper_id
+        shopper_info['password'] = 'password_%s' % shopper_id
+        shopper_info['shipping-contact-info'] = None
+        shopper_info['invoice-contacts-info'] = {
+            'invoice-contact-info': dict(default='true', **shopper_info['shopper-contact-info']),
+        }
+        shopper_info['payment-info'] = {'credit-cards-info': {'credit-card-info': credit_card_infos}}
+
+        self.shoppers[shopper_id] = body
+        return 201, {'location': '%s/services/2/shoppers/%s' % (call.base_url, shopper_id)}, b''
+
+    def _retrieve_shopper(self, call, raw_shopper_id):
+        shopper = self._find_shopper(raw_shopper_id)
+        if shopper is None:
+            return self._not_authorized(call, 'view', raw_shopper_id)
+        return self.xml(200, shopper)
+
+    def _update_shopper(self, call, raw_shopper_id):
+        shopper = self._find_shopper(raw_shopper_id)
+        if shopper is None:
+            return self._not_authorized(call, 'update', raw_shopper_id)
+
+        shopper_info = shopper['shopper']['shopper-info']
+        update = self._parse_xml(call)['shopper']['shopper-info']
+
+        credit_cards_info = (update.get('payment-info') or {}).get('credit-cards-info') or {}
+        credit_card_infos = [self._vault_xml_card(credit_card_info)
+                             for credit_card_info in _as_list(credit_cards_info.get('credit-card-info'))]
+
+        if update.get('shopper-contact-info'):
+            shopper_info['shopper-contact-info'] = update['shopper-contact-info']
+        shopper_info['payment-info']['credit-cards-info']['credit-card-info'].extend(credit_card_infos)
+
+        return 204, {}, b''
+
+    def _create_order(self, call):
+        body = self._parse_xml(call)
+        order = body['order']
+        ordering_shopper = order['ordering-shopper']
+
+        raw_shopper_id = ordering_shopper.get('shopper-id') or ''
+        shopper = self._find_shopper(raw_shopper_id)
+        if shopper is None:
+            return self._not_authorized(call, 'place an order for', raw_shopper_id)
+
+        credit_card = ordering_shopper.get('credit-card')
+        if credit_card is None:
+            raise FakeError(400, 'order_failed__no_payment_method')
+
+        credit_card_infos = shopper['shopper']['shopper-info']['payment-info']['credit-cards-info']['credit-card-info']
+        if not any(dict(credit_card_info['credit-card']) == dict(credit_card)
+                   for credit_card_info in credit_card_infos):
+            raise FakeError(400, 'order_failed__wrong_payment_details')
+        self._decline()
+
+        order_id = str(next(self._ids))
+        order_date = datetime.datetime.now().strftime('%d-%b-%y')
+        order['order-id'] = order_id
+
+        cart = order['cart']
+        sku = cart['cart-item']['sku']
+        sku_charge_price = sku['sku-charge-price']
+        cart['charged-currency'] = sku_charge_price['currency']
+        cart['cart-item']['item-sub-total'] = sku_charge_price['amount']
+        cart['tax'] = '0.00'
+        cart['tax-rate'] = '0'
+        cart['total-cart-cost'] = sku_charge_price['amount']
+
+        order['post-sale-info'] = {
+            'invoices': {
+                'invoice': {
+                    'invoice-id': 'invoice_%s' % order_id,
+                    'url': '%s/jsp/show_invoice.jsp' % call.base_url,
+                    'financial-transactions': {
+                        'financial-transaction': {
+                            'status': 'Pending',
+                            'date-due': order_date,
+                            'date-created': order_date,
+                            'amount': sku_charge_price['amount'],
+                            'currency': sku_charge_price['currency'],
+                            'soft-descriptor': 'BLS*%s' % (order.get('soft-descriptor') or ''),
+                            'payment-method': 'Credit Card',
+                            'target-balance': 'PLIMUS_ACCOUNT',
+                            'credit-card': credit_card,
+                            'paypal-transaction-data': None,
+                            'skus': {
+                                'sku': {
+                                    'sku-id': sku['sku-id'],
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        }
+
+        self.orders[order_id] = body
+        return self.xml(200, body)
+
+    # ------------------
+    # JSON API
+    # ------------------
+
+    def _create_token(self, call):
+        token = uuid.uuid4().hex + '_'
+        self.tokens[token] = None
+        return 201, {'location': '%s/services/2/payment-fields-tokens/%s' % (call.base_url, token)}, b''
+
+    def _use_token(self, token):
+        """
+        :return: Card bound to token, which cannot be used again
+        """
+        if token not in self.tokens:
+            raise FakeError(400, 'token_not_found')
+
+        card = self.tokens.pop(token) or self.default_card
+        if card is None:
+            raise FakeError(400, 'token_without_payment_method')
+        return card
+
+    def _vault_card(self, credit_card_info):
+        """
+        :param credit_card_info: creditCardInfo of a vaulted shopper request
+        :return: creditCardInfo of the vaulted shopper
+        """
+        if not credit_card_info.get('pfToken'):
+            raise FakeError(400, 'invalid_request', 'Only cards entered in Hosted Payment Fields can be vaulted.')
+
+        card = self._use_token(credit_card_info['pfToken'])
+        self._decline(card)
+
+        vaulted = {}
+        if credit_card_info.get('billingContactInfo'):
+            vaulted['billingContactInfo'] = credit_card_info['billingContactInfo']
+        vaulted['creditCard'] = _json_card(card)
+        return vaulted
+
+    def _find_vaulted_shopper(self, vaulted_shopper_id):
+        vaulted_shopper = self.vaulted_shoppers.get(str(vaulted_shopper_id))
+        if vaulted_shopper is None:
+            raise FakeError(400, 'shopper_not_found', vaulted_shopper_id)
+        return vaulted_shopper
+
+    def _create_vaulted_shopper(self, call):
+        data = self._parse_json(call)
+        for field in ('firstName', 'lastName'):
+            if not data.get(field):
+                raise FakeError(400, 'invalid_request', '%s is required.' % field)
+
+        credit_card_infos = (data.pop('paymentSources', None) or {}).get('creditCardInfo') or []
+        vaulted_shopper = dict({'vaultedShopperId': next(self._ids)}, **data)
+        vaulted_shopper['paymentSources'] = {
+            'creditCardInfo': [self._vault_card(credit_card_info) for credit_card_info in credit_card_infos],
+        }
+
+        self.vaulted_shoppers[str(vaulted_shopper['vaultedShopperId'])] = vaulted_shopper
+        return self._resource(call, 200, 'vaulted-shopper', vaulted_shopper)
+
+    def _retrieve_vaulted_shopper(self, call, vaulted_shopper_id):
+        return self._resource(call, 200, 'vaulted-shopper', self._find_vaulted_shopper(vaulted_shopper_id))
+
+    def _retrieve_merchant_shopper(self, call, merchant_shopper_id):
+        for vaulted_shopper in self.vaulted_shoppers.values():
+            if str(vaulted_shopper.get('merchantShopperId')) == merchant_shopper_id:
+                return self._resource(call, 200, 'vaulted-shopper', vaulted_shopper)
+        raise FakeError(400, 'shopper_not_found', merchant_shopper_id)
+
+    def _update_vaulted_shopper(self, call, vaulted_shopper_id):
+        vaulted_shopper = self._find_vaulted_shopper(vaulted_shopper_id)
+        data = self._parse_json(call)
+
+        credit_card_infos = (data.pop('paymentSources', None) or {}).get('creditCardInfo') or []
+        vaulted = vaulted_shopper['paymentSources']['creditCardInfo']
+        added = []
+        for credit_card_info in credit_card_infos:
+            if credit_card_info.get('status') == 'D':
+                credit_card = credit_card_info.get('creditCard') or {}
+                remaining = [info for info in vaulted if not _selects(credit_card, info['creditCard'])]
+                if len(remaining) == len(vaulted):
+                    raise FakeError(400, 'credit_card_not_found', vaulted_shopper_id)
+                vaulted[:] = remaining
+            else:
+                added.append(self._vault_card(credit_card_info))
+
+        vaulted.extend(added)
+        vaulted_shopper.update(data)
+        return self._resource(call, 200, 'vaulted-shopper', vaulted_shopper)
+
+    def _execute_transaction(self, call):
+        data = self._parse_json(call)
+        card_transaction_type = data.get('cardTransactionType')
+
+        if card_transaction_type in ('AUTH_ONLY', 'AUTH_CAPTURE'):
+            return self._authorize(call, data)
+        if card_transaction_type == 'CAPTURE':
+            return self._capture(call, data)
+        if card_transaction_type == 'AUTH_REVERSAL':
+            return self._reverse(call, data)
+        raise FakeError(400, 'invalid_request', 'cardTransactionType %s is not supported.' % card_transaction_type)
+
+    def _authorize(self, call, data):
+        for field in ('amount', 'currency'):
+            if data.get(field) in (None, ''):
+                raise FakeError(400, 'invalid_request', '%s is required.' % field)
+
+        if data.get('vaultedShopperId'):
+            vaulted_shopper = self._find_vaulted_shopper(data['vaultedShopperId'])
+            credit_card_infos = vaulted_shopper['paymentSources']['creditCardInfo']
+            if data.get('creditCard'):
+                credit_card_infos = [info for info in credit_card_infos
+                                     if _selects(data['creditCard'], info['creditCard'])]
+            if len(credit_card_infos) != 1:
+                raise FakeError(400, 'credit_card_not_found', data['vaultedShopperId'])
+            credit_card = credit_card_infos[0]['creditCard']
+            self._decline()
+        elif data.get('pfToken'):
+            card = self._use_token(data['pfToken'])
+            self._decline(card)
+            credit_card = _json_card(card)
+
+            # BlueSnap vaults the shopper of a token
+            card_holder_info = data.get('cardHolderInfo') or {}
+            vaulted_shopper = dict({'vaultedShopperId': next(self._ids)}, **card_holder_info)
+            vaulted_shopper['paymentSources'] = {'creditCardInfo': [{'creditCard': credit_card}]}
+            self.vaulted_shoppers[str(vaulted_shopper['vaultedShopperId'])] = vaulted_shopper
+        else:
+            raise FakeError(400, 'invalid_request', 'vaultedShopperId or pfToken is required.')
+
+        now = datetime.datetime.now()
+        transaction = {
+            'cardTransactionType': data['cardTransactionType'],
+            'transactionId': str(next(self._ids)),
+            'requestedAmount': float(data['amount']),
+            'amount': float(data['amount']),
+            'currency': data['currency'],
+            'vaultedShopperId': vaulted_shopper['vaultedShopperId'],
+            'cardHolderInfo': {field: vaulted_shopper[field] for field in ('firstName', 'lastName', 'email', 'zip')
+                               if field in vaulted_shopper},
+            'creditCard': credit_card,
+            'processingInfo': {
+                'processingStatus': 'success',
+                'cvvResponseCode': 'ND',
+                'authorizationCode': '654321',
+                'avsResponseCodeZip': 'U',
+                'avsResponseCodeAddress': 'U',
+                'avsResponseCodeName': 'U',
+            },
+            'transactionApprovalDate': now.strftime('%m/%d/%Y'),
+            'transactionApprovalTime': now.strftime('%H:%M:%S'),
+        }
+        for field in ('transactionInitiator', 'merchantTransactionId', 'softDescriptor', 'descriptorPhoneNumber',
+                      'transactionOrderSource', 'level3Data', 'transactionMetaData'):
+            if field in data:
+                transaction[field] = data[field]
+
+        self.transactions[transaction['transactionId']] = transaction
+        return self.json(200, transaction)
+
+    def _find_authorization(self, data, action):
+        transaction_id = str(data.get('transactionId') or '')
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            raise FakeError(400, 'transaction_not_found', transaction_id)
+        if transaction['cardTransactionType'] != 'AUTH_ONLY':
+            raise FakeError(400, 'invalid_transaction_state', transaction_id, transaction['cardTransactionType'],
+                            action)
+        return transaction
+
+    def _capture(self, call, data):
+        transaction = self._find_authorization(data, 'captured')
+        if data.get('amount') not in (None, ''):
+            amount = float(data['amount'])
+            if amount > transaction['amount']:
+                raise FakeError(400, 'invalid_request', 'The amount cannot exceed the authorized amount.')
+            transaction['amount'] = amount
+
+        transaction['cardTransactionType'] = 'CAPTURE'
+        for field in ('softDescriptor', 'level3Data', 'transactionMetaData'):
+            if field in data:
+                transaction[field] = data[field]
+        return self.json(200, transaction)
+
+    def _reverse(self, call, data):
+        transaction = self._find_authorization(data, 'reversed')
+        transaction['cardTransactionType'] = 'AUTH_REVERSAL'
+        return self.json(200, transaction)
+
+    def _retrieve_transaction(self, call, transaction_id):
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            raise FakeError(400, 'transaction_not_found', transaction_id)
+        return self._resource(call, 200, 'card-transaction', transaction)
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _json_card(card):
+    """
+    :return: creditCard object of card, as BlueSnap keeps it
+    """
+    return {
+        'cardLastFourDigits': card.card_number[-4:],
+        'cardType': card.card_type,
+        'expirationMonth': str(card.expiration_month),
+        'expirationYear': str(card.expiration_year),
+    }
+
+
+def _selects(selection, credit_card):
+    """
+    :return: Whether the creditCard object selection of a request designates credit_card
+    """
+    return all(str(credit_card.get(field)) == str(value) for field, value in selection.items()
+               if value is not None)
+
+
+def _dashed(value):
+    """
+    :return: JSON API value with the dashed names of the XML API, e.g. vaulted-shopper-id for vaultedShopperId
+    """
+    if isinstance(value, dict):
+        return {_UPPERCASE.sub(r'-\1', name).lower(): _dashed(item) for name, item in value.items()}
+    if isinstance(value, list):
+        return [_dashed(item) for item in value]
+    return value
@@ -0,0 +1,321 @@
+"""
+Local BlueSnap stand-in server, for load tests.
+
+Serves bluesnap.fake.FakeBlueSnap over HTTP, so that load tests go through real sockets, connection pools and
+timeouts, and injects what BlueSnap under load does: latency drawn from a distribution, server errors, dropped
+connections, throttling with Retry-After, and card declines.
+
+    python -m bluesnap.fakeserver --port 8080 --latency lognormal:0.15,0.5 --latency transactions=lognormal:0.4,0.6 \\
+        --error-rate 0.01 --reset-rate 0.005 --rate-limit 50/100 --decline-rate 0.05
+
+Clients are pointed at it by replacing the URL of their environment:
+
+    client.ENDPOINTS = dict(client.ENDPOINTS, sandbox='http://127.0.0.1:8080')
+
+Latencies, rate limits and throttling apply by endpoint class, as bluesnap.ratelimit.RateLimiter names them
+('transactions', 'vaulted-shoppers', 'payment-fields-tokens', 'shoppers' or 'orders'), with defaults for the others.
+"""
+import argparse
+import math
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from random import Random
+from urllib.parse import urlsplit
+
+from .fake import FakeBlueSnap
+from .ratelimit import RateLimiter
+from .transport import Request
+
+
+class Latency(object):
+    """
+    Distribution of the time taken to answer requests, in seconds
+    """
+
+    # Parameters of each distribution
+    DISTRIBUTIONS = {
+        'constant': ('seconds',),
+        'uniform': ('low', 'high'),
+        'normal': ('mean', 'stddev'),
+        'lognormal': ('median', 'sigma'),
+        'exponential': ('mean',),
+    }
+
+    def __init__(self, distribution, *params):
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError('distribution must be one of {}.'.format(', '.join(sorted(self.DISTRIBUTIONS))))
+        if len(params) != len(self.DISTRIBUTIONS[distribution]):
+            raise ValueError('{} latency takes {}.'.format(distribution, ', '.join(self.DISTRIBUTIONS[distribution])))
+        if any(param < 0 for param in params):
+            raise ValueError('Latency parameters must not be negative.')
+
+        self.distribution = distribution
+        self.params = tuple(float(param) for param in params)
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        :param spec: Distribution and parameters, e.g. 'constant:0.05', 'uniform:0.02,0.2' or 'lognormal:0.15,0.5'
+        """
+        distribution, _, params = spec.partition(':')
+        try:
+            params = [float(param) for param in params.split(',')] if params else []
+        except ValueError:
+            raise ValueError('Invalid latency: {}'.format(spec))
+        return cls(distribution, *params)
+
+    def sample(self, random):
+        """
+        :param random: random.Random
+        :return: Seconds to wait
+        """
+        params = self.params
+        if self.distribution == 'constant':
+            return params[0]
+        if self.distribution == 'uniform':
+            return random.uniform(*params)
+        if self.distribution == 'normal':
+            return max(0.0, random.gauss(*params))
+        if self.distribution == 'lognormal':
+            return random.lognormvariate(math.log(params[0]), params[1]) if params[0] else 0.0
+        return random.expovariate(1 / params[0]) if params[0] else 0.0
+
+    def __repr__(self):
+        return 'Latency({!r}, {})'.format(self.distribution, ', '.join(map(repr, self.params)))
+
+
+class FakeServer(object):
+    # Statuses of the injected server errors
+    ERROR_STATUS_CODES = (500, 502, 503)
+
+    def __init__(self, fake=None, host='127.0.0.1', port=0, latency=None, latencies=None, error_rate=0.0,
+                 reset_rate=0.0, rate_limits=None, default_rate_limit=None, random=None):
+        """
+        :param fake: FakeBlueSnap answering requests, one accepting any credentials if None
+        :param port: Port to listen on, any free one if 0
+        :param latency: Latency of the endpoint classes missing from latencies, None for none
+        :param latencies: dict of endpoint class to Latency
+        :param error_rate: Fraction of requests answered with one of ERROR_STATUS_CODES
+        :param reset_rate: Fraction of requests whose connection is closed without an answer
+        :param rate_limits: dict of endpoint class to the rate, in requests per second, or (rate, burst) tuple beyond
+            which requests are throttled, as RateLimiter takes them
+        :param default_rate_limit: Rate limit of the endpoint classes missing from rate_limits, None for none
+        :param random: random.Random drawing latencies and faults, seeded from the system if None
+        """
+        self.fake = fake or FakeBlueSnap()
+        self.latency = latency
+        self.latencies = dict(latencies or {})
+        self.error_rate = error_rate
+        self.reset_rate = reset_rate
+        self.rate_limiter = None
+        if rate_limits or default_rate_limit is not None:
+            self.rate_limiter = RateLimiter(rate_limits, default_rate_limit)
+        self.random = random or Random()
+
+        # Number of requests by outcome: 'answered', 'throttled', 'errors' and 'resets'
+        self.counts = dict.fromkeys(('answered', 'throttled', 'errors', 'resets'), 0)
+        self._lock = threading.Lock()
+
+        self.server = _ThreadingHTTPServer((host, port), _handler(self))
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        Endpoint URL of the server, to use as the endpoint of a client environment
+        """
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        """
+        Serve from a daemon thread, until close()
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name='bluesnap-fakeserver', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._thread is not None:
+            self.server.shutdown()
+            self._thread = None
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def _count(self, outcome):
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def _draw(self, rate):
+        if not rate:
+            return False
+        with self._lock:
+            return self.random.random() < rate
+
+    def _delay(self, path):
+        latency = self.latencies.get(RateLimiter.endpoint_class(path), self.latency)
+        if latency is None:
+            return 0.0
+        with self._lock:
+            return latency.sample(self.random)
+
+    def answer(self, request):
+        """
+        :param request: bluesnap.transport.Request
+        :return: Tuple of (status code, headers dict, body bytes), or None to close the connection without answering
+        """
+        path = urlsplit(request.url).path
+
+        if self.rate_limiter is not None:
+            bucket = self.rate_limiter.bucket(path)
+            if bucket is not None and bucket.reserve(max_wait=0) is None:
+                self._count('throttled')
+                retry_after = str(max(1, math.ceil(1 / bucket.rate)))
+                return self.fake.text(429, 'Too many requests', {'retry-after': retry_after})
+
+        delay = self._delay(path)
+        if delay:
+            time.sleep(delay)
+
+        if self._draw(self.reset_rate):
+            self._count('resets')
+            return None
+        if self._draw(self.error_rate):
+            self._count('errors')
+            with self._lock:
+                status_code = self.random.choice(self.ERROR_STATUS_CODES)
+            return self.fake.text(status_code, 'Server error')
+
+        self._count('answered')
+        return self.fake.handle(request)
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    # http.server.ThreadingHTTPServer, which only exists from Python 3.7
+    daemon_threads = True
+
+
+def _handler(server):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Don't let responses wait for delayed ACKs, headers and body are written separately
+        disable_nagle_algorithm = True
+
+        def handle_request(self):
+            length = int(self.headers.get('content-length') or 0)
+            body = self.rfile.read(length) if length else None
+            url = 'http://{}{}'.format(self.headers.get('host') or '{}:{}'.format(*self.server.server_address[:2]),
+                                       self.path)
+
+            response = server.answer(Request(self.command, url, dict(self.headers.items()), body))
+            if response is None:
+                self.close_connection = True
+                return
+
+            status_code, headers, body = response
+            self.send_response(status_code)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('content-length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PUT = do_DELETE = handle_request
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def _by_endpoint_class(values, parse):
+    """
+    :param values: Command line values, each '[endpoint class=]value'
+    :return: Tuple of (value without endpoint class or None, dict of values by endpoint class)
+    """
+    default, by_class = None, {}
+    for value in values or ():
+        endpoint_class, _, value = value.rpartition('=')
+        if endpoint_class:
+            by_class[endpoint_class] = parse(value)
+        else:
+            default = parse(value)
+    return default, by_class
+
+
+def _rate_limit(value):
+    """
+    :param value: 'rate' or 'rate/burst', in requests per second
+    """
+    rate, _, burst = value.partition('/')
+    return (float(rate), float(burst)) if burst else float(rate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m bluesnap.fakeserver', description=__doc__.strip().split('\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--username', help='API username to require, any if not given')
+    parser.add_argument('--password', help='API password to require')
+    parser.add_argument('--latency', action='append', metavar='[CLASS=]DISTRIBUTION:PARAMS',
+                        help='Latency of an endpoint class, or of all others, e.g. lognormal:0.15,0.5 or '
+                             'transactions=uniform:0.1,0.3. Distributions: {}.'.format(', '.join(
+                                 '{}:{}'.format(name, ','.join(params))
+                                 for name, params in sorted(Latency.DISTRIBUTIONS.items()))))
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests answered with a 500, 502 or 503 error')
+    parser.add_argument('--reset-rate', type=float, default=0.0,
+                        help='Fraction of requests whose connection is closed without an answer')
+    parser.add_argument('--rate-limit', action='append', metavar='[CLASS=]RATE[/BURST]',
+                        help='Requests per second of an endpoint class, or of all others, beyond which requests are '
+                             'throttled with a 429 and a Retry-After header')
+    parser.add_argument('--decline-rate', type=float, default=0.0,
+                        help='Fraction of charged or vaulted cards declined with a card error, besides the declined '
+                             'sandbox test cards')
+    parser.add_argument('--seed', type=int, help='Seed of the random draws, to replay a run')
+    args = parser.parse_args(argv)
+
+    try:
+        latency, latencies = _by_endpoint_class(args.latency, Latency.parse)
+        default_rate_limit, rate_limits = _by_endpoint_class(args.rate_limit, _rate_limit)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Declines and faults are drawn independently, from generators both derived from the seed
+    random = Random(args.seed)
+    server_random = Random(random.getrandbits(64))
+
+    fake = FakeBlueSnap(username=args.username, password=args.password, decline_rate=args.decline_rate,
+                        random=random)
+    server = FakeServer(fake, args.host, args.port, latency=latency, latencies=latencies, error_rate=args.error_rate,
+                        reset_rate=args.reset_rate, rate_limits=rate_limits, default_rate_limit=default_rate_limit,
+                        random=server_random)
+
+    print('Serving a fake BlueSnap on {}'.format(server.url), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print('Requests: {}'.format(', '.join('{} {}'.format(count, outcome)
+                                              for outcome, count in server.stats().items())))
+
+
+if __name__ == '__main__':
+    main()
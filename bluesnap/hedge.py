@@ -0,0 +1,108 @@
+"""
+Hedged requests.
+
+When a read has not been answered after the usual latency of its endpoint, a HedgePolicy lets the client send an
+identical second request on another pooled connection. Whichever response arrives first is used and the other
+request is cancelled, which cuts the tail latency caused by the occasional slow BlueSnap response at the cost of a
+few extra requests.
+
+The hedge delay is a percentile of the recent latencies of each endpoint, so that only the slowest calls (about 5%
+with the default percentile) are hedged. Only idempotent methods may be hedged.
+"""
+import collections
+import math
+import threading
+
+from .breaker import CircuitBreakerRegistry
+
+
+class HedgePolicy(object):
+    def __init__(self,
+                 percentile=95,
+                 initial_delay=0.5,
+                 min_delay=0.01,
+                 max_delay=None,
+                 window_size=200,
+                 minimum_samples=20,
+                 methods=('GET',)):
+        """
+        :param percentile: Latency percentile of an endpoint after which a hedge is sent
+        :param initial_delay: Hedge delay, in seconds, used until an endpoint has minimum_samples latencies
+        :param min_delay: Lower bound of the hedge delay, in seconds
+        :param max_delay: Upper bound of the hedge delay, in seconds, or None
+        :param window_size: Number of most recent latencies the percentile is computed over, per endpoint
+        :param minimum_samples: Number of latencies needed before the percentile is used
+        :param methods: HTTP methods that are hedged. They must be idempotent.
+        """
+        if not 0 < percentile < 100:
+            raise ValueError('percentile must be between 0 and 100.')
+
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.window_size = window_size
+        self.minimum_samples = minimum_samples
+        self.methods = set(methods)
+
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._counters = {}
+
+    def _endpoint(self, method, path):
+        return CircuitBreakerRegistry.endpoint_path(method, path)
+
+    def _counter(self, endpoint):
+        counter = self._counters.get(endpoint)
+        if counter is None:
+            counter = self._counters[endpoint] = {'requests': 0, 'hedges_fired': 0, 'hedges_won': 0}
+        return counter
+
+    def delay(self, method, path):
+        """
+        :return: Seconds to wait for a response before sending a hedge, or None if the request must not be hedged
+        """
+        if method not in self.methods:
+            return None
+
+        endpoint = self._endpoint(method, path)
+        with self._lock:
+            self._counter(endpoint)['requests'] += 1
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or len(latencies) < self.minimum_samples:
+                delay = self.initial_delay
+            else:
+                ordered = sorted(latencies)
+                delay = ordered[min(len(ordered) - 1, int(math.ceil(len(ordered) * self.percentile / 100.0)) - 1)]
+
+        delay = max(delay, self.min_delay)
+        if self.max_delay is not None:
+            delay = min(delay, self.max_delay)
+        return delay
+
+    def record(self, method, path, duration):
+        """
+        Record the latency of a request, hedge or not, that received a response
+        """
+        endpoint = self._endpoint(method, path)
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None:
+                latencies = self._latencies[endpoint] = collections.deque(maxlen=self.window_size)
+            latencies.append(duration)
+
+    def hedge_fired(self, method, path):
+        with self._lock:
+            self._counter(self._endpoint(method, path))['hedges_fired'] += 1
+
+    def hedge_won(self, method, path):
+        with self._lock:
+            self._counter(self._endpoint(method, path))['hedges_won'] += 1
+
+    def stats(self):
+        """
+        :return: dict of endpoint path to its number of hedgeable requests, hedges fired and hedges that answered
+            first, for metrics
+        """
+        with self._lock:
+            return {endpoint: dict(counter) for endpoint, counter in self._counters.items()}
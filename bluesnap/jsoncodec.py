@@ -0,0 +1,79 @@
+"""
+Encoding of JSON API requests and decoding of their responses.
+
+Request payloads are encoded straight to compact UTF-8 bytes, and responses decoded straight from the response bytes,
+without an intermediate str. default_codec() picks the fastest backend installed: orjson, then ujson, then the
+standard library. Any object with compatible dumps() and loads() methods can be passed to a client as json_codec.
+"""
+import json
+
+
+class JSONCodec(object):
+    name = None
+
+    def dumps(self, data):
+        """
+        :return: data as compact JSON, in UTF-8 bytes
+        """
+        raise NotImplementedError
+
+    def loads(self, content):
+        """
+        :param content: JSON document, as bytes or str
+        :raises ValueError: if content is not valid JSON
+        """
+        raise NotImplementedError
+
+
+class StdlibJSONCodec(JSONCodec):
+    name = 'json'
+
+    def dumps(self, data):
+        return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+    def loads(self, content):
+        # json.loads only takes bytes from Python 3.6
+        return json.loads(content.decode('utf-8') if isinstance(content, (bytes, bytearray)) else content)
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        # Like the standard library, serialize non-str keys (e.g. ints) as strings
+        self._options = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, data):
+        return self._orjson.dumps(data, option=self._options)
+
+    def loads(self, content):
+        return self._orjson.loads(content)
+
+
+class UjsonCodec(JSONCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._ujson = ujson
+
+    def dumps(self, data):
+        return self._ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+    def loads(self, content):
+        return self._ujson.loads(content)
+
+
+def default_codec():
+    """
+    :return: Codec of the fastest JSON library installed
+    :rtype: JSONCodec
+    """
+    for codec_class in (OrjsonCodec, UjsonCodec):
+        try:
+            return codec_class()
+        except ImportError:
+            continue
+    return StdlibJSONCodec()
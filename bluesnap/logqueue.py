@@ -0,0 +1,139 @@
+"""
+Off-thread logging of BlueSnap traffic.
+
+With a LogQueue, a client only captures what it logs on the request thread: the logger, the message, and references
+to the request or response, along with the time and thread of the call. A background thread then formats, redacts
+and emits the records, so that slow log handlers and large bodies no longer add to the latency of payment calls.
+
+The queue is bounded. When handlers fall behind, new records are dropped rather than blocking requests or growing
+memory without bounds, counted in stats() and reported by a warning once the queue drains. A LogQueue may be shared
+between clients, it is flushed at interpreter exit.
+"""
+import atexit
+import queue
+import threading
+import time
+
+
+_STOP = object()
+
+
+class LogQueue(object):
+    def __init__(self, maxsize=1000):
+        """
+        :param maxsize: Maximum number of records waiting to be emitted, further ones are dropped
+        """
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1.')
+
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        self.dropped = 0
+        self.emitted = 0
+        self.errors = 0
+        self._reported_dropped = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """
+        Start the background thread. Called by log() if needed.
+        """
+        with self._lock:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._run, name='bluesnap-log-queue', daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def close(self):
+        """
+        Emit the records already queued and stop the background thread. Records logged afterwards are dropped.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        atexit.unregister(self.close)
+
+    def flush(self):
+        """
+        Block until all the records queued so far are emitted
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def log(self, logger, level, msg, *args):
+        """
+        Queue a record, the caller has checked that logger is enabled for level. Arguments are only formatted by the
+        background thread.
+        """
+        if self._thread is None:
+            self.start()
+
+        current_thread = threading.current_thread()
+        item = (logger, level, msg, args, time.time(), current_thread.ident, current_thread.name)
+
+        # Queued under the lock close() takes to stop the thread, so that a record is either queued before the stop,
+        # or dropped and counted
+        with self._lock:
+            if not self._closed:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    pass
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._emit(*item)
+            finally:
+                self._queue.task_done()
+
+    def _emit(self, logger, level, msg, args, created, thread, thread_name):
+        try:
+            record = logger.makeRecord(logger.name, level, __file__, 0, msg, args, None, func='log')
+            # As if it was emitted when and where it was logged
+            record.relativeCreated -= (record.created - created) * 1000
+            record.created = created
+            record.msecs = (created - int(created)) * 1000
+            record.thread = thread
+            record.threadName = thread_name
+            logger.handle(record)
+            self.emitted += 1
+        except Exception:
+            self.errors += 1
+
+        if self.dropped > self._reported_dropped and self._queue.empty():
+            dropped, self._reported_dropped = self.dropped - self._reported_dropped, self.dropped
+            logger.warning('Dropped %d Bluesnap log records, the log queue was full', dropped)
+
+    def stats(self):
+        """
+        :return: dict of the queue size and counters, for metrics
+        """
+        return {
+            'pending': self._queue.qsize(),
+            'dropped': self.dropped,
+            'emitted': self.emitted,
+            'errors': self.errors,
+        }
@@ -51,14 +51,14 @@ class PlainCreditCard(AbstractCreditCard):
 
         :return: lxml.etree._Element
         """
-        E = self.client.E
-
-        return getattr(E, 'credit-card')(
-            getattr(E, 'card-number')(self.card_number),
-            getattr(E, 'card-type')(self.card_type),
-            getattr(E, 'expiration-month')(str(self.expiration_month)),
-            getattr(E, 'expiration-year')(str(self.expiration_year)),
-            getattr(E, 'security-code')(self.security_code)
+        T = self.client.tags
+
+        return T['credit-card'](
+            T['card-number'](self.card_number),
+            T['card-type'](self.card_type),
+            T['expiration-month'](str(self.expiration_month)),
+            T['expiration-year'](str(self.expiration_year)),
+            T['security-code'](self.security_code)
         )
 
 
@@ -88,14 +88,14 @@ class EncryptedCreditCard(AbstractCreditCard):
 
         :return: lxml.etree._Element
         """
-        E = self.client.E
-
-        return getattr(E, 'credit-card')(
-            getattr(E, 'encrypted-card-number')(self.encrypted_card_number),
-            getattr(E, 'card-type')(self.card_type),
-            getattr(E, 'expiration-month')(str(self.expiration_month)),
-            getattr(E, 'expiration-year')(str(self.expiration_year)),
-            getattr(E, 'encrypted-security-code')(self.encrypted_security_code)
+        T = self.client.tags
+
+        return T['credit-card'](
+            T['encrypted-card-number'](self.encrypted_card_number),
+            T['card-type'](self.card_type),
+            T['expiration-month'](str(self.expiration_month)),
+            T['expiration-year'](str(self.expiration_year)),
+            T['encrypted-security-code'](self.encrypted_security_code)
         )
 
 
@@ -118,11 +118,11 @@ class CreditCardSelection(AbstractCreditCard):
 
         :return: lxml.etree._Element
         """
-        E = self.client.E
+        T = self.client.tags
 
-        return getattr(E, 'credit-card')(
-            getattr(E, 'card-last-four-digits')(self.card_last_four_digits),
-            getattr(E, 'card-type')(self.card_type),
+        return T['credit-card'](
+            T['card-last-four-digits'](self.card_last_four_digits),
+            T['card-type'](self.card_type),
         )
 
 
@@ -148,12 +148,12 @@ class WebInfo(Model):
 
         :return: lxml.etree._Element
         """
-        E = self.client.E
+        T = self.client.tags
 
-        return getattr(E, 'web-info')(
-            E.ip(self.ip),
-            getattr(E, 'remote-host')(self.remote_host),
-            getattr(E, 'user-agent')(self.user_agent)
+        return T['web-info'](
+            T['ip'](self.ip),
+            T['remote-host'](self.remote_host),
+            T['user-agent'](self.user_agent)
         )
 
 
@@ -195,20 +195,20 @@ class ContactInfo(Model):
 
         :return: lxml.etree._Element
         """
-        E = self.client.E
+        T = self.client.tags
 
         if element_name:
             element_name += '-contact-info'
         else:
             element_name = 'contact-info'
 
-        return getattr(E, element_name)(
-            getattr(E, 'first-name')(self.first_name),
-            getattr(E, 'last-name')(self.last_name),
-            E.email(self.email),
-            E.address1(self.address_1),
-            E.city(self.city),
-            E.zip(self.zip),
-            E.country(self.country),
-            E.phone(self.phone)
+        return T[element_name](
+            T['first-name'](self.first_name),
+            T['last-name'](self.last_name),
+            T['email'](self.email),
+            T['address1'](self.address_1),
+            T['city'](self.city),
+            T['zip'](self.zip),
+            T['country'](self.country),
+            T['phone'](self.phone)
         )
@@ -0,0 +1,176 @@
+"""
+Client-side rate limiting.
+
+A RateLimiter holds one token bucket per endpoint class (transactions, vaulted-shoppers, payment-fields-tokens,
+...). Client.request takes a token before every call, blocking (or awaiting, for AsyncClient) until one is
+available, and pauses the bucket when BlueSnap answers with a throttling status so that the next calls honour its
+Retry-After header instead of tripping the throttling again.
+"""
+import datetime
+import email.utils
+import threading
+import time
+
+
+class TokenBucket(object):
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param rate: Tokens added per second, i.e. the sustained number of requests per second
+        :param burst: Maximum number of tokens the bucket can hold, defaults to rate (at least 1)
+        :param clock: Monotonic clock, in seconds
+        :param sleep: Function used to block until a token is available
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive.')
+
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, self.rate))
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self._tokens = self.burst
+        self._updated = clock()
+
+    def reserve(self, max_wait=None):
+        """
+        Take a token, possibly one that only becomes available in the future.
+
+        :param max_wait: Do not take a token that becomes available more than this many seconds from now
+        :return: Number of seconds the caller must wait before using the token, or None if it would exceed max_wait
+        """
+        with self._lock:
+            now = self._clock()
+            if now > self._updated:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+            # _updated lies in the future while the bucket is paused
+            delay = max(0.0, self._updated - now) + max(0.0, 1 - self._tokens) / self.rate
+            if max_wait is not None and delay > max_wait:
+                return None
+
+            self._tokens -= 1
+            return delay
+
+    def acquire(self, max_wait=None):
+        """
+        Block until a token is available.
+
+        :param max_wait: Give up without waiting if that would take longer than this many seconds
+        :return: Number of seconds waited, or None if it gave up
+        """
+        delay = self.reserve(max_wait)
+        if delay:
+            self._sleep(delay)
+        return delay
+
+    async def acquire_async(self, max_wait=None):
+        """
+        Awaitable variant of acquire.
+        """
+        delay = self.reserve(max_wait)
+        if delay:
+            import asyncio
+
+            await asyncio.sleep(delay)
+        return delay
+
+    def pause(self, seconds):
+        """
+        Hand out no tokens for the given number of seconds, then resume at the configured rate without a burst.
+        """
+        with self._lock:
+            resume_at = self._clock() + seconds
+            if resume_at > self._updated:
+                self._tokens = min(self._tokens, 1.0)
+                self._updated = resume_at
+
+
+class RateLimiter(object):
+    # Used when BlueSnap throttles a request without sending a Retry-After header
+    DEFAULT_RETRY_AFTER = 1.0
+
+    def __init__(self, limits=None, default=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        :param limits: dict of endpoint class (e.g. 'transactions', 'vaulted-shoppers', 'payment-fields-tokens',
+            'shoppers', 'orders') to a rate in requests per second, or a (rate, burst) tuple
+        :param default: Rate, or (rate, burst) tuple, for endpoint classes missing from limits. If None, those
+            endpoints are not limited.
+        """
+        self.limits = dict(limits or {})
+        self.default = default
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_class(path):
+        """
+        :param path: URL path, e.g. /services/2/vaulted-shoppers/123
+        :return: The resource collection the path belongs to, e.g. 'vaulted-shoppers'
+        """
+        parts = path.split('?', 1)[0].split('/')
+        # ['', 'services', '2', '<endpoint class>', ...]
+        return parts[3] if len(parts) > 3 else path
+
+    def bucket(self, path):
+        """
+        :return: TokenBucket for the endpoint class of path, or None if it is not limited
+        """
+        endpoint_class = self.endpoint_class(path)
+
+        bucket = self._buckets.get(endpoint_class)
+        if bucket is None:
+            limit = self.limits.get(endpoint_class, self.default)
+            if limit is None:
+                return None
+
+            rate, burst = limit if isinstance(limit, (tuple, list)) else (limit, None)
+            with self._lock:
+                bucket = self._buckets.setdefault(
+                    endpoint_class, TokenBucket(rate, burst, clock=self._clock, sleep=self._sleep))
+
+        return bucket
+
+    def acquire(self, path, max_wait=None):
+        bucket = self.bucket(path)
+        return bucket.acquire(max_wait) if bucket is not None else 0.0
+
+    async def acquire_async(self, path, max_wait=None):
+        bucket = self.bucket(path)
+        return await bucket.acquire_async(max_wait) if bucket is not None else 0.0
+
+    def throttled(self, path, retry_after=None):
+        """
+        Called when BlueSnap throttled a request to path.
+        """
+        bucket = self.bucket(path)
+        if bucket is not None:
+            bucket.pause(retry_after if retry_after is not None else self.DEFAULT_RETRY_AFTER)
+
+
+def parse_retry_after(value, now=None):
+    """
+    :param value: Retry-After header value, either a number of seconds or an HTTP date
+    :return: Number of seconds to wait, or None if the value is missing or invalid
+    """
+    if not value:
+        return None
+
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if retry_at is None:
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return max(0.0, (retry_at - now).total_seconds())
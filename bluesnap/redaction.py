@@ -0,0 +1,149 @@
+"""
+Redaction of card data and credentials from logged traffic.
+
+Request bodies carry card numbers and security codes (PlainCreditCard, or creditCard in JSON payloads) and encrypted
+card fields, and every request carries the account credentials in its Authorization header. A Redactor masks them in
+formatted requests and responses: card numbers keep their last four digits, everything else, including values too
+short to be whole card numbers, is masked entirely.
+
+Bodies are redacted in a single pass of one compiled pattern over the sensitive elements of XML bodies, or keys of
+JSON bodies, whose replacement template is expanded by the regular expression engine itself. Most bodies (responses,
+pfToken and vaulted shopper payments) have none of these fields, which a substring check tells before running the
+pattern at all. Bodies cut short by log_body_limit are redacted too, a value cut in the middle is masked entirely.
+
+Masking card numbers anywhere else, e.g. echoed back in an error message, is optional as it costs a lot more: every
+digit of every body has to be looked at. See benchmarks/redaction.py.
+"""
+import re
+
+
+PAN = 'pan'
+SECRET = 'secret'
+
+# XML element and JSON key names of sensitive fields, by kind
+FIELDS = {
+    'card-number': PAN,
+    'cardNumber': PAN,
+    'security-code': SECRET,
+    'securityCode': SECRET,
+    'encrypted-card-number': SECRET,
+    'encryptedCardNumber': SECRET,
+    'encrypted-security-code': SECRET,
+    'encryptedSecurityCode': SECRET,
+}
+
+HEADERS = ('authorization', 'proxy-authorization')
+
+MASK = '****'
+
+# First character of a body, to tell XML from JSON
+_FIRST_CHARACTER = re.compile(r'\s*([<{\[])')
+
+# Replacements of every match, groups that did not take part in it are replaced by nothing
+_XML_TEMPLATE = r'<\g<xml_pan>\g<xml_secret>' + MASK + r'\g<xml_last_four>'
+_JSON_TEMPLATE = r'"\g<json_pan>\g<json_secret>' + MASK + r'\g<json_last_four>'
+
+# Lookahead for at least 12 digits before any of the given characters, which end the value
+_TWELVE_DIGITS = r'(?=(?:[^%s\d]*\d){12})'
+
+# Content of a CDATA section and its end, or the end of a cut body, after its start
+_CDATA_CONTENT = r'[\s\S]*?(?:\]\]>|\Z)'
+
+# JSON string value, up to the closing quote or the end of a cut body, after its opening quote
+_JSON_STRING = r'(?<=")[^"\\]*(?:\\.[^"\\]*)*'
+
+
+def _luhn(digits):
+    total = 0
+    for i, digit in enumerate(reversed(digits)):
+        digit = ord(digit) - 48
+        if i % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return total % 10 == 0
+
+
+def mask_pan(value):
+    """
+    :return: value masked but for its last four digits, or entirely if it is too short to be a whole card number
+    """
+    digits = [char for char in value if char.isdigit()]
+    return MASK + ''.join(digits[-4:]) if len(digits) >= 12 else MASK
+
+
+def _names(fields, kind):
+    names = [re.escape(name) for name in sorted(fields, key=len, reverse=True) if fields[name] == kind]
+    # A pattern that never matches when there are no fields of a kind
+    return '|'.join(names) or '(?!)'
+
+
+class Redactor(object):
+    def __init__(self, fields=None, headers=HEADERS, detect_pans=False):
+        """
+        :param fields: dict of XML element and JSON key names to PAN (masked but for the last four digits) or SECRET
+            (masked entirely), defaults to FIELDS
+        :param headers: Names of the headers whose values are masked, case-insensitive
+        :param detect_pans: Whether to also mask digit sequences that pass the Luhn check anywhere in bodies
+        """
+        self.fields = dict(FIELDS if fields is None else fields)
+        self.headers = frozenset(header.lower() for header in headers)
+        self.detect_pans = detect_pans
+
+        pan_names = _names(self.fields, PAN)
+        secret_names = _names(self.fields, SECRET)
+
+        # <card-number>, possibly with attributes, with its value as text or in a CDATA section, up to the next tag or
+        # the end of a cut body. As in mask_pan, the last four digits are only kept if the value is whole and has at
+        # least 12 digits. Patterns start with a literal character that the regular expression engine looks for
+        # before trying to match anything else.
+        xml = (r'<(?:(?P<xml_pan>(?:%s)(?:\s[^>]*)?>)(?P<xml_cdata><!\[CDATA\[)?'
+               r'(?:%s[^<\]]*?(?P<xml_last_four>\d{4})(?(xml_cdata)\]\]>)(?=\s*<)|(?(xml_cdata)%s|[^<]*))'
+               r'|(?P<xml_secret>(?:%s)(?:\s[^>]*)?>)(?:<!\[CDATA\[%s|[^<]*))') % (
+            pan_names, _TWELVE_DIGITS % r'<\]', _CDATA_CONTENT, secret_names, _CDATA_CONTENT)
+        # "cardNumber": "..." or an unquoted value
+        json = (r'"(?:(?P<json_pan>(?:%s)"\s*:\s*"?)'
+                r'(?:(?<=")%s[^"\\]*?(?P<json_last_four>\d{4})(?=")|%s|[\w.+-]*)'
+                r'|(?P<json_secret>(?:%s)"\s*:\s*"?)(?:%s|[\w.+-]*))') % (
+            pan_names, _TWELVE_DIGITS % r'"\\', _JSON_STRING, secret_names, _JSON_STRING)
+
+        # Bodies are sniffed so that the pattern only looks for the elements or keys of their format, and its
+        # template is expanded by the regular expression engine rather than by a Python callback per match
+        if detect_pans:
+            # 13 to 19 digits, optionally grouped by spaces or dashes, that are not part of a longer word or number
+            pan = r'|(?P<pan>(?<![\w.])\d(?:[ -]?\d){12,18}(?![\w.]))'
+            self._xml = (re.compile(xml + pan), self._replace)
+            self._json = (re.compile(json + pan), self._replace)
+        else:
+            self._xml = (re.compile(xml), _XML_TEMPLATE)
+            self._json = (re.compile(json), _JSON_TEMPLATE)
+        self._any = (re.compile(xml + '|' + json + (pan if detect_pans else '')), self._replace)
+
+    def redact(self, text):
+        """
+        :param text: Request or response body
+        :return: text with sensitive values masked
+        """
+        if not self.detect_pans and not any(name in text for name in self.fields):
+            return text
+
+        first = _FIRST_CHARACTER.match(text)
+        if first is None:
+            pattern, replacement = self._any
+        elif first.group(1) == '<':
+            pattern, replacement = self._xml
+        else:
+            pattern, replacement = self._json
+        return pattern.sub(replacement, text)
+
+    def redact_header(self, name, value):
+        """
+        :return: Header value to log
+        """
+        return MASK if name.lower() in self.headers else value
+
+    @staticmethod
+    def _replace(match):
+        if match.lastgroup == 'pan':
+            value = match.group(0)
+            return mask_pan(value) if _luhn(value.replace(' ', '').replace('-', '')) else value
+        return match.expand(_XML_TEMPLATE if match.group(0)[0] == '<' else _JSON_TEMPLATE)
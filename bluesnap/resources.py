@@ -1,13 +1,21 @@
 import re
 from abc import abstractmethod
+from http import HTTPStatus
 from typing import List, Optional
 from urllib.parse import urlparse
 
-import requests
-from lxml import etree
-
 from . import models
 from .client import default as default_client
+from .xmltemplate import XMLTemplate, placeholder
+
+
+def _tostring(element):
+    """
+    Serialize an XML document, lxml is already loaded by the client that built it
+    """
+    from lxml import etree
+
+    return etree.tostring(element)
 
 
 class Resource(object):
@@ -15,10 +23,53 @@ class Resource(object):
         self.client = client or default_client()
         """:type : .client.Client"""
 
-    def request(self, method, path, data=None):
-        response, body = self.client.request(method, path, data)
+    def request(self, method, path, data=None, deadline=None):
+        response, body = self.client.request(method, path, data, deadline=deadline)
         return response, body
 
+    def _call(self, method, path, data=None, result=None, deadline=None):
+        """
+        Perform an API call and convert it using result(response, body), returning the parsed body if no result
+        function is given.
+
+        Asynchronous resources override this to return an awaitable, so API methods must return its value as-is
+        instead of post-processing it.
+
+        :param deadline: Maximum number of seconds the call may take, including retries
+        """
+        response, body = self.request(method, path, data, deadline=deadline)
+        return result(response, body) if result else body
+
+    def _cached(self, value):
+        """
+        Return a value that did not need an API call, the same way _call would
+        """
+        return value
+
+    def _cached_call(self, key, path, result, cache_keys, deadline=None):
+        """
+        GET path like _call, unless the client's shopper cache has an entry for key. Results fetched from BlueSnap
+        are cached under key and cache_keys(value).
+        """
+        cache = self.client.shopper_cache
+        if cache is None:
+            return self._call('GET', path, result=result, deadline=deadline)
+
+        value = cache.get(key)
+        if value is not None:
+            return self._cached(value)
+
+        def cache_result(response, body):
+            value = result(response, body)
+            cache.set([key] + cache_keys(value), value)
+            return value
+
+        return self._call('GET', path, result=cache_result, deadline=deadline)
+
+    def _invalidate(self, *keys):
+        if self.client.shopper_cache is not None:
+            self.client.shopper_cache.invalidate(*keys)
+
 
 # ------------------
 # XML API
@@ -29,97 +80,128 @@ class ShopperResource(Resource):
     shopper_path = shoppers_path + '/{shopper_id}'
     shopper_id_path_pattern = re.compile(r'{}/(\d+)'.format(shoppers_path))  # /services/2/shoppers/(\d+)
 
-    def find_by_shopper_id(self, shopper_id):
+    def find_by_shopper_id(self, shopper_id, deadline=None):
         """
         :param shopper_id: BlueSnap shopper id
+        :param deadline: Maximum number of seconds the call may take
         :return: shopper dictionary
         """
-        response, body = self.request('GET', self.shopper_path.format(shopper_id=shopper_id))
-        return body['shopper']
-
-    def find_by_seller_shopper_id(self, seller_shopper_id):
+        return self._cached_call(('shopper', str(shopper_id)), self.shopper_path.format(shopper_id=shopper_id),
+                                 result=lambda response, body: body['shopper'], cache_keys=self._cache_keys,
+                                 deadline=deadline)
+
+    def _cache_keys(self, shopper):
+        # Both the BlueSnap id and the id used by find_by_seller_shopper_id
+        shopper_info = shopper.get('shopper-info') or {}
+        keys = []
+        if shopper_info.get('shopper-id'):
+            keys.append(('shopper', str(shopper_info['shopper-id'])))
+        if shopper_info.get('seller-shopper-id'):
+            keys.append(('shopper', '{seller_shopper_id},{seller_id}'.format(
+                seller_shopper_id=shopper_info['seller-shopper-id'],
+                seller_id=self.client.seller_id)))
+        return keys
+
+    def find_by_seller_shopper_id(self, seller_shopper_id, deadline=None):
         """
         :param seller_shopper_id: Seller-specific shopper id
+        :param deadline: Maximum number of seconds the call may take
         :return: shopper dictionary
         """
         return self.find_by_shopper_id('{seller_shopper_id},{seller_id}'.format(
             seller_shopper_id=seller_shopper_id,
-            seller_id=self.client.seller_id))
+            seller_id=self.client.seller_id), deadline=deadline)
 
     def _create_shopper_element(self, contact_info, credit_card=None,
                                 seller_shopper_id=None, client_ip=None):
         # noinspection PyPep8Naming
-        E = self.client.E
+        T = self.client.tags
 
         credit_cards_info = []
         if credit_card is not None:
-            credit_cards_info.append(getattr(E, 'credit-card-info')(
+            credit_cards_info.append(T['credit-card-info'](
                 contact_info.to_xml('billing'),
                 credit_card.to_xml()
             ))
 
         shopper_info = []
         if seller_shopper_id is not None:
-            shopper_info.append(getattr(E, 'seller-shopper-id')(seller_shopper_id))
+            shopper_info.append(T['seller-shopper-id'](seller_shopper_id))
 
-        return E.shopper(
-            getattr(E, 'shopper-info')(
-                getattr(E, 'store-id')(self.client.store_id),
-                getattr(E, 'shopper-currency')(self.client.currency),
-                E.locale(self.client.locale),
+        return T['shopper'](
+            T['shopper-info'](
+                T['store-id'](self.client.store_id),
+                T['shopper-currency'](self.client.currency),
+                T['locale'](self.client.locale),
                 contact_info.to_xml('shopper'),
-                getattr(E, 'payment-info')(
-                    getattr(E, 'credit-cards-info')(*credit_cards_info)
+                T['payment-info'](
+                    T['credit-cards-info'](*credit_cards_info)
                 ),
                 *shopper_info
             ),
-            models.WebInfo(ip=client_ip).to_xml()
+            models.WebInfo(ip=client_ip, client=self.client).to_xml()
         )
 
     def create(self, contact_info, credit_card=None, seller_shopper_id=None,
-               client_ip=None):
+               client_ip=None, deadline=None):
         """
         Creates a new shopper
         :type contact_info: models.ContactInfo
         :type credit_card: models.AbstractCreditCard
         :param seller_shopper_id: Seller-specific shopper id
         :param client_ip:
+        :param deadline: Maximum number of seconds the call may take
         :return: Returns the newly created BlueSnap shopper id
         """
         shopper_element = self._create_shopper_element(
             contact_info, credit_card, seller_shopper_id, client_ip=client_ip)
-        data = etree.tostring(shopper_element)
+        data = _tostring(shopper_element)
 
-        response, body = self.request('POST', self.shoppers_path, data=data)
+        return self._call('POST', self.shoppers_path, data=data, result=self._shopper_id_from_response,
+                          deadline=deadline)
 
+    def _shopper_id_from_response(self, response, body):
         # Extract shopper id from location header
         new_shopper_url = urlparse(response.headers['location'])
         shopper_id = self.shopper_id_path_pattern.match(new_shopper_url.path).group(1)
 
         return shopper_id
 
-    def update(self, shopper_id, contact_info, credit_card=None, client_ip=None):
+    def update(self, shopper_id, contact_info, credit_card=None, client_ip=None, deadline=None):
         """
         Updates an existing shopper
         :param shopper_id: BlueSnap shopper id
         :type contact_info: models.ContactInfo
         :type credit_card: models.AbstractCreditCard
         :param client_ip:
+        :param deadline: Maximum number of seconds the call may take
         :rtype: bool
         """
         shopper_element = self._create_shopper_element(
             contact_info, credit_card, client_ip=client_ip)
-        data = etree.tostring(shopper_element)
+        data = _tostring(shopper_element)
+
+        def updated(response, body):
+            # Again, in case a concurrent lookup cached the shopper while it was being updated
+            self._invalidate(('shopper', str(shopper_id)))
+            return response.status_code == HTTPStatus.NO_CONTENT
 
-        response, _ = self.request('PUT', self.shopper_path.format(shopper_id=shopper_id), data=data)
-        return response.status_code == requests.codes.no_content
+        self._invalidate(('shopper', str(shopper_id)))
+        return self._call('PUT', self.shopper_path.format(shopper_id=shopper_id), data=data, result=updated,
+                          deadline=deadline)
 
 
 class OrderResource(Resource):
     path = '/services/2/orders'
 
+    # Serialize orders from a byte template instead of building an lxml tree. Both produce the same document.
+    use_template = True
+
+    # Compiled templates, by (namespace, with a credit card, with a description)
+    _templates = {}
+
     def create(self, shopper_id, sku_id, amount_in_pence, credit_card=None,
-               description=None, client_ip=None):
+               description=None, client_ip=None, deadline=None):
         """
         :type shopper_id: int or str
         :type sku_id: int or str
@@ -127,50 +209,109 @@ class OrderResource(Resource):
         :type credit_card: models.CreditCardSelection
         :param description: Order description
         :param client_ip:
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
-        # noinspection PyPep8Naming
-        E = self.client.E
-
         amount = '{:.2f}'.format(amount_in_pence / 100.0)
+        web_info = models.WebInfo(ip=client_ip, client=self.client)
+
+        data = None
+        if self.use_template and (credit_card is None or type(credit_card) is models.CreditCardSelection):
+            data = self._render_order(str(shopper_id), str(sku_id), amount, self.client.currency, web_info,
+                                      credit_card, description)
+        if data is None:
+            data = _tostring(self._create_order_element(
+                str(shopper_id), str(sku_id), amount, self.client.currency, web_info, credit_card, description))
+
+        return self._call('POST', self.path, data=data, result=lambda response, body: body['order'],
+                          deadline=deadline)
+
+    def _create_order_element(self, shopper_id, sku_id, amount, currency, web_info, credit_card=None, description=None):
+        """
+        :type web_info: models.WebInfo
+        :type credit_card: models.AbstractCreditCard
+        :return: lxml.etree._Element
+        """
+        # noinspection PyPep8Naming
+        T = self.client.tags
 
         order = []
         if description is not None:
-            order.append(getattr(E, 'soft-descriptor')(description))
+            order.append(T['soft-descriptor'](description))
 
         ordering_shopper = []
         if credit_card is not None:
             ordering_shopper.append(credit_card.to_xml())
 
-        order_element = E.order(
-            getattr(E, 'ordering-shopper')(
-                getattr(E, 'shopper-id')(str(shopper_id)),
-                models.WebInfo(ip=client_ip).to_xml(),
+        return T['order'](
+            T['ordering-shopper'](
+                T['shopper-id'](shopper_id),
+                web_info.to_xml(),
                 *ordering_shopper
             ),
-            E.cart(
-                getattr(E, 'cart-item')(
-                    E.sku(
-                        getattr(E, 'sku-id')(str(sku_id)),
-                        getattr(E, 'sku-charge-price')(
-                            getattr(E, 'charge-type')('initial'),
-                            E.amount(amount),
-                            E.currency(self.client.currency)
+            T['cart'](
+                T['cart-item'](
+                    T['sku'](
+                        T['sku-id'](sku_id),
+                        T['sku-charge-price'](
+                            T['charge-type']('initial'),
+                            T['amount'](amount),
+                            T['currency'](currency)
                         )
                     ),
-                    E.quantity('1'),
+                    T['quantity']('1'),
                 ),
             ),
-            getattr(E, 'expected-total-price')(
-                E.amount(amount),
-                E.currency(self.client.currency)
+            T['expected-total-price'](
+                T['amount'](amount),
+                T['currency'](currency)
             ),
             *order
         )
 
-        data = etree.tostring(order_element)
-        response, body = self.request('POST', self.path, data=data)
-        return body['order']
+    def _render_order(self, shopper_id, sku_id, amount, currency, web_info, credit_card=None, description=None):
+        """
+        Serialize the document _create_order_element would build from a template
+
+        :type credit_card: models.CreditCardSelection
+        :return: bytes, or None if a value cannot be rendered
+        """
+        key = (self.client.NAMESPACE, credit_card is not None, description is not None)
+        template = self._templates.get(key)
+        if template is None:
+            template = self._templates[key] = self._compile_order_template(*key[1:])
+
+        values = {
+            'shopper_id': shopper_id,
+            'sku_id': sku_id,
+            'amount': amount,
+            'currency': currency,
+            'ip': web_info.ip,
+            'remote_host': web_info.remote_host,
+            'user_agent': web_info.user_agent,
+        }
+        if credit_card is not None:
+            values['card_last_four_digits'] = credit_card.card_last_four_digits
+            values['card_type'] = credit_card.card_type
+        if description is not None:
+            values['description'] = description
+        return template.render(values)
+
+    def _compile_order_template(self, with_credit_card, with_description):
+        """
+        :rtype: xmltemplate.XMLTemplate
+        """
+        web_info = models.WebInfo(ip=placeholder('ip'), remote_host=placeholder('remote_host'),
+                                  user_agent=placeholder('user_agent'), client=self.client)
+        credit_card = None
+        if with_credit_card:
+            credit_card = models.CreditCardSelection(placeholder('card_type'), placeholder('card_last_four_digits'),
+                                                     client=self.client)
+        description = placeholder('description') if with_description else None
+
+        return XMLTemplate(self._create_order_element(placeholder('shopper_id'), placeholder('sku_id'),
+                                                      placeholder('amount'), placeholder('currency'), web_info,
+                                                      credit_card, description))
 
 
 # ------------------
@@ -193,15 +334,19 @@ class PaymentFieldsTokenResource(Resource):
 
     def __init__(
             self,
+            client=None,
     ):
-        super(PaymentFieldsTokenResource, self).__init__()
+        super(PaymentFieldsTokenResource, self).__init__(client=client)
 
     def create(
             self,
-            shopperId: str = None
+            shopperId: str = None,
+            deadline: Optional[float] = None,
     ):
         """
         Create a Hosted Payment Fields token by sending a server-to-server POST request to BlueSnap
+        :param shopperId:
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
@@ -210,14 +355,50 @@ class PaymentFieldsTokenResource(Resource):
         else:
             _url = self.path
 
-        response, body = self.request('POST', _url)
+        return self._call('POST', _url, result=self._tokenIdFromResponse, deadline=deadline)
 
+    # noinspection PyMethodMayBeStatic
+    def _tokenIdFromResponse(self, response, body):
         locationHeader = response.headers['Location']
         tokenId = locationHeader.split('/')[-1]
         return tokenId
 
 
-class DictableObject:
+class _DictableType(type):
+    """
+    Metaclass of DictableObject, generating toDict when a class is created. Not __init_subclass__, which Python 3.5
+    lacks.
+    """
+
+    def __init__(cls, name, bases, namespace):
+        super(_DictableType, cls).__init__(name, bases, namespace)
+
+        declared = ('_requiredFields', '_optionalFields', '_dictableFields', '_dictableListFields')
+        if 'toDict' not in namespace and any(field in namespace for field in declared):
+            cls.toDict = _generateToDict(cls)
+
+
+class DictableObject(metaclass=_DictableType):
+    """
+    Base class of the objects sent in JSON requests.
+
+    Subclasses declare their fields, and get a toDict generated from the declaration once, when the class is created:
+
+    * _requiredFields are always set in the dict
+    * _optionalFields only if they have a value
+    * _dictableFields are DictableObject values, converted if set
+    * _dictableListFields are lists of DictableObject values, converted if not empty
+
+    Fields are set in that order, each with the attribute of the same name as key. Declaring
+    __slots__ = _requiredFields + _optionalFields + ... keeps instances small.
+    """
+
+    __slots__ = ()
+
+    _requiredFields = ()
+    _optionalFields = ()
+    _dictableFields = ()
+    _dictableListFields = ()
 
     def __init__(self):
         pass
@@ -242,7 +423,37 @@ class DictableObject:
             self._setToDictIfHasValue(resultDict, key)
 
 
+def _generateToDict(cls):
+    """
+    Compile a toDict for the fields cls declares, with no lookup or loop over field names left to run per call
+    """
+    for name in cls._requiredFields + cls._optionalFields + cls._dictableFields + cls._dictableListFields:
+        if not name.isidentifier():
+            raise ValueError('Invalid field name %r in %s.' % (name, cls.__name__))
+
+    lines = ['def toDict(self) -> dict:']
+    lines.append('    result = {%s}' % ', '.join('%r: self.%s' % (name, name) for name in cls._requiredFields))
+    for name in cls._optionalFields:
+        lines += ['    value = self.%s' % name, '    if value:', '        result[%r] = value' % name]
+    for name in cls._dictableFields:
+        lines += ['    value = self.%s' % name, '    if value:', '        result[%r] = value.toDict()' % name]
+    for name in cls._dictableListFields:
+        lines += ['    value = self.%s' % name, '    if value:',
+                  '        result[%r] = [item.toDict() for item in value]' % name]
+    lines.append('    return result')
+
+    namespace = {}
+    exec(compile('\n'.join(lines) + '\n', '<%s.toDict>' % cls.__qualname__, 'exec'), namespace)
+    toDict = namespace['toDict']
+    toDict.__qualname__ = '%s.toDict' % cls.__qualname__
+    toDict.__module__ = cls.__module__
+    return toDict
+
+
 class ShippingContactInfo(DictableObject):
+    _requiredFields = ("firstName", "lastName", "address1", "city", "zip", "country")
+    _optionalFields = ("address2", "state")
+    __slots__ = _requiredFields + _optionalFields
 
     def __init__(
             self,
@@ -286,26 +497,6 @@ class ShippingContactInfo(DictableObject):
         self.country = country
         self.zip = zip_
 
-    def toDict(self) -> dict:
-        result = {
-            "firstName": self.firstName,
-            "lastName":  self.lastName,
-            "address1":  self.address1,
-            "city":      self.city,
-            "zip":       self.zip,
-            "country":   self.country,
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "address2",
-                "state",
-            ]
-        )
-
-        return result
-
 
 class CardHolderInfo(DictableObject):
     """
@@ -313,6 +504,13 @@ class CardHolderInfo(DictableObject):
     https://developers.bluesnap.com/v8976-JSON/docs/vaulted-shopper
     """
 
+    _requiredFields = ("firstName", "lastName")
+    _optionalFields = (
+        "personalIdentificationNumber", "merchantShopperId", "address", "address2", "city", "state", "country", "zip",
+        "email", "phone",
+    )
+    __slots__ = _requiredFields + _optionalFields
+
     def __init__(
             self,
             firstName: str,
@@ -373,32 +571,11 @@ class CardHolderInfo(DictableObject):
         self.email = email
         self.phone = phone
 
-    def toDict(self) -> dict:
-        result = {
-            "firstName": self.firstName,
-            "lastName":  self.lastName,
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "personalIdentificationNumber",
-                "merchantShopperId",
-                "address",
-                "address2",
-                "city",
-                "state",
-                "country",
-                "zip",
-                "email",
-                "phone",
-            ]
-        )
-
-        return result
-
 
 class BillingContactInfo(DictableObject):
+    _requiredFields = ("firstName", "lastName", "address1", "city", "zip", "country")
+    _optionalFields = ("address2", "state", "personalIdentificationNumber")
+    __slots__ = _requiredFields + _optionalFields
 
     def __init__(
             self,
@@ -465,29 +642,12 @@ class BillingContactInfo(DictableObject):
         self.country = country
         self.zip = zip_
 
-    def toDict(self) -> dict:
-        result = {
-            "firstName": self.firstName,
-            "lastName":  self.lastName,
-            "address1":  self.address1,
-            "city":      self.city,
-            "zip":       self.zip,
-            "country":   self.country,
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "address2",
-                "state",
-                "personalIdentificationNumber",
-            ]
-        )
-
-        return result
-
 
 class TransactionFraudInfo(DictableObject):
+    _requiredFields = ("fraudSessionId",)
+    _optionalFields = ("shopperIpAddress", "company")
+    _dictableFields = ("shippingContactInfo",)
+    __slots__ = _requiredFields + _optionalFields + _dictableFields
 
     def __init__(
             self,
@@ -523,24 +683,6 @@ class TransactionFraudInfo(DictableObject):
         self.company = company
         self.shippingContactInfo = shippingContactInfo
 
-    def toDict(self) -> dict:
-        result = {
-            "fraudSessionId": self.fraudSessionId,
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "shopperIpAddress",
-                "company",
-            ]
-        )
-
-        if self.shippingContactInfo:
-            result["shippingContactInfo"] = self.shippingContactInfo.toDict()
-
-        return result
-
 
 class VaultedShopperInfo(DictableObject):
     """
@@ -548,6 +690,15 @@ class VaultedShopperInfo(DictableObject):
     https://developers.bluesnap.com/v8976-JSON/docs/vaulted-shopper
     """
 
+    _requiredFields = ("firstName", "lastName")
+    _optionalFields = (
+        "companyName", "personalIdentificationNumber", "shopperCurrency", "softDescriptor", "descriptorPhoneNumber",
+        "merchantShopperId", "address", "address2", "city", "state", "country", "zip", "email", "phone",
+        "fraudSessionId",
+    )
+    _dictableFields = ("shippingContactInfo", "transactionFraudInfo")
+    __slots__ = _requiredFields + _optionalFields + _dictableFields
+
     def __init__(
             self,
             firstName: str,
@@ -630,41 +781,8 @@ class VaultedShopperInfo(DictableObject):
         self.phone = phone
         self.shippingContactInfo = shippingContactInfo
         self.transactionFraudInfo = transactionFraudInfo
-
-    def toDict(self) -> dict:
-        result = {
-            "firstName": self.firstName,
-            "lastName":  self.lastName,
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "companyName",
-                "personalIdentificationNumber",
-                "shopperCurrency",
-                "softDescriptor",
-                "descriptorPhoneNumber",
-                "merchantShopperId",
-                "address",
-                "address2",
-                "city",
-                "state",
-                "country",
-                "zip",
-                "email",
-                "phone",
-                "fraudSessionId",
-            ]
-        )
-
-        if self.shippingContactInfo:
-            result["shippingContactInfo"] = self.shippingContactInfo.toDict()
-
-        if self.transactionFraudInfo:
-            result["transactionFraudInfo"] = self.transactionFraudInfo.toDict()
-
-        return result
+        # Not an argument, may be set afterwards
+        self.fraudSessionId = None
 
 
 class Level3DataItem(DictableObject):
@@ -677,6 +795,12 @@ class Level3DataItem(DictableObject):
     https://developers.bluesnap.com/docs/level-23-data
     """
 
+    _optionalFields = (
+        "lineItemTotal", "commodityCode", "description", "discountAmount", "discountIndicator", "grossNetIndicator",
+        "productCode", "itemQuantity", "taxAmount", "taxRate", "taxType", "unitCost", "unitOfMeasure",
+    )
+    __slots__ = _optionalFields
+
     def __init__(
             self,
             lineItemTotal: str = None,
@@ -727,31 +851,6 @@ class Level3DataItem(DictableObject):
         self.unitCost = unitCost
         self.unitOfMeasure = unitOfMeasure
 
-    def toDict(self) -> dict:
-        result = {
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "lineItemTotal",
-                "commodityCode",
-                "description",
-                "discountAmount",
-                "discountIndicator",
-                "grossNetIndicator",
-                "productCode",
-                "itemQuantity",
-                "taxAmount",
-                "taxRate",
-                "taxType",
-                "unitCost",
-                "unitOfMeasure",
-            ]
-        )
-
-        return result
-
 
 class Level3Data(DictableObject):
     """
@@ -762,6 +861,13 @@ class Level3Data(DictableObject):
     https://developers.bluesnap.com/docs/level-23-data
     """
 
+    _optionalFields = (
+        "customerReferenceNumber", "salesTaxAmount", "freightAmount", "dutyAmount", "destinationZipCode",
+        "destinationCountryCode", "shipFromZipCode", "discountAmount", "taxAmount", "taxRate",
+    )
+    _dictableListFields = ("level3DataItems",)
+    __slots__ = _optionalFields + _dictableListFields
+
     def __init__(
             self,
             customerReferenceNumber: str = None,
@@ -792,37 +898,6 @@ class Level3Data(DictableObject):
         self.taxRate = taxRate
         self.level3DataItems = level3DataItems
 
-    def toDict(self) -> dict:
-        result = {
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "customerReferenceNumber",
-                "salesTaxAmount",
-                "freightAmount",
-                "dutyAmount",
-                "destinationZipCode",
-                "destinationCountryCode",
-                "shipFromZipCode",
-                "discountAmount",
-                "taxAmount",
-                "taxRate",
-            ]
-        )
-
-        if self.level3DataItems:
-            level3DataItems = []
-
-            for dataItem in self.level3DataItems:
-                level3DataItems.append(
-                    dataItem.toDict()
-                )
-            result["level3DataItems"] = level3DataItems
-
-        return result
-
 
 class NetworkTransactionInfo(DictableObject):
     """
@@ -830,6 +905,9 @@ class NetworkTransactionInfo(DictableObject):
     https://developers.bluesnap.com/v8976-JSON/docs/network-transaction-info
     """
 
+    _optionalFields = ("originalNetworkTransactionId",)
+    __slots__ = _optionalFields
+
     def __init__(
             self,
             originalNetworkTransactionId: str = None,
@@ -845,19 +923,6 @@ class NetworkTransactionInfo(DictableObject):
 
         self.originalNetworkTransactionId = originalNetworkTransactionId
 
-    def toDict(self) -> dict:
-        result = {
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "originalNetworkTransactionId",
-            ]
-        )
-
-        return result
-
 
 class ThreeDSecure(DictableObject):
     """
@@ -865,6 +930,9 @@ class ThreeDSecure(DictableObject):
     https://developers.bluesnap.com/v8976-JSON/docs/threedsecure
     """
 
+    _optionalFields = ("threeDSecureReferenceId",)
+    __slots__ = _optionalFields
+
     def __init__(
             self,
             threeDSecureReferenceId: str = None,
@@ -879,19 +947,6 @@ class ThreeDSecure(DictableObject):
 
         self.threeDSecureReferenceId = threeDSecureReferenceId
 
-    def toDict(self) -> dict:
-        result = {
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "threeDSecureReferenceId",
-            ]
-        )
-
-        return result
-
 
 class CreditCard(DictableObject):
     """
@@ -901,6 +956,9 @@ class CreditCard(DictableObject):
     https://developers.bluesnap.com/v8976-JSON/docs/credit-card
     """
 
+    _optionalFields = ("cardLastFourDigits", "cardType", "expirationMonth", "expirationYear")
+    __slots__ = _optionalFields
+
     def __init__(
             self,
             cardLastFourDigits: str = None,
@@ -921,22 +979,6 @@ class CreditCard(DictableObject):
         self.expirationMonth = expirationMonth
         self.expirationYear = expirationYear
 
-    def toDict(self) -> dict:
-        result = {
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "cardLastFourDigits",
-                "cardType",
-                "expirationMonth",
-                "expirationYear",
-            ]
-        )
-
-        return result
-
 
 class CreditCardInfo(DictableObject):
     """
@@ -946,6 +988,10 @@ class CreditCardInfo(DictableObject):
     https://developers.bluesnap.com/v8976-JSON/docs/payment-sources
     """
 
+    _optionalFields = ("status", "pfToken")
+    _dictableFields = ("billingContactInfo", "creditCard")
+    __slots__ = _optionalFields + _dictableFields
+
     def __init__(
             self,
             billingContactInfo: BillingContactInfo = None,
@@ -981,34 +1027,14 @@ class CreditCardInfo(DictableObject):
         self.pfToken = pfToken
         self.status = status
 
-    def toDict(self) -> dict:
-        result = {
-        }
-
-        self._setToDictIfHasValues(
-            resultDict=result,
-            keys=[
-                "status",
-                "pfToken"
-            ]
-        )
-
-        if self.billingContactInfo:
-            result["billingContactInfo"] = self.billingContactInfo.toDict()
-
-        if self.creditCard:
-            result["creditCard"] = self.creditCard.toDict()
-
-        return result
-
 
 class VaultedShopperResource(Resource):
     path = '/services/2/vaulted-shoppers'
 
-    def __init__(self):
-        super(VaultedShopperResource, self).__init__()
+    def __init__(self, client=None):
+        super(VaultedShopperResource, self).__init__(client=client)
 
-    def retrieve(self, vaultedShopperId: str) -> dict:
+    def retrieve(self, vaultedShopperId: str, deadline: Optional[float] = None) -> dict:
         """
         The Retrieve Vaulted Shopper request retrieves all the saved details for the shopper associated with the
         vaultedShopperId you send in the request.
@@ -1016,14 +1042,15 @@ class VaultedShopperResource(Resource):
         https://developers.bluesnap.com/v8976-JSON/docs/retrieve-vaulted-shopper
 
         :param vaultedShopperId:
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
-        response, body = self.request('GET', '%s/%s' % (self.path, vaultedShopperId))
+        return self._cached_call(('vaulted-shopper', str(vaultedShopperId)), '%s/%s' % (self.path, vaultedShopperId),
+                                 result=lambda response, body: dict(body['vaulted-shopper']),
+                                 cache_keys=self._cacheKeys, deadline=deadline)
 
-        return dict(body['vaulted-shopper'])
-
-    def retrieveByMerchantShopperId(self, merchantShopperId: str) -> dict:
+    def retrieveByMerchantShopperId(self, merchantShopperId: str, deadline: Optional[float] = None) -> dict:
         """
         The Retrieve Vaulted Shopper request retrieves all the saved details for the shopper associated with the
         merchantShopperId you send in the request.
@@ -1031,12 +1058,27 @@ class VaultedShopperResource(Resource):
         https://developers.bluesnap.com/v8976-JSON/docs/retrieve-vaulted-shopper
 
         :param merchantShopperId:
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
-        response, body = self.request('GET', '%s/merchant/%s' % (self.path, merchantShopperId))
+        return self._cached_call(('merchant-shopper', str(merchantShopperId)),
+                                 '%s/merchant/%s' % (self.path, merchantShopperId),
+                                 result=lambda response, body: dict(body['vaulted-shopper']),
+                                 cache_keys=self._cacheKeys, deadline=deadline)
+
+    @staticmethod
+    def _cacheKeys(vaultedShopper: dict) -> list:
+        # Retrieved vaulted shoppers are XML (dashed keys), updated ones JSON
+        vaultedShopperId = vaultedShopper.get('vaulted-shopper-id') or vaultedShopper.get('vaultedShopperId')
+        merchantShopperId = vaultedShopper.get('merchant-shopper-id') or vaultedShopper.get('merchantShopperId')
 
-        return dict(body['vaulted-shopper'])
+        keys = []
+        if vaultedShopperId:
+            keys.append(('vaulted-shopper', str(vaultedShopperId)))
+        if merchantShopperId:
+            keys.append(('merchant-shopper', str(merchantShopperId)))
+        return keys
 
     def create(
             self,
@@ -1044,6 +1086,7 @@ class VaultedShopperResource(Resource):
             paymentSource: List[CreditCardInfo],
             # TODO: ecpInfo
             # TODO: sepaDirectDebitInfo
+            deadline: Optional[float] = None,
     ) -> dict:
         """
         The Create Vaulted Shopper request enables you to store a shopper's details (including payment info) securely
@@ -1059,6 +1102,7 @@ class VaultedShopperResource(Resource):
         :param vaultedShopperInfo: This is used for invoices, and to show information about the user in BlueSnap itself
         :param paymentSource: Contains payment source information for vaulted shoppers. More info:
             https://developers.bluesnap.com/v8976-JSON/docs/payment-sources
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
@@ -1072,9 +1116,7 @@ class VaultedShopperResource(Resource):
 
         data.update(vaultedShopperInfo.toDict())
 
-        response, body = self.request('POST', self.path, data=data)
-
-        return body
+        return self._call('POST', self.path, data=data, deadline=deadline)
 
     def update(
             self,
@@ -1083,6 +1125,7 @@ class VaultedShopperResource(Resource):
             paymentSource: List[CreditCardInfo],
             # TODO: ecpInfo
             # TODO: sepaDirectDebitInfo
+            deadline: Optional[float] = None,
     ) -> dict:
         """
         The Update Vaulted Shopper request enables you to update an existing vaulted shopper by changing their
@@ -1096,6 +1139,7 @@ class VaultedShopperResource(Resource):
         :param vaultedShopperInfo: Contains information about the vaulted shopper,
             More info here: https://developers.bluesnap.com/v8976-JSON/docs/vaulted-shopper
         :param paymentSource: TODO
+        :param deadline: Maximum number of seconds the call may take
         :return: The vaultedShopper object, which contains all details that are saved for that shopper.
 
         """
@@ -1109,9 +1153,18 @@ class VaultedShopperResource(Resource):
         }
         data.update(vaultedShopperInfo.toDict())
 
-        response, body = self.request('PUT', '%s/%s' % (self.path, vaultedShopperId), data=data)
+        keys = [('vaulted-shopper', str(vaultedShopperId))]
+        if vaultedShopperInfo.merchantShopperId:
+            keys.append(('merchant-shopper', str(vaultedShopperInfo.merchantShopperId)))
+
+        def updated(response, body):
+            # Again, in case a concurrent lookup cached the shopper while it was being updated
+            self._invalidate(*(keys + self._cacheKeys(body if isinstance(body, dict) else {})))
+            return body
 
-        return body
+        self._invalidate(*keys)
+        return self._call('PUT', '%s/%s' % (self.path, vaultedShopperId), data=data, result=updated,
+                          deadline=deadline)
 
 
 class TransactionMetadata:
@@ -1170,8 +1223,8 @@ class TransactionMetadata:
 class TransactionResource(Resource):
     path = '/services/2/transactions'
 
-    def __init__(self):
-        super(TransactionResource, self).__init__()
+    def __init__(self, client=None):
+        super(TransactionResource, self).__init__(client=client)
 
     def authCapture(
             self,
@@ -1189,7 +1242,8 @@ class TransactionResource(Resource):
             networkTransactionInfo: NetworkTransactionInfo = None,
             threeDSecure: ThreeDSecure = None,
             transactionOrderSource: str = None,
-            transactionMetadataObjectList: list = ()
+            transactionMetadataObjectList: list = (),
+            deadline: Optional[float] = None,
     ) -> dict:
         """
         Auth Capture performs two actions via a single request:
@@ -1217,6 +1271,7 @@ class TransactionResource(Resource):
         :param threeDSecure: Contains 3D Secure details for this transaction
         :param transactionOrderSource: Identifies the order type. The only option is MOTO (Mail Order Telephone Order).
         :param transactionMetadataObjectList:
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
@@ -1236,10 +1291,11 @@ class TransactionResource(Resource):
             networkTransactionInfo=networkTransactionInfo,
             threeDSecure=threeDSecure,
             transactionOrderSource=transactionOrderSource,
-            transactionMetadataObjectList=transactionMetadataObjectList
+            transactionMetadataObjectList=transactionMetadataObjectList,
+            deadline=deadline,
         )
 
-    def retrieve(self, transactionId: str) -> dict:
+    def retrieve(self, transactionId: str, deadline: Optional[float] = None) -> dict:
 
         """
         Retrieve is a request that gets details about a past transaction, such as the transaction type, amount,
@@ -1248,12 +1304,12 @@ class TransactionResource(Resource):
         https://developers.bluesnap.com/v8976-JSON/docs/retrieve
 
         :param transactionId: transaction ID received in the response from BlueSnap
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
-        response, body = self.request('GET', '%s/%s' % (self.path, transactionId))
-
-        return dict(body['card-transaction'])
+        return self._call('GET', '%s/%s' % (self.path, transactionId),
+                          result=lambda response, body: dict(body['card-transaction']), deadline=deadline)
 
     def auth(
             self,
@@ -1270,8 +1326,8 @@ class TransactionResource(Resource):
             softDescriptor: str = None,
             descriptorPhoneNumber: str = None,
             level3Data: Level3Data = None,
-            transactionMetadataObjectList: list = ()
-
+            transactionMetadataObjectList: list = (),
+            deadline: Optional[float] = None,
     ) -> dict:
         """
         Auth Only is a request to check whether a credit card is valid and has the funds to complete a specific
@@ -1302,6 +1358,7 @@ class TransactionResource(Resource):
             statement. Maximum 20 characters. Overrides merchant default value.
         :param level3Data: Contains Level 2/3 data properties for the transaction
         :param transactionMetadataObjectList:
+        :param deadline: Maximum number of seconds the call may take
 
         :return:
         """
@@ -1322,6 +1379,7 @@ class TransactionResource(Resource):
             descriptorPhoneNumber=descriptorPhoneNumber,
             level3Data=level3Data,
             transactionMetadataObjectList=transactionMetadataObjectList,
+            deadline=deadline,
         )
 
     def capture(
@@ -1330,7 +1388,8 @@ class TransactionResource(Resource):
             amount: str,
             softDescriptor: str = None,
             level3Data: Level3Data = None,
-            transactionMetadataObjectList: list = ()
+            transactionMetadataObjectList: list = (),
+            deadline: Optional[float] = None,
     ) -> dict:
         """
         Capture is a request that submits a previously authorized transaction for settlement (i.e. payment by the
@@ -1350,6 +1409,7 @@ class TransactionResource(Resource):
             Maximum 20 characters. Overrides merchant default value.
         :param level3Data: Contains Level 2/3 data properties for the transaction
         :param transactionMetadataObjectList:
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
@@ -1359,10 +1419,11 @@ class TransactionResource(Resource):
             amount=amount,
             softDescriptor=softDescriptor,
             level3Data=level3Data,
-            transactionMetadataObjectList=transactionMetadataObjectList
+            transactionMetadataObjectList=transactionMetadataObjectList,
+            deadline=deadline,
         )
 
-    def reverse(self, transactionId: str) -> dict:
+    def reverse(self, transactionId: str, deadline: Optional[float] = None) -> dict:
 
         """
         Auth Reversal is a request that reverses, or voids, a previously approved authorization that has not yet
@@ -1375,6 +1436,7 @@ class TransactionResource(Resource):
         https://developers.bluesnap.com/v8976-JSON/docs/auth-reversal
 
         :param transactionId: transaction ID received in the response from BlueSnap
+        :param deadline: Maximum number of seconds the call may take
         :return:
         """
 
@@ -1382,6 +1444,7 @@ class TransactionResource(Resource):
             cardTransactionType="AUTH_REVERSAL",
             transactionId=transactionId,
             mode="PUT",
+            deadline=deadline,
         )
 
     def _executeTransaction(
@@ -1405,6 +1468,7 @@ class TransactionResource(Resource):
             transactionOrderSource: Optional[str] = None,
             transactionMetadataObjectList: list = (),
             mode: str = "POST",
+            deadline: Optional[float] = None,
     ) -> dict:
         """
         Internal, perform an auth/capture operation.
@@ -1429,6 +1493,8 @@ class TransactionResource(Resource):
         :param threeDSecure: Contains 3D Secure details for this transaction
         :param transactionOrderSource: Identifies the order type. The only option is MOTO (Mail Order Telephone Order).
         :param transactionMetadataObjectList:
+        :param mode: HTTP method
+        :param deadline: Maximum number of seconds the call may take
 
         :return:
         """
@@ -1500,6 +1566,4 @@ class TransactionResource(Resource):
                 'metaData': transactionMetaData
             }
 
-        response, body = self.request(mode, self.path, data=data)
-
-        return body
+        return self._call(mode, self.path, data=data, deadline=deadline)
@@ -0,0 +1,146 @@
+"""
+Retrying failed API calls.
+
+A RetryPolicy decides whether a failed attempt may be retried and how long to back off before doing so. Only
+idempotent requests are retried after they may have reached BlueSnap: GETs (and PUTs) always are, while POSTs are
+only retried when they carry a merchantTransactionId, which BlueSnap uses to detect duplicate transactions. The
+policy can generate that id for new transactions.
+"""
+import asyncio
+import functools
+import random
+import time
+import uuid
+
+from .ratelimit import parse_retry_after
+
+
+# The error tuples are computed once, on the first failed attempt: a missing aiohttp would otherwise be looked for
+# on every one
+@functools.lru_cache(maxsize=None)
+def _connect_errors():
+    """
+    Errors raised before the request was sent, which are safe to retry for any request
+    """
+    import requests
+
+    errors = (requests.ConnectTimeout,)
+    try:
+        import aiohttp
+    except ImportError:
+        return errors
+    return errors + (aiohttp.ClientConnectorError,)
+
+
+@functools.lru_cache(maxsize=None)
+def _transient_errors():
+    import requests
+
+    errors = (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError, asyncio.TimeoutError)
+    try:
+        import aiohttp
+    except ImportError:
+        return errors
+    return errors + (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError)
+
+
+class RetryPolicy(object):
+    # Transaction types that create a new transaction, and may be given a generated merchantTransactionId
+    NEW_TRANSACTION_TYPES = {'AUTH_CAPTURE', 'AUTH_ONLY'}
+
+    def __init__(self,
+                 max_attempts=3,
+                 backoff_base=0.1,
+                 backoff_max=5.0,
+                 jitter=True,
+                 status_codes=(429, 500, 502, 503, 504),
+                 idempotent_methods=('GET', 'HEAD', 'PUT', 'DELETE'),
+                 generate_merchant_transaction_id=False,
+                 sleep=time.sleep,
+                 random=random.random):
+        """
+        :param max_attempts: Maximum number of attempts per call, including the first one
+        :param backoff_base: Delay before the first retry, in seconds. Doubles after every attempt.
+        :param backoff_max: Maximum delay between two attempts, in seconds
+        :param jitter: Randomize delays between 0 and the exponential backoff ("full jitter"), so that clients that
+            failed together do not retry together
+        :param status_codes: HTTP status codes that are retried. A Retry-After header is honoured, and the call is
+            not retried if it asks to wait longer than backoff_max.
+        :param idempotent_methods: HTTP methods that are always safe to retry
+        :param generate_merchant_transaction_id: Add a random merchantTransactionId to new transactions that do not
+            have one, which makes them safe to retry
+        """
+        if max_attempts < 1:
+            raise ValueError('max_attempts must be at least 1.')
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.status_codes = set(status_codes)
+        self.idempotent_methods = set(idempotent_methods)
+        self.generate_merchant_transaction_id = generate_merchant_transaction_id
+        self.sleep = sleep
+        self._random = random
+
+    def prepare_data(self, method, path, data):
+        """
+        :return: Request data, with a generated merchantTransactionId if enabled and needed
+        """
+        if (self.generate_merchant_transaction_id
+                and method == 'POST'
+                and isinstance(data, dict)
+                and data.get('cardTransactionType') in self.NEW_TRANSACTION_TYPES
+                and not data.get('merchantTransactionId')):
+            data = dict(data, merchantTransactionId=uuid.uuid4().hex)
+        return data
+
+    def is_idempotent(self, method, data):
+        if method in self.idempotent_methods:
+            return True
+        return method == 'POST' and isinstance(data, dict) and bool(data.get('merchantTransactionId'))
+
+    def backoff(self, attempt):
+        """
+        :param attempt: Number of the attempt that failed, starting at 1
+        :return: Seconds to wait before the next attempt
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1)))
+        if self.jitter:
+            delay *= self._random()
+        return delay
+
+    def retry_delay(self, attempt, idempotent, response=None, error=None):
+        """
+        Decide whether a failed attempt is retried.
+
+        :param attempt: Number of the attempt that failed, starting at 1
+        :param idempotent: Whether the request is safe to send twice
+        :param response: Response of the attempt, if one was received
+        :param error: Exception raised by the attempt, if no response was received
+        :return: Seconds to wait before retrying, or None if the attempt must not be retried
+        """
+        if attempt >= self.max_attempts:
+            return None
+
+        retry_after = None
+
+        if error is not None:
+            if not isinstance(error, _transient_errors()):
+                return None
+            if not idempotent and not isinstance(error, _connect_errors()):
+                return None
+        elif response is not None:
+            if response.status_code not in self.status_codes or not idempotent:
+                return None
+            retry_after = parse_retry_after(response.headers.get('retry-after'))
+        else:
+            return None
+
+        delay = self.backoff(attempt)
+        if retry_after is not None:
+            if retry_after > self.backoff_max:
+                # Honouring it would take longer than we are willing to wait
+                return None
+            delay = max(delay, retry_after)
+        return delay
@@ -0,0 +1,134 @@
+"""
+Coalescing of concurrent identical requests.
+
+While a GET is in flight, identical GETs made through the same client wait for it instead of making their own round
+trip to BlueSnap, and every caller gets its own copy of the parsed body, so that callers can modify what they
+receive without affecting each other. SingleFlight serves threads of a Client, AsyncSingleFlight coroutines of an
+AsyncClient.
+
+Only requests that are in flight at the same time are coalesced, nothing is cached. A shared request that ran out of
+its leader's deadline is not the other callers' failure: they make the request again, with their own deadline.
+"""
+import copy
+import threading
+
+from .exceptions import DeadlineExceededError
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.callers = 1
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+        # Number of calls that actually reached BlueSnap, and that were served by another caller's request
+        self.requests = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, deadline):
+        """
+        Call fn(), or wait for the result of the call in flight for the same key.
+
+        :param key: (method, path) of the request
+        :param fn: Callable returning a (response, body) tuple
+        :param deadline: bluesnap.deadline.Deadline of the caller, bounding how long it waits
+        :return: (response, body) tuple, with a body not shared with any other caller
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    self.requests += 1
+                    break
+                call.callers += 1
+                self.coalesced += 1
+
+            if not call.done.wait(timeout=deadline.remaining()):
+                raise deadline.exceeded(reason='coalesced request still in flight')
+            if isinstance(call.error, DeadlineExceededError):
+                # The leader ran out of its own deadline: try again, as the leader if no other call is in flight
+                continue
+            if call.error is not None:
+                raise call.error
+            response, body = call.result
+            return response, copy.deepcopy(body)
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        response, body = call.result
+        # No caller can join anymore, only copy the body if others are going to read it
+        return response, copy.deepcopy(body) if call.callers > 1 else body
+
+
+class _AsyncCall(object):
+    def __init__(self, task):
+        self.task = task
+        self.callers = 0
+        self.waiting = 0
+
+
+class AsyncSingleFlight(object):
+    def __init__(self):
+        self._calls = {}
+
+        self.requests = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, deadline):
+        """
+        Await fn(), or the call in flight for the same key. The shared request runs in its own task, which is only
+        cancelled once every caller waiting for it was cancelled.
+
+        :param key: (method, path) of the request
+        :param fn: Coroutine function returning a (response, body) tuple
+        :param deadline: bluesnap.deadline.Deadline of the caller, bounding how long it waits
+        :return: (response, body) tuple, with a body not shared with any other caller
+        """
+        import asyncio
+
+        while True:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _AsyncCall(asyncio.ensure_future(fn()))
+                # Runs before any caller resumes, so no caller can join once one of them has the result
+                call.task.add_done_callback(lambda task: self._calls.pop(key, None))
+                self.requests += 1
+            else:
+                self.coalesced += 1
+            call.callers += 1
+
+            call.waiting += 1
+            try:
+                done, _ = await asyncio.wait({call.task}, timeout=deadline.remaining())
+            finally:
+                call.waiting -= 1
+                if not call.waiting and not call.task.done():
+                    call.task.cancel()
+
+            if not done:
+                raise deadline.exceeded(reason='coalesced request still in flight')
+
+            if (not leader and not call.task.cancelled() and
+                    isinstance(call.task.exception(), DeadlineExceededError)):
+                # The leader ran out of its own deadline: try again, as the leader if no other call is in flight
+                continue
+
+            response, body = call.task.result()
+            return response, copy.deepcopy(body) if call.callers > 1 else body
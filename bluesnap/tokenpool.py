@@ -0,0 +1,180 @@
+"""
+Pre-fetched Hosted Payment Fields tokens.
+
+Creating a pfToken is a round trip to BlueSnap on the critical path of rendering a checkout page. A
+PaymentFieldsTokenPool keeps tokens fetched ahead of time by a background thread, so that rendering a page takes one
+locally. The pool is refilled whenever it drops below its low-water mark, and tokens are evicted before BlueSnap
+expires them (60 minutes after creation).
+
+Only tokens that are not bound to a shopper can be pooled. Requires a blocking Client.
+"""
+import collections
+import threading
+import time
+
+from . import resources
+
+
+class PaymentFieldsTokenPool(object):
+    def __init__(self,
+                 size=10,
+                 low_water_mark=None,
+                 max_age=50 * 60,
+                 retry_interval=5.0,
+                 deadline=None,
+                 client=None,
+                 clock=time.monotonic):
+        """
+        :param size: Number of tokens kept pre-fetched
+        :param low_water_mark: Refill the pool back to size when it holds fewer tokens than this, defaults to half of
+            size
+        :param max_age: Seconds after which a token is evicted. Keep it well below BlueSnap's 60 minutes expiry, so
+            that the shopper has time to fill in the checkout page.
+        :param retry_interval: Seconds to wait before refilling again after failing to fetch a token
+        :param deadline: Maximum number of seconds each token creation may take
+        :param client: Client used to fetch tokens, defaults to the configured client
+        """
+        if low_water_mark is None:
+            low_water_mark = max(1, size // 2)
+        if not 1 <= low_water_mark <= size:
+            raise ValueError('low_water_mark must be between 1 and size.')
+
+        self.size = size
+        self.low_water_mark = low_water_mark
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.deadline = deadline
+        self.resource = resources.PaymentFieldsTokenResource(client=client)
+        self._clock = clock
+
+        # (fetched at, token), oldest first
+        self._tokens = collections.deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._closed = False
+
+        self.hits = 0
+        self.misses = 0
+        self.fetched = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        with self._condition:
+            self._evict_expired()
+            return len(self._tokens)
+
+    def start(self):
+        """
+        Start filling the pool in the background. Called by get() if needed.
+        """
+        with self._condition:
+            if self._thread is not None or self._closed:
+                return
+            self._thread = threading.Thread(target=self._refill, name='bluesnap-pf-token-pool', daemon=True)
+            self._thread.start()
+
+    def close(self, timeout=1.0):
+        """
+        Stop the background thread and drop all pooled tokens.
+
+        The thread checks whether the pool is closed between token creations, and cannot interrupt one in progress,
+        which may take up to the client's read_timeout. Such a token is discarded when it arrives. The thread is a
+        daemon, so it doesn't keep the interpreter from exiting in the meantime.
+
+        :param timeout: Maximum number of seconds to wait for the thread to stop, None to wait until it does
+        :return: Whether the thread stopped
+        """
+        with self._condition:
+            self._closed = True
+            self._tokens.clear()
+            self._condition.notify_all()
+            thread = self._thread
+
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def get(self):
+        """
+        Take a token from the pool, or create one right away if the pool is empty
+
+        :return: pfToken
+        """
+        self.start()
+
+        with self._condition:
+            self._evict_expired()
+            if self._tokens:
+                _, token = self._tokens.popleft()
+                self.hits += 1
+            else:
+                token = None
+                self.misses += 1
+            if len(self._tokens) < self.low_water_mark:
+                self._condition.notify_all()
+
+        if token is None:
+            token = self.resource.create(deadline=self.deadline)
+        return token
+
+    def _evict_expired(self):
+        now = self._clock()
+        while self._tokens and now - self._tokens[0][0] >= self.max_age:
+            self._tokens.popleft()
+            self.evictions += 1
+
+    def _refill(self):
+        while True:
+            with self._condition:
+                while not self._closed:
+                    self._evict_expired()
+                    if len(self._tokens) < self.low_water_mark:
+                        break
+                    # Sleep until a get() takes the pool below the low-water mark, or the oldest token expires
+                    self._condition.wait(self.max_age - (self._clock() - self._tokens[0][0]))
+                if self._closed:
+                    return
+                missing = self.size - len(self._tokens)
+
+            for _ in range(missing):
+                # Age is counted from before the request, BlueSnap may have created the token any time during it
+                fetched_at = self._clock()
+                try:
+                    token = self.resource.create(deadline=self.deadline)
+                except Exception as e:
+                    with self._condition:
+                        self.errors += 1
+                        if self.resource.client.logger:
+                            self.resource.client.logger.warning('Failed to pre-fetch a pfToken: %r', e)
+                        self._condition.wait(self.retry_interval)
+                    break
+
+                with self._condition:
+                    if self._closed:
+                        return
+                    self._tokens.append((fetched_at, token))
+                    self.fetched += 1
+
+    def stats(self):
+        """
+        :return: dict of the pool size and counters, for metrics
+        """
+        with self._condition:
+            self._evict_expired()
+            return {
+                'size': len(self._tokens),
+                'hits': self.hits,
+                'misses': self.misses,
+                'fetched': self.fetched,
+                'evictions': self.evictions,
+                'errors': self.errors,
+            }
@@ -0,0 +1,370 @@
+"""
+HTTP transports of the blocking Client.
+
+A transport only sends prepared requests and returns their responses. Everything else is done by the client, the same
+way whichever transport is used: preparing requests, rate limiting, circuit breakers, retries, hedging, logging, and
+turning responses into bodies or exceptions.
+
+* RequestsTransport, the default, sends requests through a requests.Session.
+* Urllib3Transport sends them straight through a urllib3.PoolManager. It skips the session machinery (hooks, cookies,
+  redirects, adapters and response wrapping), which makes it cheaper per call, see benchmarks/transports.py.
+  Connection errors and timeouts are raised as the requests exceptions RequestsTransport raises.
+* InMemoryTransport never touches the network and answers requests with a function, for tests.
+
+Any object with the methods of Transport can be passed to a Client as transport.
+"""
+import datetime
+import http
+import threading
+import time
+
+
+class Request(object):
+    """
+    HTTP request, with the parts of requests.PreparedRequest used by clients, logging and transports
+    """
+
+    def __init__(self, method, url, headers, body):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+    def copy(self):
+        return Request(self.method, self.url, dict(self.headers), self.body)
+
+
+class Response(object):
+    """
+    HTTP response, with the parts of requests.Response used by clients, resources and logging
+    """
+
+    def __init__(self, url, status_code, reason, headers, content, elapsed):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.content = content
+        self.elapsed = elapsed
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def close(self):
+        """
+        Nothing to release, the content was read in full
+        """
+
+
+class Transport(object):
+    def new_request(self, method, url, headers, body):
+        """
+        :param headers: dict of all headers to send, owned by the request
+        :return: Request object to pass to send()
+        """
+        return Request(method, url, headers, body)
+
+    def send(self, request, timeout):
+        """
+        :param request: Request returned by new_request()
+        :param timeout: Tuple of (connect, read) timeouts, in seconds
+        :return: Response, or any object with the same attributes
+        :raises requests.RequestException: if no response was received
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close all pooled connections. A new pool is created if the transport is used again afterwards.
+        """
+
+    def pool_stats(self):
+        """
+        :return: List of dicts with the state of each per-host connection pool
+        """
+        return []
+
+
+def _pool_stats(pool_manager):
+    """
+    :param pool_manager: urllib3.PoolManager
+    """
+    pools = []
+    for key in list(pool_manager.pools.keys()):
+        pool = pool_manager.pools.get(key)
+        if pool is None:
+            continue
+
+        idle_connections = 0
+        if pool.pool is not None:
+            idle_connections = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+
+        pools.append({
+            'host': pool.host,
+            'port': pool.port,
+            'maxsize': pool.pool.maxsize if pool.pool is not None else 0,
+            'connections_created': pool.num_connections,
+            'idle_connections': idle_connections,
+            'requests': pool.num_requests,
+        })
+    return pools
+
+
+class RequestsTransport(Transport):
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False):
+        """
+        :param pool_connections: Number of per-host connection pools to keep
+        :param pool_maxsize: Maximum number of connections kept per host
+        :param pool_block: Whether to wait for a free connection rather than open one more than pool_maxsize
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        Long-lived HTTP session, created on first use. Keeps connections to BlueSnap alive between calls so
+        that only the first request pays for the TCP and TLS handshakes.
+
+        :rtype: requests.Session
+        """
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        from http.cookiejar import DefaultCookiePolicy
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+
+        # A fresh session used to be created for every call, so never carry cookies from one call to the next
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=self.pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        return session
+
+    def new_request(self, method, url, headers, body):
+        """
+        :rtype: requests.PreparedRequest
+        """
+        from requests.models import PreparedRequest
+        from requests.structures import CaseInsensitiveDict
+
+        # Prepared from the client's cached prelude rather than by requests.Request.prepare(), with the same result
+        request = PreparedRequest()
+        request.method = method
+        request.url = url
+        request.headers = CaseInsensitiveDict(headers)
+        request.body = body
+        return request
+
+    def send(self, request, timeout):
+        """
+        :rtype: requests.Response
+        """
+        return self.session.send(request, timeout=timeout)
+
+    def close(self):
+        with self._lock:
+            session, self._session = self._session, None
+
+        if session is not None:
+            session.close()
+
+    def pool_stats(self):
+        session = self._session
+        if session is None:
+            return []
+        return _pool_stats(session.get_adapter('https://').poolmanager)
+
+
+class Urllib3Transport(Transport):
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False, ca_certs=None):
+        """
+        :param pool_connections: Number of per-host connection pools to keep
+        :param pool_maxsize: Maximum number of connections kept per host
+        :param pool_block: Whether to wait for a free connection rather than open one more than pool_maxsize
+        :param ca_certs: CA bundle to verify BlueSnap's certificate with, certifi's (as requests uses) if None
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.ca_certs = ca_certs
+
+        self._pool_manager = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool_manager(self):
+        """
+        :rtype: urllib3.PoolManager
+        """
+        if self._pool_manager is None:
+            with self._lock:
+                if self._pool_manager is None:
+                    self._pool_manager = self._create_pool_manager()
+        return self._pool_manager
+
+    def _create_pool_manager(self):
+        import urllib3
+
+        ca_certs = self.ca_certs
+        if ca_certs is None:
+            import certifi
+            ca_certs = certifi.where()
+
+        self._urllib3 = urllib3
+        return urllib3.PoolManager(
+            num_pools=self.pool_connections,
+            maxsize=self.pool_maxsize,
+            block=self.pool_block,
+            cert_reqs='CERT_REQUIRED',
+            ca_certs=ca_certs)
+
+    def send(self, request, timeout):
+        pool_manager = self.pool_manager
+        urllib3 = self._urllib3
+
+        started = time.monotonic()
+        try:
+            res = pool_manager.urlopen(
+                request.method, request.url,
+                body=request.body,
+                headers=request.headers,
+                timeout=urllib3.Timeout(connect=timeout[0], read=timeout[1]),
+                retries=False,
+                redirect=False,
+                preload_content=True)
+        except urllib3.exceptions.HTTPError as e:
+            raise _requests_error(e, request) from e
+        except OSError as e:
+            raise _requests_error(e, request) from e
+
+        return Response(
+            url=request.url,
+            status_code=res.status,
+            reason=res.reason,
+            headers=res.headers,
+            content=res.data,
+            elapsed=datetime.timedelta(seconds=time.monotonic() - started))
+
+    def close(self):
+        with self._lock:
+            pool_manager, self._pool_manager = self._pool_manager, None
+
+        if pool_manager is not None:
+            pool_manager.clear()
+
+    def pool_stats(self):
+        pool_manager = self._pool_manager
+        if pool_manager is None:
+            return []
+        return _pool_stats(pool_manager)
+
+
+def _requests_error(error, request):
+    """
+    :return: The exception requests raises for a urllib3 error, as requests.adapters.HTTPAdapter maps them
+    """
+    import requests
+    from urllib3 import exceptions
+
+    if isinstance(error, exceptions.NewConnectionError):
+        return requests.ConnectionError(error, request=request)
+    if isinstance(error, exceptions.ConnectTimeoutError):
+        return requests.ConnectTimeout(error, request=request)
+    if isinstance(error, exceptions.ReadTimeoutError):
+        return requests.ReadTimeout(error, request=request)
+    if isinstance(error, exceptions.SSLError):
+        return requests.exceptions.SSLError(error, request=request)
+    if isinstance(error, exceptions.ProxyError):
+        return requests.exceptions.ProxyError(error, request=request)
+    if isinstance(error, exceptions.InvalidHeader):
+        return requests.exceptions.InvalidHeader(error, request=request)
+    if isinstance(error, exceptions.LocationValueError):
+        return requests.exceptions.InvalidURL(error, request=request)
+    if isinstance(error, exceptions.HTTPError) and not isinstance(
+            error, (exceptions.ProtocolError, exceptions.ClosedPoolError, exceptions.MaxRetryError)):
+        return requests.RequestException(error, request=request)
+    return requests.ConnectionError(error, request=request)
+
+
+class InMemoryTransport(Transport):
+    """
+    Transport answering requests with a function instead of sending them, for tests
+    """
+
+    def __init__(self, handler, json_codec=None, record=True):
+        """
+        :param handler: Function called with each Request, returning a Response or a (status code, headers, body)
+            tuple, with headers as a dict and body as bytes, str, or a dict or list sent as JSON. May raise
+            requests exceptions to simulate network errors.
+        :param json_codec: bluesnap.jsoncodec.JSONCodec encoding JSON bodies, the fastest installed if None
+        :param record: Whether to keep every request sent in requests, which grows without bound
+        """
+        from .jsoncodec import default_codec
+
+        self.handler = handler
+        self.json_codec = json_codec or default_codec()
+        self.record = record
+
+        # Every request sent, in order
+        self.requests = []
+
+    def send(self, request, timeout):
+        started = time.monotonic()
+        if self.record:
+            self.requests.append(request)
+
+        response = self.handler(request)
+        if isinstance(response, Response):
+            return response
+
+        status_code, headers, body = response
+        return self.response(request, status_code, headers, body, time.monotonic() - started)
+
+    def response(self, request, status_code, headers=None, body=None, elapsed=0.0):
+        """
+        :return: Response to request, with case-insensitive headers and a content-type matching the body if none
+            is given
+        """
+        from requests.structures import CaseInsensitiveDict
+
+        headers = CaseInsensitiveDict(headers or {})
+        if isinstance(body, (dict, list)):
+            body = self.json_codec.dumps(body)
+            headers.setdefault('content-type', 'application/json')
+        elif isinstance(body, str):
+            body = body.encode('utf-8')
+        if body and 'content-type' not in headers:
+            headers['content-type'] = 'application/json' if body[:1] in (b'{', b'[') else 'application/xml'
+        headers.setdefault('content-length', str(len(body or b'')))
+
+        try:
+            reason = http.HTTPStatus(status_code).phrase
+        except ValueError:
+            reason = ''
+
+        return Response(
+            url=request.url,
+            status_code=status_code,
+            reason=reason,
+            headers=headers,
+            content=body or b'',
+            elapsed=datetime.timedelta(seconds=elapsed))
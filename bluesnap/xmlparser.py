@@ -0,0 +1,183 @@
+"""
+Parsing of XML API responses.
+
+Responses of the XML API (shoppers, orders, and error messages) are turned into the dicts xmltodict produces:
+attributes as '@name' keys, text as a plain string, or as a '#text' key next to attributes or child elements,
+repeated child elements as lists, and empty elements as None. Namespaces are not processed, so the BlueSnap namespace
+shows up as an '@xmlns' key of the root element.
+
+LxmlXMLParser, the default, builds the tree in C straight from the response bytes and is about twice as fast as
+XmltodictXMLParser (see benchmarks/xml_parsing.py), which is kept for reference. Any object with a compatible parse()
+method can be passed to a client as xml_parser.
+
+lxml and xmltodict are only imported when a parser is created.
+"""
+
+
+XML_NAMESPACE = 'http://www.w3.org/XML/1998/namespace'
+
+
+class XMLParseError(ValueError):
+    pass
+
+
+class XMLParser(object):
+    def parse(self, content):
+        """
+        :param content: XML document, as bytes or str
+        :return: dict shaped like xmltodict.parse() output
+        :raises XMLParseError: if content is not well-formed XML
+        """
+        raise NotImplementedError
+
+
+class XmltodictXMLParser(XMLParser):
+    def __init__(self):
+        from pyexpat import ExpatError
+
+        import xmltodict
+
+        self._xmltodict = xmltodict
+        self._expat_error = ExpatError
+
+    def parse(self, content):
+        try:
+            return self._xmltodict.parse(content)
+        except self._expat_error as e:
+            raise XMLParseError(str(e)) from e
+
+
+class LxmlXMLParser(XMLParser):
+    # Bound of the cache of element names
+    MAX_NAMES = 1000
+
+    def __init__(self):
+        from lxml import etree
+
+        self._etree = etree
+        # Never fetch anything a response refers to
+        self._parser = etree.XMLParser(
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            remove_pis=True)
+        # Qualified names to names in documents with nothing but a default namespace, such as all BlueSnap responses
+        self._names = {}
+
+    def parse(self, content):
+        if isinstance(content, str):
+            # lxml refuses str documents with an encoding declaration
+            content = content.encode('utf-8')
+
+        etree = self._etree
+        try:
+            root = etree.fromstring(content, self._parser)
+        except etree.XMLSyntaxError as e:
+            raise XMLParseError(str(e)) from e
+
+        # Namespace declarations below the root are rare, only look for them when the document may have some
+        nested_namespaces = content.count(b'xmlns') > len(root.nsmap)
+
+        if nested_namespaces or any(prefix is not None for prefix in root.nsmap):
+            names = {}
+        else:
+            names = self._names
+            if len(names) > self.MAX_NAMES:
+                names.clear()
+
+        value = self._convert(root, {}, nested_namespaces, names)
+        return {self._name(root, root.tag): value}
+
+    @staticmethod
+    def _name(element, qualified_name):
+        """
+        :return: qualified_name ('{uri}local', or 'local') as written in the document ('prefix:local', or 'local')
+        """
+        if qualified_name[0] != '{':
+            return qualified_name
+
+        uri, local_name = qualified_name[1:].split('}', 1)
+        if uri == XML_NAMESPACE:
+            return 'xml:' + local_name
+        for prefix, namespace in element.nsmap.items():
+            if namespace == uri:
+                return '%s:%s' % (prefix, local_name) if prefix else local_name
+        return local_name
+
+    def _convert(self, element, parent_nsmap, nested_namespaces, names):
+        """
+        :param parent_nsmap: Namespaces in scope in the parent, to tell which ones element declares, or None to
+            skip looking for declarations
+        :param nested_namespaces: Whether elements below the root may declare namespaces
+        :param names: Cache of qualified names to names, shared by the whole document
+        """
+        item = None
+
+        nsmap = None
+        if parent_nsmap is not None:
+            nsmap = element.nsmap
+            declared = [(prefix, uri) for prefix, uri in nsmap.items() if parent_nsmap.get(prefix) != uri]
+            if declared:
+                item = {('@xmlns:' + prefix if prefix else '@xmlns'): uri for prefix, uri in declared}
+
+        # items() is much cheaper than the attrib proxy
+        attributes = element.items()
+        if attributes:
+            if item is None:
+                item = {}
+            for key, value in attributes:
+                item['@' + (key if key[0] != '{' else self._name(element, key))] = value
+
+        text = element.text
+        # Text pieces (text and tails of children) are joined and stripped, so blank ones before the first piece
+        # with content can be skipped, which is all of them for indented documents
+        pieces = None
+        content = text is not None and not text.isspace()
+
+        for child in element:
+            tail = child.tail
+            if tail:
+                if pieces is not None:
+                    pieces.append(tail)
+                elif content or not tail.isspace():
+                    pieces = [text or '', tail]
+
+            tag = child.tag
+            name = names.get(tag)
+            if name is None:
+                if not isinstance(tag, str):
+                    # Entity reference left unresolved
+                    continue
+                name = names[tag] = self._name(child, tag)
+
+            value = self._convert(child, nsmap if nested_namespaces else None, nested_namespaces, names)
+
+            if item is None:
+                item = {name: value}
+            elif name in item:
+                existing = item[name]
+                # Converted values are never lists, so a list means the element was repeated before
+                if type(existing) is list:
+                    existing.append(value)
+                else:
+                    item[name] = [existing, value]
+            else:
+                item[name] = value
+
+        if pieces is not None:
+            text = ''.join(pieces)
+        if text:
+            text = text.strip()
+
+        if item is None:
+            return text or None
+        if text:
+            item['#text'] = text
+        return item
+
+
+def default_parser():
+    """
+    :rtype: XMLParser
+    """
+    return LxmlXMLParser()
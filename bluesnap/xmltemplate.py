@@ -0,0 +1,68 @@
+"""
+Byte templates of XML request documents.
+
+Documents whose structure never changes, such as orders, can be serialized by joining precompiled byte strings with
+their escaped values instead of building an lxml tree and serializing it for every request. A template is compiled
+from a tree built with placeholders in place of the values, by the same builder it replaces, so that rendering it
+produces the exact bytes etree.tostring() would: the same namespace declarations, and text escaped the same way (&, <,
+> and carriage returns as entities, and everything but ASCII as character references).
+"""
+import re
+
+
+# Characters not allowed in XML 1.0 documents, which lxml refuses. Written as the complement of the allowed ones, a
+# class with the astral range is much slower to compile.
+_INVALID_CHARACTERS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+_PLACEHOLDER = re.compile(br'__bluesnap_template_(\w+?)__')
+
+
+def placeholder(name):
+    """
+    :return: Text to build a template tree with in place of the value of field name
+    """
+    return '__bluesnap_template_%s__' % name
+
+
+def escape(value):
+    """
+    :return: value escaped as etree.tostring() does in element text, or None if lxml would refuse it
+    """
+    if type(value) is not str or _INVALID_CHARACTERS.search(value):
+        return None
+    if '&' in value:
+        value = value.replace('&', '&amp;')
+    if '<' in value:
+        value = value.replace('<', '&lt;')
+    if '>' in value:
+        value = value.replace('>', '&gt;')
+    if '\r' in value:
+        value = value.replace('\r', '&#13;')
+    return value.encode('ascii', 'xmlcharrefreplace')
+
+
+class XMLTemplate(object):
+    def __init__(self, element):
+        """
+        :param element: lxml.etree._Element with placeholder() texts in place of values
+        """
+        from lxml import etree
+
+        parts = _PLACEHOLDER.split(etree.tostring(element))
+        # Literal parts at even indexes, field names at odd ones
+        self._parts = parts
+        self.fields = tuple(name.decode('ascii') for name in parts[1::2])
+
+    def render(self, values):
+        """
+        :param values: dict of field names to str values
+        :return: Serialized document, or None if a value is not a str that can be put in an XML document, to let the
+            caller fall back to building a tree, and get the same error as it would have
+        """
+        parts = self._parts[:]
+        for i in range(1, len(parts), 2):
+            value = escape(values[self.fields[i // 2]])
+            if value is None:
+                return None
+            parts[i] = value
+        return b''.join(parts)
@@ -29,6 +29,10 @@ setup(
     long_description_content_type="text/markdown",
     packages=find_packages(),
     install_requires=requires,
+    extras_require={
+        'async': ['aiohttp>=3.6'],
+        'orjson': ['orjson>=3'],
+    },
     setup_requires=requires,
     test_suite='nose.collector',
     # For a list of valid classifiers, see https://pypi.org/classifiers/
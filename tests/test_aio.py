@@ -0,0 +1,165 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, skipIf
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    web = None
+
+from bluesnap import exceptions
+from bluesnap.aio import AsyncClient, AsyncPaymentFieldsTokenResource, AsyncTransactionResource, \
+    AsyncVaultedShopperResource
+from bluesnap.cache import LookupCache
+from bluesnap.hedge import HedgePolicy
+from bluesnap.singleflight import AsyncSingleFlight
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+@skipIf(web is None, 'aiohttp is not installed')
+class AsyncClientTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.received = []
+
+        async def transactions(request):
+            data = await request.json()
+            self.received.append((request.headers['content-type'], data))
+            if data.get('amount') == '0.01':
+                return web.json_response(
+                    {'message': [{'errorName': 'INVALID_AMOUNT', 'code': '10001', 'description': 'Bad amount'}]},
+                    status=400)
+            return web.json_response(dict(data, transactionId='1012'))
+
+        async def vaulted_shopper(request):
+            if request.match_info['id'] == 'slow':
+                await asyncio.sleep(1)
+            return web.Response(
+                content_type='application/xml',
+                text='<vaulted-shopper><vaulted-shopper-id>%s</vaulted-shopper-id></vaulted-shopper>' %
+                     request.match_info['id'])
+
+        async def payment_fields_tokens(request):
+            return web.Response(status=201, headers={
+                'Location': '/services/2/payment-fields-tokens/abcdef_123'})
+
+        self.retrievals = 0
+
+        async def transaction(request):
+            self.retrievals += 1
+            if self.retrievals == 1:
+                await asyncio.sleep(1)
+            return web.Response(
+                content_type='application/xml',
+                text='<card-transaction><transaction-id>%d</transaction-id></card-transaction>' % self.retrievals)
+
+        app = web.Application()
+        app.router.add_get('/services/2/transactions/{id}', transaction)
+        app.router.add_post('/services/2/transactions', transactions)
+        app.router.add_get('/services/2/vaulted-shoppers/{id}', vaulted_shopper)
+        app.router.add_post('/services/2/payment-fields-tokens', payment_fields_tokens)
+
+        self.server = TestServer(app)
+        await self.server.start_server()
+
+        self.client = AsyncClient(env='live', **DUMMY_CREDENTIALS)
+        self.client.ENDPOINTS = {'live': str(self.server.make_url('')).rstrip('/')}
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_transaction_auth_capture(self):
+        transaction = await AsyncTransactionResource(client=self.client).authCapture(
+            amount='10.00', currency='USD', vaultedShopperId='42')
+
+        self.assertEqual(transaction['transactionId'], '1012')
+        self.assertEqual(self.received[0][0], 'application/json')
+        self.assertEqual(self.received[0][1]['cardTransactionType'], 'AUTH_CAPTURE')
+        self.assertEqual(self.client.pool_stats()['requests'], 1)
+
+    async def test_api_error_is_mapped(self):
+        with self.assertRaises(exceptions.APIError) as cm:
+            await AsyncTransactionResource(client=self.client).auth(
+                amount='0.01', currency='USD', vaultedShopperId='42')
+
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertEqual(cm.exception.messages[0]['errorName'], 'INVALID_AMOUNT')
+
+    async def test_vaulted_shopper_retrieve(self):
+        shopper = await AsyncVaultedShopperResource(client=self.client).retrieve('19')
+
+        self.assertEqual(shopper, {'vaulted-shopper-id': '19'})
+
+    async def test_cached_vaulted_shopper_retrieve(self):
+        self.client.shopper_cache = LookupCache()
+        resource = AsyncVaultedShopperResource(client=self.client)
+
+        await resource.retrieve('19')
+        shopper = await resource.retrieve('19')
+
+        self.assertEqual(shopper, {'vaulted-shopper-id': '19'})
+        self.assertEqual(self.client.shopper_cache.stats()['hits'], 1)
+        self.assertEqual(self.client.pool_stats()['requests'], 1)
+
+    async def test_deadline_exceeded(self):
+        with self.assertRaises(exceptions.DeadlineExceededError) as cm:
+            await AsyncVaultedShopperResource(client=self.client).retrieve('slow', deadline=0.1)
+
+        self.assertEqual(cm.exception.attempts, 1)
+        self.assertGreaterEqual(cm.exception.elapsed, 0.1)
+
+    async def test_hedged_retrieve(self):
+        self.client.hedge_policy = HedgePolicy(initial_delay=0.05)
+
+        transaction = await AsyncTransactionResource(client=self.client).retrieve('1')
+
+        self.assertEqual(transaction, {'transaction-id': '2'})
+        self.assertEqual(self.client.hedge_policy.stats()['GET /services/2/transactions/{id}'],
+                         {'requests': 1, 'hedges_fired': 1, 'hedges_won': 1})
+
+    async def test_concurrent_retrieves_are_coalesced(self):
+        self.client.single_flight = AsyncSingleFlight()
+        resource = AsyncTransactionResource(client=self.client)
+
+        transactions = await asyncio.gather(*[resource.retrieve('1') for _ in range(3)])
+
+        self.assertEqual(self.retrievals, 1)
+        self.assertEqual(transactions, [{'transaction-id': '1'}] * 3)
+        self.assertEqual((self.client.single_flight.requests, self.client.single_flight.coalesced), (1, 2))
+
+        transactions[0]['transaction-id'] = 'changed'
+        self.assertEqual(transactions[1]['transaction-id'], '1')
+
+    async def test_coalesced_request_survives_cancelled_caller(self):
+        self.client.single_flight = AsyncSingleFlight()
+        resource = AsyncTransactionResource(client=self.client)
+
+        first = asyncio.ensure_future(resource.retrieve('1'))
+        second = asyncio.ensure_future(resource.retrieve('1'))
+        await asyncio.sleep(0.1)
+        first.cancel()
+
+        self.assertEqual(await second, {'transaction-id': '1'})
+        self.assertEqual(self.retrievals, 1)
+
+    async def test_payment_fields_token_create(self):
+        token = await AsyncPaymentFieldsTokenResource(client=self.client).create()
+
+        self.assertEqual(token, 'abcdef_123')
+
+    async def test_context_manager_closes_session(self):
+        async with AsyncClient(env='live', **DUMMY_CREDENTIALS) as client:
+            client.ENDPOINTS = self.client.ENDPOINTS
+            await AsyncVaultedShopperResource(client=client).retrieve('1')
+            session = client._session
+
+        self.assertTrue(session.closed)
+        self.assertIsNone(client._session)
@@ -0,0 +1,155 @@
+from unittest import TestCase
+
+import requests
+import responses
+
+from bluesnap import exceptions
+from bluesnap.breaker import CircuitBreaker, CircuitBreakerRegistry
+from bluesnap.client import Client
+from bluesnap.ratelimit import RateLimiter
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.transitions = []
+        self.breaker = CircuitBreaker(
+            name='GET /services/2/transactions/{id}', window_size=4, minimum_calls=4, failure_rate_threshold=0.5,
+            open_duration=10, on_state_change=lambda *args: self.transitions.append(args[1:]), clock=self.clock)
+
+    def _calls(self, *outcomes, duration=0.1):
+        for success in outcomes:
+            self.breaker.before_call()
+            self.breaker.record(success, duration)
+
+    def test_opens_on_error_rate(self):
+        self._calls(True, True, True, False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self._calls(False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        with self.assertRaises(exceptions.CircuitOpenError) as cm:
+            self.breaker.before_call()
+        self.assertEqual(cm.exception.retry_in, 10)
+        self.assertEqual(self.breaker.stats()['rejected_calls'], 1)
+
+    def test_opens_on_latency(self):
+        self.breaker.slow_call_duration = 1.0
+
+        self._calls(True, True, duration=0.5)
+        self._calls(True, True, duration=2.0)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_half_open_probe(self):
+        self._calls(False, False, False, False)
+        self.clock.now = 10
+
+        # Only one probe is let through
+        self.breaker.before_call()
+        with self.assertRaises(exceptions.CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record(True, 0.1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.transitions, [('closed', 'open'), ('open', 'half-open'), ('half-open', 'closed')])
+
+    def test_failed_probe_reopens(self):
+        self._calls(False, False, False, False)
+        self.clock.now = 10
+
+        self._calls(False)
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.breaker.stats()['times_opened'], 2)
+
+    def test_calls_admitted_before_half_open_are_not_probes(self):
+        generation = self.breaker.before_call()
+        self._calls(False, False, False, False)
+        self.clock.now = 10
+
+        probe = self.breaker.before_call()
+        # Completes while half-open, after the breaker opened: not the probe's outcome
+        self.breaker.record(True, 0.1, generation)
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.breaker.record(False, 0.1, probe)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+class CircuitBreakerRegistryTestCase(TestCase):
+    def test_endpoint_path(self):
+        self.assertEqual(CircuitBreakerRegistry.endpoint_path('GET', '/services/2/vaulted-shoppers/123'),
+                         'GET /services/2/vaulted-shoppers/{id}')
+        self.assertEqual(CircuitBreakerRegistry.endpoint_path('GET', '/services/2/vaulted-shoppers/merchant/ab1'),
+                         'GET /services/2/vaulted-shoppers/merchant/{id}')
+        self.assertEqual(CircuitBreakerRegistry.endpoint_path('POST', '/services/2/payment-fields-tokens?shopperId=1'),
+                         'POST /services/2/payment-fields-tokens')
+
+    def test_one_breaker_per_endpoint_path(self):
+        registry = CircuitBreakerRegistry(minimum_calls=1)
+
+        breaker = registry.get('GET', '/services/2/transactions/1')
+
+        self.assertIs(registry.get('GET', '/services/2/transactions/2'), breaker)
+        self.assertIsNot(registry.get('POST', '/services/2/transactions'), breaker)
+        self.assertEqual(registry.get('GET', '/services/2/transactions/1').minimum_calls, 1)
+        self.assertIn('GET /services/2/transactions/{id}', registry.stats())
+
+
+class ClientCircuitBreakerTestCase(TestCase):
+    @responses.activate
+    def test_client_fails_fast_when_open(self):
+        registry = CircuitBreakerRegistry(window_size=2, minimum_calls=2)
+        client = Client(env='live', username='username', password='password', default_store_id='1', seller_id='1',
+                        default_currency='GBP', circuit_breaker=registry)
+        url = client.endpoint_url + '/services/2/transactions/1'
+
+        responses.add(responses.GET, url, status=503, body='')
+        responses.add(responses.GET, url, body=requests.ConnectionError('Connection reset by peer'))
+
+        with self.assertRaises(exceptions.APIError):
+            client.request('GET', '/services/2/transactions/1')
+        with self.assertRaises(requests.ConnectionError):
+            client.request('GET', '/services/2/transactions/1')
+        with self.assertRaises(exceptions.CircuitOpenError):
+            client.request('GET', '/services/2/transactions/1')
+
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(registry.stats()['GET /services/2/transactions/{id}']['state'], 'open')
+
+    @responses.activate
+    def test_client_errors_do_not_count_as_failures(self):
+        registry = CircuitBreakerRegistry(window_size=2, minimum_calls=2)
+        client = Client(env='live', username='username', password='password', default_store_id='1', seller_id='1',
+                        default_currency='GBP', circuit_breaker=registry)
+
+        responses.add(responses.GET, client.endpoint_url + '/services/2/transactions/1', status=404, body='')
+
+        for _ in range(3):
+            with self.assertRaises(exceptions.APIError):
+                client.request('GET', '/services/2/transactions/1')
+
+        self.assertEqual(registry.stats()['GET /services/2/transactions/{id}']['state'], 'closed')
+
+    @responses.activate
+    def test_open_circuit_does_not_spend_rate_limiter_tokens(self):
+        registry = CircuitBreakerRegistry(window_size=1, minimum_calls=1)
+        limiter = RateLimiter({'transactions': (1, 1)})
+        client = Client(env='live', username='username', password='password', default_store_id='1', seller_id='1',
+                        default_currency='GBP', circuit_breaker=registry, rate_limiter=limiter)
+        registry.get('GET', '/services/2/transactions/1').record(False, 0.1)
+
+        with self.assertRaises(exceptions.CircuitOpenError):
+            client.request('GET', '/services/2/transactions/1')
+
+        self.assertIsNotNone(limiter.acquire('/services/2/transactions/1', max_wait=0))
@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from bluesnap import exceptions
+from bluesnap.bulk import BulkResult, TransactionSpec, execute_transactions, execute_transactions_async
+
+
+DECLINED_AMOUNT = '0.99'
+
+
+def _response_for(data):
+    if data['amount'] == DECLINED_AMOUNT:
+        raise exceptions.CardError(description='Card declined', code='14002', status_code=400)
+    return dict(data, transactionId='tx-%s' % data['amount'])
+
+
+class FakeClient(object):
+    """
+    Stands in for Client, answering transactions after a short delay and declining DECLINED_AMOUNT.
+    """
+
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, path, data=None, deadline=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(0.01)
+            return None, _response_for(data)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class FakeAsyncClient(FakeClient):
+    async def request(self, method, path, data=None, deadline=None):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return None, _response_for(data)
+        finally:
+            self.in_flight -= 1
+
+
+def _specs(count):
+    for i in range(count):
+        amount = DECLINED_AMOUNT if i % 5 == 0 else '%d.00' % i
+        yield dict(amount=amount, currency='USD', vaultedShopperId='42', transactionInitiator='MERCHANT')
+
+
+class BulkTestCase(TestCase):
+    def test_execute_transactions_collects_errors_per_item(self):
+        client = FakeClient()
+
+        results = list(execute_transactions(_specs(20), concurrency=4, client=client))
+
+        self.assertEqual(sorted(result.index for result in results), list(range(20)))
+        self.assertLessEqual(client.max_in_flight, 4)
+
+        failed = [result for result in results if not result.ok]
+        self.assertEqual(sorted(result.index for result in failed), [0, 5, 10, 15])
+        for result in failed:
+            self.assertIsInstance(result.error, exceptions.CardError)
+            self.assertIsNone(result.result)
+
+        succeeded = [result for result in results if result.ok]
+        for result in succeeded:
+            self.assertEqual(result.result['cardTransactionType'], 'AUTH_CAPTURE')
+            self.assertEqual(result.result['transactionId'], 'tx-%s' % result.spec.kwargs['amount'])
+
+    def test_execute_transactions_with_explicit_operation(self):
+        specs = [TransactionSpec('auth', amount='1.00', currency='USD', vaultedShopperId='42')]
+
+        results = list(execute_transactions(specs, client=FakeClient()))
+
+        self.assertIsInstance(results[0], BulkResult)
+        self.assertEqual(results[0].result['cardTransactionType'], 'AUTH_ONLY')
+
+    def test_invalid_operation(self):
+        with self.assertRaises(ValueError):
+            TransactionSpec('refund', amount='1.00')
+
+    def test_invalid_specs_do_not_abort_the_batch(self):
+        specs = [dict(operation='refund', amount='1.00'), dict(amount='1.00', currency='USD', vaultedShopperId='42'),
+                 None]
+
+        results = sorted(execute_transactions(specs, client=FakeClient()), key=lambda result: result.index)
+
+        self.assertIsInstance(results[0].error, ValueError)
+        self.assertEqual(results[0].spec, specs[0])
+        self.assertTrue(results[1].ok)
+        self.assertIsInstance(results[2].error, TypeError)
+
+    def test_specs_with_unexpected_arguments_do_not_abort_the_batch(self):
+        specs = [dict(amount='1.00', currency='USD', vaultedShopperId='42', bogus=1),
+                 dict(amount='1.00', currency='USD', vaultedShopperId='42')]
+
+        results = sorted(execute_transactions(specs, client=FakeClient()), key=lambda result: result.index)
+
+        self.assertIsInstance(results[0].error, TypeError)
+        self.assertTrue(results[1].ok)
+
+
+class AsyncBulkTestCase(IsolatedAsyncioTestCase):
+    async def test_execute_transactions_async(self):
+        client = FakeAsyncClient()
+
+        results = [result async for result in execute_transactions_async(_specs(20), concurrency=3, client=client)]
+
+        self.assertEqual(sorted(result.index for result in results), list(range(20)))
+        self.assertLessEqual(client.max_in_flight, 3)
+        self.assertEqual(sorted(result.index for result in results if not result.ok), [0, 5, 10, 15])
+
+    async def test_invalid_specs_do_not_abort_the_batch(self):
+        specs = [dict(operation='refund', amount='1.00'), dict(amount='1.00', currency='USD', vaultedShopperId='42')]
+
+        results = [result async for result in execute_transactions_async(specs, client=FakeAsyncClient())]
+
+        self.assertEqual(sorted((result.index, result.ok) for result in results), [(0, False), (1, True)])
+
+    async def test_specs_with_unexpected_arguments_do_not_abort_the_batch(self):
+        specs = [dict(amount='1.00', currency='USD', vaultedShopperId='42', bogus=1),
+                 dict(amount='1.00', currency='USD', vaultedShopperId='42')]
+
+        results = [result async for result in execute_transactions_async(specs, client=FakeAsyncClient())]
+
+        self.assertEqual(sorted((result.index, type(result.error)) for result in results),
+                         [(0, TypeError), (1, type(None))])
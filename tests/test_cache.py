@@ -0,0 +1,153 @@
+from unittest import TestCase
+
+import responses
+
+from bluesnap.cache import LookupCache
+from bluesnap.client import Client
+from bluesnap.models import ContactInfo
+from bluesnap.resources import ShopperResource, VaultedShopperInfo, VaultedShopperResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '7',
+    'default_currency': 'GBP'
+}
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class LookupCacheTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LookupCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_get_and_aliases(self):
+        self.assertIsNone(self.cache.get('a'))
+
+        self.cache.set(['a', 'alias'], {'id': 'a'})
+
+        self.assertEqual(self.cache.get('a'), {'id': 'a'})
+        self.assertEqual(self.cache.get('alias'), {'id': 'a'})
+        self.assertEqual(len(self.cache), 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_values_are_copied(self):
+        value = {'cards': [1]}
+        self.cache.set(['a'], value)
+        value['cards'].append(2)
+
+        cached = self.cache.get('a')
+        cached['cards'].append(3)
+
+        self.assertEqual(self.cache.get('a'), {'cards': [1]})
+
+    def test_least_recently_used_is_evicted(self):
+        self.cache.set(['a', 'alias'], 'a')
+        self.cache.set(['b'], 'b')
+        self.cache.get('a')
+        self.cache.set(['c'], 'c')
+
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.get('alias'), 'a')
+        self.assertEqual(self.cache.get('c'), 'c')
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_entries_expire(self):
+        self.cache.set(['a', 'alias'], 'a')
+        self.clock.now += 10
+
+        self.assertIsNone(self.cache.get('alias'))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.expirations, 1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidating_any_key_drops_entry(self):
+        self.cache.set(['a', 'alias'], 'a')
+        self.cache.invalidate('alias')
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_set_replaces_entries_sharing_a_key(self):
+        self.cache.set(['a', 'alias'], 'old')
+        self.cache.set(['alias'], 'new')
+
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self.cache.get('alias'), 'new')
+
+
+class ResourceCacheTestCase(TestCase):
+    def setUp(self):
+        self.cache = LookupCache()
+        self.client = Client(env='live', shopper_cache=self.cache, **DUMMY_CREDENTIALS)
+        self.url = self.client.endpoint_url + '/services/2'
+
+    @responses.activate
+    def test_vaulted_shopper_is_cached_by_both_ids(self):
+        responses.add(responses.GET, self.url + '/vaulted-shoppers/19', status=200, content_type='application/xml',
+                      body='<vaulted-shopper><vaulted-shopper-id>19</vaulted-shopper-id>'
+                           '<merchant-shopper-id>m-19</merchant-shopper-id></vaulted-shopper>')
+        resource = VaultedShopperResource(client=self.client)
+
+        shopper = resource.retrieve('19')
+        shopper['first-name'] = 'changed'
+
+        self.assertEqual(resource.retrieve('19'), {'vaulted-shopper-id': '19', 'merchant-shopper-id': 'm-19'})
+        self.assertEqual(resource.retrieveByMerchantShopperId('m-19')['vaulted-shopper-id'], '19')
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    @responses.activate
+    def test_vaulted_shopper_update_invalidates(self):
+        responses.add(responses.GET, self.url + '/vaulted-shoppers/merchant/m-19', status=200,
+                      content_type='application/xml',
+                      body='<vaulted-shopper><vaulted-shopper-id>19</vaulted-shopper-id>'
+                           '<merchant-shopper-id>m-19</merchant-shopper-id></vaulted-shopper>')
+        responses.add(responses.PUT, self.url + '/vaulted-shoppers/19', status=200,
+                      json={'vaultedShopperId': 19, 'merchantShopperId': 'm-19', 'firstName': 'Jane'})
+        resource = VaultedShopperResource(client=self.client)
+
+        resource.retrieveByMerchantShopperId('m-19')
+        resource.update('19', VaultedShopperInfo(firstName='Jane', lastName='Doe'), paymentSource=[])
+        resource.retrieveByMerchantShopperId('m-19')
+
+        self.assertEqual([call.request.method for call in responses.calls], ['GET', 'PUT', 'GET'])
+
+    @responses.activate
+    def test_shopper_is_cached_by_both_ids(self):
+        responses.add(responses.GET, self.url + '/shoppers/42', status=200, content_type='application/xml',
+                      body='<shopper><shopper-info><shopper-id>42</shopper-id>'
+                           '<seller-shopper-id>s-42</seller-shopper-id></shopper-info></shopper>')
+        responses.add(responses.PUT, self.url + '/shoppers/42', status=204)
+        resource = ShopperResource(client=self.client)
+
+        resource.find_by_shopper_id('42')
+        shopper = resource.find_by_seller_shopper_id('s-42')
+        self.assertEqual(shopper['shopper-info']['shopper-id'], '42')
+        self.assertEqual(len(responses.calls), 1)
+
+        contact_info = ContactInfo(email='jane@example.com', first_name='Jane', last_name='Doe', client=self.client)
+        self.assertTrue(resource.update('42', contact_info))
+        resource.find_by_shopper_id('42')
+
+        self.assertEqual([call.request.method for call in responses.calls], ['GET', 'PUT', 'GET'])
+
+    @responses.activate
+    def test_no_cache_by_default(self):
+        responses.add(responses.GET, self.url + '/vaulted-shoppers/19', status=200, content_type='application/xml',
+                      body='<vaulted-shopper><vaulted-shopper-id>19</vaulted-shopper-id></vaulted-shopper>')
+        resource = VaultedShopperResource(client=Client(env='live', **DUMMY_CREDENTIALS))
+
+        resource.retrieve('19')
+        resource.retrieve('19')
+
+        self.assertEqual(len(responses.calls), 2)
@@ -1,6 +1,13 @@
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-from bluesnap.client import Client
+import requests
+import responses
+from lxml import etree
+
+from bluesnap.aio import AsyncClient
+from bluesnap.client import Client, default_user_agent
 
 
 class ClientTestCase(unittest.TestCase):
@@ -21,3 +28,170 @@ class ClientTestCase(unittest.TestCase):
         for env, endpoint_url in Client.ENDPOINTS.items():
             client = Client(env=env, **self.DUMMY_CREDENTIALS)
             self.assertEqual(client.endpoint_url, endpoint_url)
+
+    def test_session_is_reused_between_calls(self):
+        session = self.client.session
+
+        self.assertIs(self.client.session, session)
+
+        adapter = session.get_adapter(self.client.endpoint_url)
+        self.assertEqual(adapter._pool_connections, 10)
+        self.assertEqual(adapter._pool_maxsize, 10)
+
+    @responses.activate
+    def test_pool_stats_count_requests(self):
+        responses.add(responses.GET, self.client.endpoint_url + '/services/2/shoppers/1', status=200,
+                      content_type='application/xml', body='<shopper/>')
+
+        self.client.request('GET', '/services/2/shoppers/1')
+        self.client.request('GET', '/services/2/shoppers/1')
+
+        stats = self.client.pool_stats()
+        self.assertEqual(stats['requests'], 2)
+        self.assertIn('pools', stats)
+
+    @responses.activate
+    def test_keep_alive_disabled_sends_connection_close(self):
+        responses.add(responses.GET, self.client.endpoint_url + '/services/2/shoppers/1', status=200,
+                      content_type='application/xml', body='<shopper/>')
+
+        client = Client(env='live', keep_alive=False, **self.DUMMY_CREDENTIALS)
+        client.request('GET', '/services/2/shoppers/1')
+
+        self.assertEqual(responses.calls[0].request.headers['connection'], 'close')
+
+    def test_close_and_context_manager(self):
+        with Client(env='live', pool_maxsize=2, **self.DUMMY_CREDENTIALS) as client:
+            session = client.session
+            self.assertEqual(session.get_adapter(client.endpoint_url)._pool_maxsize, 2)
+
+        self.assertIsNone(client.transport._session)
+        self.assertIsNot(client.session, session)
+
+
+class RequestPreludeTestCase(unittest.TestCase):
+    PATHS = ['/services/2/shoppers/1', '/services/2/vaulted-shoppers?shopperId=1&x=a:b', '/services/2/a b/%7e',
+             '/services/2/../orders', '/services/2/Zoë', '/services/2/x?', '/services/2/x#y']
+
+    def assertPreparedAsRequests(self, client, method, path, data=None):
+        request, _ = client._prepare_request(method, path, data)
+
+        expected = requests.Request(method, client.endpoint_url + path, {
+            'content-type': request.headers['content-type'],
+            'accept': request.headers['accept'],
+            **({'connection': 'close'} if not client.keep_alive else {}),
+        }, data=request.body, auth=client.http_basic_auth).prepare()
+
+        self.assertEqual((request.method, request.url, list(request.headers.items()), request.body),
+                         (expected.method, expected.url, list(expected.headers.items()), expected.body))
+
+    def test_requests_are_prepared_as_by_requests(self):
+        for keep_alive in (True, False):
+            client = Client(env='live', keep_alive=keep_alive, **ClientTestCase.DUMMY_CREDENTIALS)
+            for path in self.PATHS:
+                for method, data in (('GET', None), ('DELETE', None), ('POST', b'<shopper/>'),
+                                     ('PUT', {'amount': 1}), ('POST', b''), ('GET', b'')):
+                    with self.subTest(keep_alive=keep_alive, path=path, method=method):
+                        self.assertPreparedAsRequests(client, method, path, data)
+
+    def test_content_length_of_memoryviews_is_in_bytes(self):
+        client = Client(env='live', **ClientTestCase.DUMMY_CREDENTIALS)
+        body = memoryview(b'<shopper/>  ').cast('I')
+
+        request, _ = client._prepare_request('POST', '/services/2/shoppers', body)
+
+        self.assertEqual(request.headers['Content-Length'], '12')
+
+    def test_prelude_is_cached_until_credentials_change(self):
+        client = Client(env='live', **ClientTestCase.DUMMY_CREDENTIALS)
+        prelude = client._request_prelude()
+        self.assertIs(client._request_prelude(), prelude)
+
+        client.password = 'new password'
+        self.assertIsNot(client._request_prelude(), prelude)
+        self.assertPreparedAsRequests(client, 'GET', '/services/2/shoppers/1')
+
+        client.ENDPOINTS = {'live': 'http://127.0.0.1:8080'}
+        request, _ = client._prepare_request('GET', '/services/2/shoppers/1')
+        self.assertEqual(request.url, 'http://127.0.0.1:8080/services/2/shoppers/1')
+
+    def test_async_requests_match(self):
+        client = Client(env='live', **ClientTestCase.DUMMY_CREDENTIALS)
+        async_client = AsyncClient(env='live', **ClientTestCase.DUMMY_CREDENTIALS)
+
+        request, _ = client._prepare_request('POST', '/services/2/transactions', {'amount': 1})
+        async_request, _ = async_client._prepare_request('POST', '/services/2/transactions', {'amount': 1})
+
+        self.assertEqual((async_request.method, async_request.url, async_request.headers, async_request.body),
+                         (request.method, request.url, dict(request.headers), request.body))
+
+    def test_default_user_agent_is_cached(self):
+        self.assertIs(default_user_agent(), default_user_agent())
+        self.assertTrue(default_user_agent().startswith('mayple/bluesnap '))
+
+
+class TagFactoriesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.client = Client(env='live', **ClientTestCase.DUMMY_CREDENTIALS)
+
+    def test_factories_are_cached(self):
+        tags = self.client.tags
+        self.assertIs(tags['credit-card'], tags['credit-card'])
+
+    def test_elements_match_element_maker(self):
+        T, E = self.client.tags, self.client.E
+
+        def build(factory):
+            return etree.tostring(factory('credit-card')(
+                factory('card-number')('4111111111111111'),
+                factory('card-type')(''),
+                factory('expiration-month')('<&>', factory('sub')('text'), 'tail'),
+                factory('sku')(factory('amount')('1.00'), id='1'),
+                factory('empty')(),
+            ))
+
+        self.assertEqual(build(T.__getitem__), build(lambda tag: getattr(E, tag)))
+
+    def test_invalid_children_are_rejected_as_by_element_maker(self):
+        with self.assertRaises(TypeError):
+            self.client.tags['card-type'](None)
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['content-length']))
+        response = b'<echo><length>%d</length><body>%s</body></echo>' % (len(body), body)
+
+        self.send_response(200)
+        self.send_header('content-type', 'application/xml')
+        self.send_header('content-length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ClientBodyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.client = Client(env='live', **ClientTestCase.DUMMY_CREDENTIALS)
+        self.client.ENDPOINTS = {'live': 'http://127.0.0.1:%d' % self.server.server_address[1]}
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_xml_bodies_are_sent_as_is(self):
+        data = '<shopper><first-name>Zoë</first-name></shopper>'.encode('utf-8')
+
+        for body in (data, bytearray(data), memoryview(data)):
+            with self.subTest(type=type(body).__name__):
+                request, _ = self.client._prepare_request('POST', '/services/2/shoppers', body)
+                self.assertIs(request.body, body)
+
+                _, echo = self.client.request('POST', '/services/2/shoppers', body)
+                self.assertEqual(echo['echo'], {'length': str(len(data)), 'body': {'shopper': {'first-name': 'Zoë'}}})
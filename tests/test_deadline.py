@@ -0,0 +1,141 @@
+import time
+from unittest import TestCase
+
+import requests
+import responses
+from mock import patch
+
+from bluesnap import exceptions
+from bluesnap.client import Client
+from bluesnap.deadline import Deadline
+from bluesnap.ratelimit import RateLimiter, TokenBucket
+from bluesnap.resources import TransactionResource
+from bluesnap.retry import RetryPolicy
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class DeadlineTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def test_no_deadline(self):
+        deadline = Deadline(clock=self.clock)
+        self.clock.now += 1000
+
+        self.assertIsNone(deadline.remaining())
+        self.assertEqual(deadline.limit(10), 10)
+        self.assertTrue(deadline.allows(1000))
+        deadline.check()
+
+    def test_limits_timeouts_to_remaining_time(self):
+        deadline = Deadline(5, clock=self.clock)
+        self.clock.now += 2
+
+        self.assertEqual(deadline.remaining(), 3)
+        self.assertEqual(deadline.limit(10), 3)
+        self.assertEqual(deadline.limit(1), 1)
+        self.assertEqual(deadline.limit(None), 3)
+        self.assertTrue(deadline.allows(2))
+        self.assertFalse(deadline.allows(3))
+
+    def test_check(self):
+        deadline = Deadline(5, clock=self.clock)
+        deadline.attempts = 2
+        deadline.check()
+
+        self.clock.now += 6
+        cause = requests.ReadTimeout()
+        with self.assertRaises(exceptions.DeadlineExceededError) as cm:
+            deadline.check(cause=cause)
+
+        self.assertEqual(cm.exception.deadline, 5)
+        self.assertEqual(cm.exception.elapsed, 6)
+        self.assertEqual(cm.exception.attempts, 2)
+        self.assertIs(cm.exception.__cause__, cause)
+        self.assertIn('Deadline of 5.000s exceeded after 6.000s and 2 attempt(s)', str(cm.exception))
+
+    def test_invalid_deadline(self):
+        with self.assertRaises(ValueError):
+            Deadline(0)
+
+    def test_rate_limiter_max_wait(self):
+        bucket = TokenBucket(rate=1, burst=1, clock=self.clock, sleep=lambda seconds: None)
+        bucket.acquire()
+
+        self.assertIsNone(bucket.acquire(max_wait=0.5))
+        # Giving up must not consume the token
+        self.assertEqual(bucket.acquire(max_wait=1), 1)
+
+
+class ClientDeadlineTestCase(TestCase):
+    def setUp(self):
+        self.client = Client(env='live', connect_timeout=3, read_timeout=20, **DUMMY_CREDENTIALS)
+        self.url = self.client.endpoint_url + '/services/2/transactions'
+
+    @responses.activate
+    def test_timeouts_are_limited_by_deadline(self):
+        responses.add(responses.GET, self.url + '/1', status=200, content_type='application/xml',
+                      body='<card-transaction><transaction-id>1</transaction-id></card-transaction>')
+
+        with patch.object(self.client.session, 'send', wraps=self.client.session.send) as send:
+            TransactionResource(client=self.client).retrieve('1')
+            self.assertEqual(send.call_args[1]['timeout'], (3, 20))
+
+            TransactionResource(client=self.client).retrieve('1', deadline=5)
+            connect_timeout, read_timeout = send.call_args[1]['timeout']
+            self.assertLessEqual(connect_timeout, 3)
+            self.assertTrue(4 < read_timeout <= 5)
+
+    def test_deadline_exceeded_during_attempt(self):
+        def slow_send(request, timeout):
+            time.sleep(0.05)
+            raise requests.ReadTimeout()
+
+        with patch.object(self.client.session, 'send', side_effect=slow_send):
+            with self.assertRaises(exceptions.DeadlineExceededError) as cm:
+                TransactionResource(client=self.client).retrieve('1', deadline=0.01)
+
+        self.assertEqual(cm.exception.attempts, 1)
+        self.assertGreaterEqual(cm.exception.elapsed, 0.05)
+        self.assertIsInstance(cm.exception.__cause__, requests.ReadTimeout)
+
+    @responses.activate
+    def test_no_retry_past_deadline(self):
+        sleeps = []
+        self.client.retry_policy = RetryPolicy(max_attempts=5, backoff_base=10, jitter=False, sleep=sleeps.append)
+        responses.add(responses.GET, self.url + '/1', status=503, body='')
+
+        with self.assertRaises(exceptions.APIError):
+            TransactionResource(client=self.client).retrieve('1', deadline=5)
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(sleeps, [])
+
+    @responses.activate
+    def test_rate_limiter_wait_bounded_by_deadline(self):
+        self.client.rate_limiter = RateLimiter(default=(0.1, 1), sleep=lambda seconds: None)
+        responses.add(responses.GET, self.url + '/1', status=200, content_type='application/xml',
+                      body='<card-transaction><transaction-id>1</transaction-id></card-transaction>')
+
+        TransactionResource(client=self.client).retrieve('1', deadline=1)
+        with self.assertRaises(exceptions.DeadlineExceededError) as cm:
+            TransactionResource(client=self.client).retrieve('1', deadline=1)
+
+        self.assertEqual(cm.exception.reason, 'no rate limiter token available in time')
+        self.assertEqual(len(responses.calls), 1)
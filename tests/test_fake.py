@@ -0,0 +1,134 @@
+from unittest import TestCase
+
+from bluesnap.client import Client
+from bluesnap.exceptions import APIError, CardError
+from bluesnap.fake import FakeBlueSnap
+from bluesnap.models import ContactInfo, CreditCardSelection, PlainCreditCard
+from bluesnap.resources import CreditCard, CreditCardInfo, OrderResource, PaymentFieldsTokenResource, \
+    ShopperResource, TransactionResource, VaultedShopperInfo, VaultedShopperResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class FakeBlueSnapTestCase(TestCase):
+    def setUp(self):
+        self.fake = FakeBlueSnap(username='username', password='password')
+        self.client = Client(env='sandbox', transport=self.fake.transport(), **DUMMY_CREDENTIALS)
+
+    def vault(self, *cards, merchantShopperId=None):
+        tokens = []
+        for card in cards:
+            token = PaymentFieldsTokenResource(client=self.client).create()
+            self.fake.bind_card(token, *card)
+            tokens.append(token)
+
+        return VaultedShopperResource(client=self.client).create(
+            VaultedShopperInfo(firstName='Jane', lastName='Doe', merchantShopperId=merchantShopperId),
+            [CreditCardInfo(pfToken=token) for token in tokens])
+
+    def test_vaulted_shoppers(self):
+        vaultedShopper = self.vault(('4111111111111111', 12, 2030), merchantShopperId='42')
+        vaultedShopperId = vaultedShopper['vaultedShopperId']
+        self.assertEqual(vaultedShopper['paymentSources']['creditCardInfo'], [{'creditCard': {
+            'cardLastFourDigits': '1111', 'cardType': 'VISA', 'expirationMonth': '12', 'expirationYear': '2030'}}])
+
+        resource = VaultedShopperResource(client=self.client)
+        retrieved = resource.retrieve(vaultedShopperId)
+        self.assertEqual(retrieved['vaulted-shopper-id'], str(vaultedShopperId))
+        self.assertEqual(retrieved['first-name'], 'Jane')
+        self.assertEqual(retrieved['payment-sources']['credit-card-info']['credit-card']['card-last-four-digits'],
+                         '1111')
+        self.assertEqual(resource.retrieveByMerchantShopperId('42'), retrieved)
+
+        token = PaymentFieldsTokenResource(client=self.client).create(shopperId=vaultedShopperId)
+        self.fake.bind_card(token, '5105105105105100', 1, 2031)
+        updated = resource.update(vaultedShopperId, VaultedShopperInfo(firstName='Janet', lastName='Doe'), [
+            CreditCardInfo(pfToken=token),
+            CreditCardInfo(creditCard=CreditCard(cardLastFourDigits='1111', cardType='VISA'), status='D'),
+        ])
+        self.assertEqual(updated['firstName'], 'Janet')
+        self.assertEqual([info['creditCard']['cardType'] for info in updated['paymentSources']['creditCardInfo']],
+                         ['MASTERCARD'])
+
+        with self.assertRaises(APIError) as cm:
+            resource.retrieve('0')
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertEqual(cm.exception.code, '10000')
+
+    def test_transactions(self):
+        vaultedShopperId = self.vault(('4111111111111111', 12, 2030), ('5105105105105100', 1, 2031))['vaultedShopperId']
+        resource = TransactionResource(client=self.client)
+        card = CreditCard(cardLastFourDigits='5100', cardType='MASTERCARD')
+
+        auth = resource.auth(amount='10.00', currency='USD', vaultedShopperId=vaultedShopperId, creditCard=card)
+        self.assertEqual((auth['cardTransactionType'], auth['amount'], auth['creditCard']['cardLastFourDigits']),
+                         ('AUTH_ONLY', 10.0, '5100'))
+        self.assertEqual(auth['processingInfo']['processingStatus'], 'success')
+
+        capture = resource.capture(auth['transactionId'], amount='7.50')
+        self.assertEqual((capture['cardTransactionType'], capture['amount']), ('CAPTURE', 7.5))
+        self.assertEqual(resource.retrieve(auth['transactionId'])['card-transaction-type'], 'CAPTURE')
+
+        with self.assertRaises(APIError) as cm:
+            resource.reverse(auth['transactionId'])
+        self.assertEqual(cm.exception.messages[0]['errorName'], 'INVALID_TRANSACTION_STATE')
+
+        auth = resource.auth(amount='5.00', currency='USD', vaultedShopperId=vaultedShopperId, creditCard=card)
+        self.assertEqual(resource.reverse(auth['transactionId'])['cardTransactionType'], 'AUTH_REVERSAL')
+
+        # Which card to charge is ambiguous
+        with self.assertRaises(APIError):
+            resource.authCapture(amount='1.00', currency='USD', vaultedShopperId=vaultedShopperId)
+
+    def test_tokens_are_used_once(self):
+        resource = TransactionResource(client=self.client)
+        token = PaymentFieldsTokenResource(client=self.client).create()
+
+        transaction = resource.authCapture(amount='1.00', currency='USD', pfToken=token)
+        self.assertEqual(transaction['creditCard']['cardLastFourDigits'], '1111')
+        self.assertIn(str(transaction['vaultedShopperId']), self.fake.vaulted_shoppers)
+
+        with self.assertRaises(APIError) as cm:
+            resource.authCapture(amount='1.00', currency='USD', pfToken=token)
+        self.assertEqual(cm.exception.messages[0]['code'], '14041')
+
+    def test_declined_cards(self):
+        token = PaymentFieldsTokenResource(client=self.client).create()
+        self.fake.bind_card(token, '4917484589897107', 5, 2018)
+
+        with self.assertRaises(APIError) as cm:
+            TransactionResource(client=self.client).authCapture(amount='1.00', currency='USD', pfToken=token)
+        self.assertEqual(cm.exception.messages[0]['errorName'], 'INSUFFICIENT_FUNDS')
+
+        contact_info = ContactInfo(email='jane.doe@example.com', first_name='Jane', last_name='Doe', client=self.client)
+        with self.assertRaises(CardError) as cm:
+            ShopperResource(client=self.client).create(contact_info, PlainCreditCard(
+                'VISA', 5, 2018, '4917484589897107', '411', client=self.client))
+        self.assertEqual(cm.exception.code, '430360-14002')
+
+    def test_shoppers_and_orders(self):
+        contact_info = ContactInfo(email='jane.doe@example.com', first_name='Jane', last_name='Doe', client=self.client)
+        shopper_id = ShopperResource(client=self.client).create(contact_info, PlainCreditCard(
+            'VISA', 12, 2030, '4111111111111111', '123', client=self.client), seller_shopper_id='42')
+
+        shopper = ShopperResource(client=self.client).find_by_seller_shopper_id('42')
+        self.assertEqual(shopper['shopper-info']['shopper-id'], shopper_id)
+
+        order = OrderResource(client=self.client).create(
+            shopper_id, '2152476', 1250, credit_card=CreditCardSelection('VISA', '1111', client=self.client))
+        self.assertEqual(order['cart']['total-cart-cost'], '12.50')
+        self.assertIn(order['order-id'], self.fake.orders)
+
+    def test_requests_are_authenticated(self):
+        client = Client(env='sandbox', transport=self.fake.transport(), **dict(DUMMY_CREDENTIALS, password='wrong'))
+
+        with self.assertRaises(APIError) as cm:
+            TransactionResource(client=client).retrieve('1')
+        self.assertEqual(cm.exception.status_code, 401)
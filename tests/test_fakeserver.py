@@ -0,0 +1,128 @@
+import random
+import signal
+import subprocess
+import sys
+from unittest import TestCase
+
+import requests
+
+from bluesnap.client import Client
+from bluesnap.exceptions import APIError, RateLimitError
+from bluesnap.fake import FakeBlueSnap
+from bluesnap.fakeserver import FakeServer, Latency
+from bluesnap.models import ContactInfo, CreditCardSelection, PlainCreditCard
+from bluesnap.resources import CreditCardInfo, OrderResource, PaymentFieldsTokenResource, ShopperResource, \
+    TransactionResource, VaultedShopperInfo, VaultedShopperResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class LatencyTestCase(TestCase):
+    def test_parse(self):
+        self.assertEqual(Latency.parse('constant:0.05').sample(random.Random()), 0.05)
+
+        latency, draws = Latency.parse('lognormal:0.1,0.5'), random.Random(1)
+        samples = sorted(latency.sample(draws) for _ in range(1001))
+        self.assertAlmostEqual(samples[500], 0.1, delta=0.01)
+        self.assertGreater(samples[990], 0.25)
+
+        for spec in ('gamma:1', 'uniform:0.1', 'constant:-1', 'constant:fast'):
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    Latency.parse(spec)
+
+
+class FakeServerTestCase(TestCase):
+    def serve(self, fake=None, **kwargs):
+        server = FakeServer(fake or FakeBlueSnap(username='username', password='password'),
+                            random=random.Random(1), **kwargs).start()
+        self.addCleanup(server.close)
+
+        client = Client(env='sandbox', **DUMMY_CREDENTIALS)
+        client.ENDPOINTS = dict(client.ENDPOINTS, sandbox=server.url)
+        self.addCleanup(client.close)
+        return server, client
+
+    def test_resources(self):
+        server, client = self.serve(latency=Latency('constant', 0.001))
+
+        token = PaymentFieldsTokenResource(client=client).create()
+        vaultedShopper = VaultedShopperResource(client=client).create(
+            VaultedShopperInfo(firstName='Jane', lastName='Doe'), [CreditCardInfo(pfToken=token)])
+        transaction = TransactionResource(client=client).authCapture(
+            amount='10.00', currency='USD', vaultedShopperId=vaultedShopper['vaultedShopperId'])
+        self.assertEqual(TransactionResource(client=client).retrieve(transaction['transactionId'])['amount'], '10.0')
+
+        contact_info = ContactInfo(email='jane.doe@example.com', first_name='Jane', last_name='Doe', client=client)
+        shopper_id = ShopperResource(client=client).create(contact_info, PlainCreditCard(
+            'VISA', 12, 2030, '4111111111111111', '123', client=client))
+        order = OrderResource(client=client).create(
+            shopper_id, '2152476', 1250, credit_card=CreditCardSelection('VISA', '1111', client=client))
+        self.assertEqual(order['ordering-shopper']['shopper-id'], shopper_id)
+
+        self.assertEqual(server.stats(), {'answered': 6, 'throttled': 0, 'errors': 0, 'resets': 0})
+        self.assertEqual(client.pool_stats()['connections_created'], 1)
+
+    def test_throttling(self):
+        server, client = self.serve(rate_limits={'transactions': (1, 1)})
+
+        with self.assertRaises(APIError):
+            TransactionResource(client=client).retrieve('1')
+        with self.assertRaises(RateLimitError) as cm:
+            TransactionResource(client=client).retrieve('1')
+        self.assertEqual(cm.exception.retry_after, 1)
+
+        # Other endpoint classes are not limited
+        PaymentFieldsTokenResource(client=client).create()
+        self.assertEqual(server.stats()['throttled'], 1)
+
+    def test_faults(self):
+        server, client = self.serve(error_rate=1.0)
+        with self.assertRaises(APIError) as cm:
+            PaymentFieldsTokenResource(client=client).create()
+        self.assertIn(cm.exception.status_code, FakeServer.ERROR_STATUS_CODES)
+
+        server, client = self.serve(reset_rate=1.0)
+        with self.assertRaises(requests.ConnectionError):
+            PaymentFieldsTokenResource(client=client).create()
+        self.assertEqual(server.stats()['resets'], 1)
+
+    def test_card_declines(self):
+        fake = FakeBlueSnap(decline_rate=1.0, random=random.Random(1))
+        server, client = self.serve(fake)
+
+        token = PaymentFieldsTokenResource(client=client).create()
+        with self.assertRaises(APIError) as cm:
+            TransactionResource(client=client).authCapture(amount='10.00', currency='USD', pfToken=token)
+        self.assertEqual(cm.exception.status_code, 400)
+        self.assertIn(cm.exception.messages[0]['errorName'], [
+            'EXPIRED_CARD', 'INSUFFICIENT_FUNDS', 'INVALID_CARD_NUMBER', 'INCORRECT_INFORMATION'])
+        self.assertEqual(server.stats()['answered'], 2)
+
+
+class MainTestCase(TestCase):
+    def test_serves_until_interrupted(self):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'bluesnap.fakeserver', '--port', '0', '--latency', 'transactions=constant:0.01',
+             '--rate-limit', '100/10', '--seed', '1'],
+            stdout=subprocess.PIPE, text=True)
+        self.addCleanup(process.stdout.close)
+        try:
+            url = process.stdout.readline().split()[-1]
+
+            client = Client(env='sandbox', **DUMMY_CREDENTIALS)
+            client.ENDPOINTS = dict(client.ENDPOINTS, sandbox=url)
+            self.addCleanup(client.close)
+            self.assertTrue(PaymentFieldsTokenResource(client=client).create())
+        finally:
+            process.send_signal(signal.SIGINT)
+            output, _ = process.communicate(timeout=10)
+
+        self.assertEqual(output, 'Requests: 1 answered, 0 throttled, 0 errors, 0 resets\n')
@@ -0,0 +1,105 @@
+import threading
+import time
+from unittest import TestCase
+
+import responses
+
+from bluesnap.client import Client
+from bluesnap.hedge import HedgePolicy
+from bluesnap.resources import TransactionResource, VaultedShopperResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class HedgePolicyTestCase(TestCase):
+    def test_initial_delay_until_enough_samples(self):
+        policy = HedgePolicy(initial_delay=0.5, minimum_samples=3)
+        path = '/services/2/transactions/1'
+
+        self.assertEqual(policy.delay('GET', path), 0.5)
+        for duration in (0.1, 0.2):
+            policy.record('GET', path, duration)
+        self.assertEqual(policy.delay('GET', path), 0.5)
+
+        policy.record('GET', path, 0.3)
+        self.assertEqual(policy.delay('GET', path), 0.3)
+
+    def test_percentile_per_endpoint(self):
+        policy = HedgePolicy(percentile=90, minimum_samples=10, min_delay=0)
+        for i in range(1, 101):
+            policy.record('GET', '/services/2/transactions/%d' % i, i / 100.0)
+
+        self.assertEqual(policy.delay('GET', '/services/2/transactions/123'), 0.9)
+        self.assertEqual(policy.delay('GET', '/services/2/vaulted-shoppers/123'), policy.initial_delay)
+
+    def test_delay_bounds(self):
+        policy = HedgePolicy(initial_delay=5, min_delay=0.05, max_delay=1)
+        self.assertEqual(policy.delay('GET', '/services/2/transactions/1'), 1)
+
+        policy = HedgePolicy(initial_delay=0, min_delay=0.05)
+        self.assertEqual(policy.delay('GET', '/services/2/transactions/1'), 0.05)
+
+    def test_only_configured_methods_are_hedged(self):
+        self.assertIsNone(HedgePolicy().delay('POST', '/services/2/transactions'))
+
+
+class ClientHedgeTestCase(TestCase):
+    def setUp(self):
+        self.policy = HedgePolicy(initial_delay=0.05)
+        self.client = Client(env='live', hedge_policy=self.policy, **DUMMY_CREDENTIALS)
+        self.url = self.client.endpoint_url + '/services/2'
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        self.client.close()
+
+    def _first_call_is_slow(self, request):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            time.sleep(0.5)
+        return 200, {'content-type': 'application/xml'}, \
+            '<card-transaction><transaction-id>%d</transaction-id></card-transaction>' % call
+
+    @responses.activate
+    def test_hedge_wins_over_slow_request(self):
+        responses.add_callback(responses.GET, self.url + '/transactions/1', callback=self._first_call_is_slow)
+
+        started = time.monotonic()
+        transaction = TransactionResource(client=self.client).retrieve('1')
+
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(transaction, {'transaction-id': '2'})
+        self.assertEqual(self.policy.stats()['GET /services/2/transactions/{id}'],
+                         {'requests': 1, 'hedges_fired': 1, 'hedges_won': 1})
+
+        # Let the slow request complete while responses is active, it would be recorded by a later test otherwise
+        self.client.hedge_executor.shutdown(wait=True)
+
+    @responses.activate
+    def test_fast_response_is_not_hedged(self):
+        responses.add(responses.GET, self.url + '/vaulted-shoppers/1', status=200, content_type='application/xml',
+                      body='<vaulted-shopper><vaulted-shopper-id>1</vaulted-shopper-id></vaulted-shopper>')
+
+        VaultedShopperResource(client=self.client).retrieve('1')
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(self.policy.stats()['GET /services/2/vaulted-shoppers/{id}']['hedges_fired'], 0)
+
+    @responses.activate
+    def test_posts_are_not_hedged(self):
+        responses.add(responses.POST, self.url + '/transactions', status=200, json={'transactionId': '1'})
+
+        TransactionResource(client=self.client).authCapture(amount='1', currency='USD', vaultedShopperId='1')
+
+        self.assertEqual(self.policy.stats(), {})
+        self.assertIsNone(self.client._hedge_executor)
@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies only imported on first use, see benchmarks/import_time.py
+HEAVY_MODULES = ('lxml', 'xmltodict', 'requests', 'urllib3', 'asyncio', 'aiohttp')
+
+CLIENT = ("from bluesnap.client import Client; "
+          "client = Client(env='live', username='username', password='password', default_store_id='1', seller_id='1', "
+          "default_currency='GBP')")
+
+
+def run(statement, *options):
+    """
+    :return: stdout and stderr of statement run in a fresh interpreter
+    """
+    result = subprocess.run([sys.executable] + list(options) + ['-c', statement], cwd=ROOT, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    return result.stdout, result.stderr
+
+
+def loaded_heavy_modules(statement):
+    stdout, _ = run(statement + '\nimport sys\nprint(sorted({name.split(".")[0] for name in sys.modules}))')
+    return sorted(set(eval(stdout)) & set(HEAVY_MODULES))
+
+
+class LazyImportTestCase(TestCase):
+    def test_json_api_does_not_load_heavy_modules(self):
+        for statement in ('import bluesnap',
+                          'import bluesnap.resources',
+                          CLIENT + '; from bluesnap.resources import TransactionResource; TransactionResource(client)'):
+            with self.subTest(statement=statement):
+                self.assertEqual(loaded_heavy_modules(statement), [])
+
+    def test_xml_machinery_is_loaded_on_first_use(self):
+        self.assertEqual(loaded_heavy_modules(CLIENT + '; client.tags["shopper"]("1")'), ['lxml'])
+        self.assertEqual(loaded_heavy_modules(CLIENT + '; client.xml_parser.parse(b"<a/>")'), ['lxml'])
+        self.assertEqual(loaded_heavy_modules(CLIENT + '; client.session'), ['requests', 'urllib3'])
+
+    def test_submodules_are_attributes_of_the_package(self):
+        stdout, _ = run('import bluesnap; print(bluesnap.resources.TransactionResource.__name__)')
+        self.assertEqual(stdout.strip(), 'TransactionResource')
+
+
+class ImportTimeTestCase(TestCase):
+    # Regression budget for importing the package and its JSON resources, in milliseconds. It took about 20ms when
+    # it was set, and over 150ms when lxml, xmltodict, requests and asyncio were imported eagerly.
+    BUDGET_MS = 80
+
+    def import_time_ms(self, statement):
+        _, stderr = run(statement, '-X', 'importtime')
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            self_us, cumulative_us, module = line[len('import time:'):].split('|')
+            if module.strip() == 'bluesnap.resources':
+                return int(cumulative_us) / 1000
+        self.fail('bluesnap.resources was not imported')
+
+    def test_import_time_budget(self):
+        # The fastest of a few runs, the others may have been slowed down by anything else running
+        import_time_ms = min(self.import_time_ms('import bluesnap.resources') for _ in range(3))
+        self.assertLess(import_time_ms, self.BUDGET_MS)
@@ -0,0 +1,81 @@
+import logging
+from unittest import TestCase, skipIf
+
+import responses
+
+from bluesnap.client import Client
+from bluesnap.jsoncodec import OrjsonCodec, StdlibJSONCodec, UjsonCodec, default_codec
+from bluesnap.resources import TransactionResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+PAYLOAD = {
+    'amount': '10.00',
+    'currency': 'EUR',
+    'cardHolderInfo': {'firstName': 'Zoë', 'lastName': 'Doe', 'email': 'zoe@example.com'},
+    'transactionMetaData': {'metaData': [{'metaKey': 'url', 'metaValue': 'https://example.com/a/b'}]},
+    'storeCard': False,
+    'transactionFraudInfo': None,
+}
+
+
+def _available_codecs():
+    codecs = [StdlibJSONCodec()]
+    for codec_class in (OrjsonCodec, UjsonCodec):
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            pass
+    return codecs
+
+
+class JSONCodecTestCase(TestCase):
+    def test_codecs_agree(self):
+        expected = StdlibJSONCodec().dumps(PAYLOAD)
+
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                encoded = codec.dumps(PAYLOAD)
+                self.assertIsInstance(encoded, bytes)
+                self.assertEqual(encoded, expected)
+                self.assertEqual(codec.loads(encoded), PAYLOAD)
+                self.assertEqual(codec.loads(encoded.decode('utf-8')), PAYLOAD)
+
+    def test_compact_utf8(self):
+        self.assertEqual(StdlibJSONCodec().dumps({'a': [1, 'é']}), '{"a":[1,"é"]}'.encode('utf-8'))
+        self.assertEqual(StdlibJSONCodec().loads(bytearray('{"a":[1,"é"]}'.encode('utf-8'))), {'a': [1, 'é']})
+
+    def test_invalid_json(self):
+        for codec in _available_codecs():
+            with self.subTest(codec=codec.name):
+                with self.assertRaises(ValueError):
+                    codec.loads(b'Service Unavailable')
+
+    @skipIf(not any(isinstance(codec, OrjsonCodec) for codec in _available_codecs()), 'orjson is not installed')
+    def test_default_codec_prefers_orjson(self):
+        self.assertIsInstance(default_codec(), OrjsonCodec)
+
+
+class ClientJSONCodecTestCase(TestCase):
+    @responses.activate
+    def test_request_body_is_compact_bytes(self):
+        client = Client(env='live', json_codec=StdlibJSONCodec(), logger=logging.getLogger('tests.jsoncodec'),
+                        **DUMMY_CREDENTIALS)
+        responses.add(responses.POST, client.endpoint_url + '/services/2/transactions', status=200,
+                      json={'transactionId': '1'})
+
+        with self.assertLogs('tests.jsoncodec', level='INFO'):
+            transaction = TransactionResource(client=client).authCapture(
+                amount='10.00', currency='EUR', vaultedShopperId='42')
+
+        self.assertEqual(transaction, {'transactionId': '1'})
+        body = responses.calls[0].request.body
+        self.assertIsInstance(body, bytes)
+        self.assertTrue(body.startswith(b'{"cardTransactionType":"AUTH_CAPTURE",'))
@@ -0,0 +1,116 @@
+import logging
+from unittest import TestCase
+
+import mock
+import responses
+
+from bluesnap.client import Client, format_request, format_response
+from bluesnap.resources import TransactionResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+TRANSACTION = b'<card-transaction><transaction-id>1</transaction-id></card-transaction>'
+
+
+class FormatTestCase(TestCase):
+    def test_bodies_are_truncated(self):
+        request = mock.Mock(method='POST', url='https://ws.bluesnap.com/services/2/shoppers', headers={},
+                            body=b'<shopper>' + b'x' * 100 + b'</shopper>')
+        response = mock.Mock(status_code=200, reason='OK', headers={'content-type': 'application/xml'},
+                             content=TRANSACTION)
+
+        self.assertTrue(format_request(request, body_limit=9).endswith('\n<shopper>... [110 bytes truncated]'))
+        self.assertTrue(format_response(response, body_limit=18).endswith(
+            '\n<card-transaction>... [53 bytes truncated]'))
+        self.assertTrue(format_response(response).endswith('\n' + TRANSACTION.decode('utf-8')))
+
+    def test_str_bodies_are_truncated_by_characters(self):
+        request = mock.Mock(method='POST', url='https://ws.bluesnap.com/services/2/shoppers', headers={},
+                            body='<name>Zoë</name>')
+
+        self.assertTrue(format_request(request, body_limit=9).endswith('\n<name>Zoë... [7 characters truncated]'))
+
+    def test_truncation_does_not_split_characters_badly(self):
+        request = mock.Mock(method='POST', url='https://ws.bluesnap.com/services/2/shoppers', headers={},
+                            body='Zoë'.encode('utf-8'))
+
+        self.assertEqual(format_request(request, body_limit=3).rsplit('\n', 1)[1], 'Zo�... [1 bytes truncated]')
+
+
+class ClientLoggingTestCase(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('tests.logging')
+        self.url = 'https://ws.bluesnap.com/services/2/transactions/1'
+
+    def retrieve(self, client):
+        return TransactionResource(client=client).retrieve('1')
+
+    @responses.activate
+    def test_nothing_is_formatted_when_info_is_disabled(self):
+        responses.add(responses.GET, self.url, status=200, content_type='application/xml', body=TRANSACTION)
+        client = Client(env='live', logger=self.logger, **DUMMY_CREDENTIALS)
+
+        self.logger.setLevel(logging.WARNING)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+        with mock.patch('bluesnap.client.format_request') as format_request_mock, \
+                mock.patch('bluesnap.client.format_response') as format_response_mock:
+            self.retrieve(client)
+
+        format_request_mock.assert_not_called()
+        format_response_mock.assert_not_called()
+
+    @responses.activate
+    def test_records_are_formatted_only_when_emitted(self):
+        responses.add(responses.GET, self.url, status=200, content_type='application/xml', body=TRANSACTION)
+        client = Client(env='live', logger=self.logger, **DUMMY_CREDENTIALS)
+
+        self.logger.setLevel(logging.INFO)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+        # Records are dropped after the level check
+        self.logger.addFilter(lambda record: False)
+        self.addCleanup(self.logger.filters.clear)
+        with mock.patch('bluesnap.client.format_request') as format_request_mock, \
+                mock.patch('bluesnap.client.format_response') as format_response_mock:
+            self.retrieve(client)
+
+        format_request_mock.assert_not_called()
+        format_response_mock.assert_not_called()
+
+    @responses.activate
+    def test_bodies_are_logged_up_to_the_limit(self):
+        responses.add(responses.GET, self.url, status=200, content_type='application/xml', body=TRANSACTION)
+        client = Client(env='live', logger=self.logger, log_body_limit=18, **DUMMY_CREDENTIALS)
+
+        with self.assertLogs('tests.logging', level='INFO') as logs:
+            self.retrieve(client)
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertTrue(logs.output[0].startswith('INFO:tests.logging:Bluesnap request:\nGET ' + self.url))
+        self.assertTrue(logs.output[1].endswith('\n<card-transaction>... [53 bytes truncated]'))
+
+    @responses.activate
+    def test_calls_are_sampled_per_endpoint_class(self):
+        responses.add(responses.GET, self.url, status=200, content_type='application/xml', body=TRANSACTION)
+        client = Client(env='live', logger=self.logger, log_sample_rates={'transactions': 0.25},
+                        log_default_sample_rate=0, **DUMMY_CREDENTIALS)
+        client._log_random = iter([0.5, 0.1]).__next__
+
+        self.logger.setLevel(logging.INFO)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+        with mock.patch.object(self.logger, 'info') as info:
+            self.retrieve(client)
+        info.assert_not_called()
+
+        with self.assertLogs('tests.logging', level='INFO') as logs:
+            self.retrieve(client)
+        # Request and response of a sampled call are logged together
+        self.assertEqual(len(logs.output), 2)
+
+        self.assertFalse(client._log_sampled('/services/2/vaulted-shoppers/1'))
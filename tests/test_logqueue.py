@@ -0,0 +1,157 @@
+import logging
+import threading
+from unittest import TestCase
+
+import mock
+import responses
+
+from bluesnap.client import Client
+from bluesnap.logqueue import LogQueue
+from bluesnap.resources import TransactionResource
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, block=None):
+        super(RecordingHandler, self).__init__()
+        self.block = block
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        if self.block is not None:
+            self.block.wait()
+        self.format(record)
+        self.records.append(record)
+        self.threads.append(threading.current_thread())
+
+
+class LogQueueTestCase(TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('tests.logqueue')
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+        self.addCleanup(self.logger.setLevel, logging.NOTSET)
+
+    def add_handler(self, handler):
+        self.logger.addHandler(handler)
+        self.addCleanup(self.logger.removeHandler, handler)
+        return handler
+
+    def test_records_are_emitted_off_thread(self):
+        handler = self.add_handler(RecordingHandler())
+        argument = mock.Mock()
+        argument.__str__ = mock.Mock(return_value='formatted')
+
+        with LogQueue() as log_queue:
+            log_queue.log(self.logger, logging.INFO, 'Message: %s', argument)
+            log_queue.flush()
+
+        record, = handler.records
+        self.assertEqual(record.getMessage(), 'Message: formatted')
+        # Attributed to the thread that logged it, emitted by another
+        self.assertEqual(record.threadName, threading.current_thread().name)
+        self.assertIsNot(handler.threads[0], threading.current_thread())
+        self.assertEqual(log_queue.stats(), {'pending': 0, 'dropped': 0, 'emitted': 1, 'errors': 0})
+
+    def test_records_are_dropped_when_full(self):
+        block = threading.Event()
+        handler = self.add_handler(RecordingHandler(block))
+
+        with LogQueue(maxsize=2) as log_queue:
+            for i in range(10):
+                log_queue.log(self.logger, logging.INFO, 'Message %d', i)
+            # The first one may have been taken off the queue already
+            self.assertIn(log_queue.stats()['dropped'], (7, 8))
+            block.set()
+            log_queue.flush()
+
+        messages = [record.getMessage() for record in handler.records]
+        self.assertEqual(messages[:2], ['Message 0', 'Message 1'])
+        self.assertEqual(len(messages), 10 - log_queue.dropped + 1)
+        self.assertEqual(messages[-1], 'Dropped %d Bluesnap log records, the log queue was full' % log_queue.dropped)
+
+    def test_records_logged_after_close_are_dropped(self):
+        handler = self.add_handler(RecordingHandler())
+        log_queue = LogQueue()
+        log_queue.close()
+
+        log_queue.log(self.logger, logging.INFO, 'Message')
+
+        self.assertEqual(handler.records, [])
+        self.assertEqual(log_queue.dropped, 1)
+
+    def test_records_logged_while_closing_are_not_lost(self):
+        handler = self.add_handler(RecordingHandler())
+        log_queue = LogQueue()
+        log_queue.start()
+        closing = threading.Thread(target=log_queue.close)
+        put_nowait = log_queue._queue.put_nowait
+
+        def close_then_put(item):
+            # close() starts between the check of log() and the put
+            closing.start()
+            closing.join(0.1)
+            put_nowait(item)
+
+        with mock.patch.object(log_queue._queue, 'put_nowait', side_effect=close_then_put):
+            log_queue.log(self.logger, logging.INFO, 'Message')
+        closing.join()
+
+        self.assertEqual(len(handler.records) + log_queue.dropped, 1)
+
+    def test_errors_are_counted(self):
+        handler = self.add_handler(RecordingHandler())
+
+        def failing_filter(record):
+            if record.args == (1,):
+                raise ValueError(record)
+            return True
+
+        self.logger.addFilter(failing_filter)
+        self.addCleanup(self.logger.removeFilter, failing_filter)
+
+        with LogQueue() as log_queue:
+            for i in range(3):
+                log_queue.log(self.logger, logging.INFO, 'Message %d', i)
+            log_queue.flush()
+
+        self.assertEqual([record.getMessage() for record in handler.records], ['Message 0', 'Message 2'])
+        self.assertEqual(log_queue.stats(), {'pending': 0, 'dropped': 0, 'emitted': 2, 'errors': 1})
+
+
+class ClientLogQueueTestCase(TestCase):
+    @responses.activate
+    def test_requests_and_responses_are_formatted_off_thread(self):
+        logger = logging.getLogger('tests.logqueue.client')
+        log_queue = LogQueue()
+        self.addCleanup(log_queue.close)
+        client = Client(env='live', logger=logger, log_queue=log_queue, **DUMMY_CREDENTIALS)
+        responses.add(responses.GET, client.endpoint_url + '/services/2/transactions/1', status=200,
+                      content_type='application/xml',
+                      body='<card-transaction><transaction-id>1</transaction-id></card-transaction>')
+
+        format_threads = []
+
+        def format_request(*args):
+            format_threads.append(threading.current_thread())
+            return 'request'
+
+        with self.assertLogs('tests.logqueue.client', level='INFO') as logs, \
+                mock.patch('bluesnap.client.format_request', format_request):
+            TransactionResource(client=client).retrieve('1')
+            log_queue.flush()
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(logs.output[0], 'INFO:tests.logqueue.client:Bluesnap request:\nrequest')
+        self.assertNotIn(threading.current_thread(), format_threads)
+        self.assertEqual(log_queue.emitted, 2)
@@ -0,0 +1,95 @@
+import datetime
+from unittest import TestCase
+
+import responses
+
+from bluesnap import exceptions
+from bluesnap.client import Client
+from bluesnap.ratelimit import RateLimiter, TokenBucket, parse_retry_after
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+
+
+class TokenBucketTestCase(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate=2, burst=2, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_burst_then_rate(self):
+        self.assertEqual(self.bucket.reserve(), 0)
+        self.assertEqual(self.bucket.reserve(), 0)
+        self.assertAlmostEqual(self.bucket.reserve(), 0.5)
+        self.assertAlmostEqual(self.bucket.reserve(), 1.0)
+
+        self.clock.now += 10
+        self.assertEqual(self.bucket.reserve(), 0)
+
+    def test_acquire_sleeps(self):
+        self.bucket.acquire()
+        self.bucket.acquire()
+        self.bucket.acquire()
+
+        self.assertEqual(len(self.clock.slept), 1)
+        self.assertAlmostEqual(self.clock.slept[0], 0.5)
+
+    def test_pause_resumes_without_burst(self):
+        self.bucket.pause(3)
+
+        self.assertAlmostEqual(self.bucket.reserve(), 3.0)
+        self.assertAlmostEqual(self.bucket.reserve(), 3.5)
+
+
+class RateLimiterTestCase(TestCase):
+    def test_endpoint_class(self):
+        self.assertEqual(RateLimiter.endpoint_class('/services/2/transactions'), 'transactions')
+        self.assertEqual(RateLimiter.endpoint_class('/services/2/vaulted-shoppers/merchant/12'), 'vaulted-shoppers')
+        self.assertEqual(RateLimiter.endpoint_class('/services/2/payment-fields-tokens?shopperId=1'),
+                         'payment-fields-tokens')
+
+    def test_limits_per_endpoint_class(self):
+        limiter = RateLimiter({'transactions': 5, 'vaulted-shoppers': (1, 3)})
+
+        self.assertEqual(limiter.bucket('/services/2/transactions').rate, 5)
+        self.assertEqual(limiter.bucket('/services/2/vaulted-shoppers/1').burst, 3)
+        self.assertIs(limiter.bucket('/services/2/transactions/1'), limiter.bucket('/services/2/transactions'))
+        self.assertIsNone(limiter.bucket('/services/2/orders'))
+
+    def test_parse_retry_after(self):
+        now = datetime.datetime(2020, 1, 1, 12, 0, 0, tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(parse_retry_after('7'), 7.0)
+        self.assertEqual(parse_retry_after('Wed, 01 Jan 2020 12:00:30 GMT', now=now), 30.0)
+        self.assertIsNone(parse_retry_after('soon'))
+        self.assertIsNone(parse_retry_after(None))
+
+
+class ClientThrottlingTestCase(TestCase):
+    @responses.activate
+    def test_throttling_raises_and_pauses_limiter(self):
+        clock = FakeClock()
+        limiter = RateLimiter({'transactions': 10}, clock=clock, sleep=clock.sleep)
+        client = Client(env='live', username='username', password='password', default_store_id='1', seller_id='1',
+                        default_currency='GBP', rate_limiter=limiter)
+
+        responses.add(responses.GET, client.endpoint_url + '/services/2/transactions/1', status=429,
+                      headers={'Retry-After': '5'}, body='Too Many Requests')
+
+        with self.assertRaises(exceptions.RateLimitError) as cm:
+            client.request('GET', '/services/2/transactions/1')
+
+        self.assertEqual(cm.exception.status_code, 429)
+        self.assertEqual(cm.exception.retry_after, 5.0)
+        self.assertIsInstance(cm.exception, exceptions.APIError)
+
+        # The next call waits for the Retry-After to pass
+        self.assertAlmostEqual(limiter.bucket('/services/2/transactions').reserve(), 5.0)
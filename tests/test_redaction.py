@@ -0,0 +1,131 @@
+import logging
+from unittest import TestCase
+
+import mock
+import responses
+from lxml import etree
+
+from bluesnap.client import Client, format_request
+from bluesnap.models import EncryptedCreditCard, PlainCreditCard
+from bluesnap.redaction import PAN, SECRET, Redactor, mask_pan
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class RedactorTestCase(TestCase):
+    def setUp(self):
+        self.redactor = Redactor()
+        self.client = Client(env='live', **DUMMY_CREDENTIALS)
+
+    def test_plain_credit_card_xml(self):
+        card = PlainCreditCard('VISA', 12, 2030, '4111111111111111', '123', client=self.client)
+        body = etree.tostring(card.to_xml()).decode('utf-8')
+
+        redacted = self.redactor.redact(body)
+
+        self.assertNotIn('4111111111111111', redacted)
+        self.assertNotIn('>123<', redacted)
+        self.assertIn('<card-number>****1111</card-number>', redacted)
+        self.assertIn('<security-code>****</security-code>', redacted)
+        self.assertIn('<expiration-year>2030</expiration-year>', redacted)
+
+    def test_encrypted_credit_card_xml(self):
+        card = EncryptedCreditCard('VISA', 12, 2030, '$bsjs_0_0_1$abc==', '$bsjs_0_0_1$def==', client=self.client)
+        body = etree.tostring(card.to_xml()).decode('utf-8')
+
+        redacted = self.redactor.redact(body)
+
+        self.assertNotIn('abc==', redacted)
+        self.assertNotIn('def==', redacted)
+        self.assertIn('<encrypted-card-number>****</encrypted-card-number>', redacted)
+
+    def test_json(self):
+        body = ('{"creditCard":{"cardNumber":"4111 1111 1111 1111","securityCode": "1\\"23","expirationMonth":"12",'
+                '"encryptedCardNumber":12345},"amount":10.0}')
+
+        self.assertEqual(
+            self.redactor.redact(body),
+            '{"creditCard":{"cardNumber":"****1111","securityCode": "****","expirationMonth":"12",'
+            '"encryptedCardNumber":****},"amount":10.0}')
+
+    def test_values_cut_short_are_masked_entirely(self):
+        self.assertEqual(self.redactor.redact('<credit-card><card-number>411111111'), '<credit-card><card-number>****')
+        self.assertEqual(self.redactor.redact('{"cardNumber":"41111111'), '{"cardNumber":"****')
+
+    def test_cdata_values(self):
+        self.assertEqual(self.redactor.redact('<x><card-number><![CDATA[4111111111111111]]></card-number></x>'),
+                         '<x><card-number>****1111</card-number></x>')
+        self.assertEqual(self.redactor.redact('<x><security-code><![CDATA[1<3]]></security-code></x>'),
+                         '<x><security-code>****</security-code></x>')
+        self.assertEqual(self.redactor.redact('<x><card-number><![CDATA[41111111'), '<x><card-number>****')
+
+    def test_values_too_short_to_be_card_numbers_are_masked_entirely(self):
+        self.assertEqual(self.redactor.redact('<x><card-number>1234</card-number></x>'),
+                         '<x><card-number>****</card-number></x>')
+        self.assertEqual(self.redactor.redact('<x><card-number><![CDATA[41111111111]]></card-number></x>'),
+                         '<x><card-number>****</card-number></x>')
+        self.assertEqual(self.redactor.redact('{"cardNumber":"1234"}'), '{"cardNumber":"****"}')
+
+    def test_bodies_without_sensitive_fields_are_unchanged(self):
+        body = '{"cardLastFourDigits":"1111","message":"card 4111111111111111"}'
+        self.assertIs(self.redactor.redact(body), body)
+
+    def test_detect_pans(self):
+        redactor = Redactor(detect_pans=True)
+
+        self.assertEqual(redactor.redact('Card 4111 1111 1111 1111 declined'), 'Card ****1111 declined')
+        # Not a card number: fails the Luhn check
+        self.assertEqual(redactor.redact('Order 4111111111111112'), 'Order 4111111111111112')
+        self.assertEqual(redactor.redact('<x><card-number>4111111111111111</card-number></x>'),
+                         '<x><card-number>****1111</card-number></x>')
+
+    def test_custom_fields(self):
+        redactor = Redactor(fields={'pan': PAN, 'cvv': SECRET})
+
+        self.assertEqual(redactor.redact('{"pan":"4111111111111111","cvv":"123","cardNumber":"4111111111111111"}'),
+                         '{"pan":"****1111","cvv":"****","cardNumber":"4111111111111111"}')
+
+    def test_headers(self):
+        self.assertEqual(self.redactor.redact_header('Authorization', 'Basic dXNlcjpwYXNz'), '****')
+        self.assertEqual(self.redactor.redact_header('content-type', 'application/xml'), 'application/xml')
+
+    def test_mask_pan(self):
+        self.assertEqual(mask_pan('5555-5555-5555-4444'), '****4444')
+        self.assertEqual(mask_pan('4111'), '****')
+
+    def test_format_request(self):
+        request = mock.Mock(method='POST', url='https://ws.bluesnap.com/services/2/transactions',
+                            headers={'Authorization': 'Basic dXNlcjpwYXNz'},
+                            body=b'{"creditCard":{"cardNumber":"4111111111111111","securityCode":"123"}}')
+
+        self.assertEqual(
+            format_request(request, body_limit=40, redactor=self.redactor),
+            'POST https://ws.bluesnap.com/services/2/transactions\nAuthorization: ****\n\n'
+            '{"creditCard":{"cardNumber":"****... [29 bytes truncated]')
+
+
+class ClientRedactionTestCase(TestCase):
+    @responses.activate
+    def test_logged_requests_are_redacted(self):
+        client = Client(env='live', logger=logging.getLogger('tests.redaction'), **DUMMY_CREDENTIALS)
+        responses.add(responses.POST, client.endpoint_url + '/services/2/transactions', status=200,
+                      json={'transactionId': '1'})
+
+        with self.assertLogs('tests.redaction', level='INFO') as logs:
+            client.request('POST', '/services/2/transactions', {
+                'amount': '10.00',
+                'creditCard': {'cardNumber': '4111111111111111', 'securityCode': '123'},
+            })
+
+        request = logs.output[0]
+        self.assertIn('"cardNumber":"****1111"', request)
+        self.assertNotIn('4111111111111111', request)
+        self.assertNotIn('"123"', request)
+        self.assertIn('Authorization: ****', request)
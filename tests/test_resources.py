@@ -6,7 +6,8 @@ from mock import MagicMock
 
 from bluesnap import client, exceptions
 from bluesnap.models import ContactInfo, PlainCreditCard, CreditCardSelection, EncryptedCreditCard
-from bluesnap.resources import OrderResource, ShopperResource
+from bluesnap.resources import DictableObject, Level3Data, Level3DataItem, OrderResource, ShippingContactInfo, \
+    ShopperResource, TransactionFraudInfo, VaultedShopperInfo
 from . import helper
 from . import mocked_api
 
@@ -259,7 +260,8 @@ class ShopperTestCase(TestCase):
         shopper.find_by_shopper_id.assert_called_once_with(
             '{seller_shopper_id},{seller_id}'.format(
                 seller_shopper_id=seller_shopper_id,
-                seller_id=seller_id))
+                seller_id=seller_id),
+            deadline=None)
 
     @responses.activate
     def test_find_by_bogus_shopper_id_and_seller_shopper_id_raises_exception(self):
@@ -880,3 +882,52 @@ class OrderTestCase(TestCase):
                     card_last_four_digits=helper.DUMMY_CARD_AMEX['card_number'][-4:]))
         self.assertEqual(e.exception.description,
                          'The order failed because shopper payment details were incorrect or insufficient.')
+
+
+class DictableObjectTestCase(TestCase):
+    def test_to_dict(self):
+        shipping = ShippingContactInfo(firstName='Jane', lastName='Doe', address1='1 Main Street', city='London',
+                                       zip_='SW1A 1AA', country='gb', state='')
+        vaultedShopper = VaultedShopperInfo(firstName='Jane', lastName='Doe', email='jane.doe@example.com',
+                                            shippingContactInfo=shipping,
+                                            transactionFraudInfo=TransactionFraudInfo(fraudSessionId='1'))
+
+        self.assertEqual(list(vaultedShopper.toDict().items()), [
+            ('firstName', 'Jane'),
+            ('lastName', 'Doe'),
+            ('email', 'jane.doe@example.com'),
+            ('shippingContactInfo', {'firstName': 'Jane', 'lastName': 'Doe', 'address1': '1 Main Street',
+                                     'city': 'London', 'zip': 'SW1A 1AA', 'country': 'gb'}),
+            ('transactionFraudInfo', {'fraudSessionId': '1'}),
+        ])
+
+    def test_to_dict_lists(self):
+        level3Data = Level3Data(taxRate='20', level3DataItems=[Level3DataItem(unitCost='1.00', itemQuantity='2')])
+        self.assertEqual(level3Data.toDict(), {'taxRate': '20',
+                                               'level3DataItems': [{'itemQuantity': '2', 'unitCost': '1.00'}]})
+        self.assertEqual(Level3Data().toDict(), {})
+
+    def test_slots(self):
+        item = Level3DataItem()
+        self.assertFalse(hasattr(item, '__dict__'))
+        with self.assertRaises(AttributeError):
+            item.unknownField = 1
+
+    def test_generated_for_subclasses(self):
+        class Discount(DictableObject):
+            _requiredFields = ('code',)
+            _optionalFields = ('amount',)
+            __slots__ = _requiredFields + _optionalFields
+
+            def __init__(self, code, amount=None):
+                super(Discount, self).__init__()
+                self.code = code
+                self.amount = amount
+
+        class CustomDiscount(Discount):
+            def toDict(self):
+                return {'custom': True}
+
+        self.assertEqual(Discount(None).toDict(), {'code': None})
+        self.assertEqual(Discount('A', '1.00').toDict(), {'code': 'A', 'amount': '1.00'})
+        self.assertEqual(CustomDiscount('A').toDict(), {'custom': True})
@@ -0,0 +1,129 @@
+import json
+import logging
+from unittest import TestCase
+
+import requests
+import responses
+
+from bluesnap import exceptions
+from bluesnap.client import Client
+from bluesnap.resources import TransactionResource
+from bluesnap.retry import RetryPolicy
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class RetryPolicyTestCase(TestCase):
+    def test_backoff_is_exponential_and_capped(self):
+        policy = RetryPolicy(backoff_base=0.1, backoff_max=0.5, jitter=False)
+
+        self.assertEqual([policy.backoff(attempt) for attempt in (1, 2, 3, 4)], [0.1, 0.2, 0.4, 0.5])
+
+    def test_backoff_jitter(self):
+        policy = RetryPolicy(backoff_base=1, jitter=True, random=lambda: 0.25)
+
+        self.assertEqual(policy.backoff(3), 1.0)
+
+    def test_idempotency(self):
+        policy = RetryPolicy()
+
+        self.assertTrue(policy.is_idempotent('GET', None))
+        self.assertFalse(policy.is_idempotent('POST', {'cardTransactionType': 'AUTH_CAPTURE'}))
+        self.assertTrue(policy.is_idempotent('POST', {'cardTransactionType': 'AUTH_CAPTURE',
+                                                      'merchantTransactionId': 'order-1'}))
+
+    def test_generate_merchant_transaction_id(self):
+        data = {'cardTransactionType': 'AUTH_CAPTURE'}
+
+        self.assertIs(RetryPolicy().prepare_data('POST', '/services/2/transactions', data), data)
+
+        prepared = RetryPolicy(generate_merchant_transaction_id=True).prepare_data(
+            'POST', '/services/2/transactions', data)
+        self.assertTrue(prepared['merchantTransactionId'])
+        self.assertNotIn('merchantTransactionId', data)
+
+        capture = {'cardTransactionType': 'CAPTURE', 'transactionId': '1'}
+        self.assertIs(RetryPolicy(generate_merchant_transaction_id=True).prepare_data(
+            'POST', '/services/2/transactions', capture), capture)
+
+    def test_connect_errors_are_retried_for_any_request(self):
+        policy = RetryPolicy(jitter=False)
+
+        self.assertIsNotNone(policy.retry_delay(1, idempotent=False, error=requests.ConnectTimeout()))
+        self.assertIsNone(policy.retry_delay(1, idempotent=False, error=requests.ReadTimeout()))
+        self.assertIsNotNone(policy.retry_delay(1, idempotent=True, error=requests.ReadTimeout()))
+        self.assertIsNone(policy.retry_delay(1, idempotent=True, error=ValueError()))
+        self.assertIsNone(policy.retry_delay(3, idempotent=True, error=requests.ReadTimeout()))
+
+
+class ClientRetryTestCase(TestCase):
+    def setUp(self):
+        self.sleeps = []
+        self.policy = RetryPolicy(max_attempts=3, jitter=False, sleep=self.sleeps.append)
+        self.client = Client(env='live', retry_policy=self.policy, **DUMMY_CREDENTIALS)
+        self.url = self.client.endpoint_url + '/services/2/transactions'
+
+    @responses.activate
+    def test_get_is_retried_on_server_error(self):
+        responses.add(responses.GET, self.url + '/1', status=503, body='')
+        responses.add(responses.GET, self.url + '/1', status=200, content_type='application/xml',
+                      body='<card-transaction><transaction-id>1</transaction-id></card-transaction>')
+
+        with self.assertLogs('tests.retry', level='INFO') as logs:
+            self.client.logger = logging.getLogger('tests.retry')
+            transaction = TransactionResource(client=self.client).retrieve('1')
+
+        self.assertEqual(transaction, {'transaction-id': '1'})
+        self.assertEqual(len(responses.calls), 2)
+        self.assertEqual(self.sleeps, [0.1])
+        self.assertTrue(any('attempt 1 took' in line and 'retrying in 0.100s' in line for line in logs.output))
+        self.assertTrue(any('attempt 2 took' in line for line in logs.output))
+
+    @responses.activate
+    def test_get_is_retried_on_connection_error(self):
+        responses.add(responses.GET, self.url + '/1', body=requests.ConnectionError('Connection reset by peer'))
+        responses.add(responses.GET, self.url + '/1', status=200, content_type='application/xml',
+                      body='<card-transaction><transaction-id>1</transaction-id></card-transaction>')
+
+        TransactionResource(client=self.client).retrieve('1')
+
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_post_without_merchant_transaction_id_is_not_retried(self):
+        responses.add(responses.POST, self.url, status=503, content_type='application/json',
+                      json={'message': [{'code': '90001', 'description': 'Unavailable'}]})
+
+        with self.assertRaises(exceptions.APIError):
+            TransactionResource(client=self.client).authCapture(amount='1', currency='USD', vaultedShopperId='1')
+
+        self.assertEqual(len(responses.calls), 1)
+
+    @responses.activate
+    def test_post_with_generated_merchant_transaction_id_is_retried(self):
+        self.policy.generate_merchant_transaction_id = True
+        responses.add(responses.POST, self.url, status=502, body='')
+        responses.add(responses.POST, self.url, status=200, json={'transactionId': '1'})
+
+        TransactionResource(client=self.client).authCapture(amount='1', currency='USD', vaultedShopperId='1')
+
+        self.assertEqual(len(responses.calls), 2)
+        sent = [json.loads(call.request.body)['merchantTransactionId'] for call in responses.calls]
+        self.assertEqual(sent[0], sent[1])
+
+    @responses.activate
+    def test_gives_up_after_max_attempts(self):
+        responses.add(responses.GET, self.url + '/1', status=500, body='')
+
+        with self.assertRaises(exceptions.APIError) as cm:
+            TransactionResource(client=self.client).retrieve('1')
+
+        self.assertEqual(cm.exception.status_code, 500)
+        self.assertEqual(len(responses.calls), 3)
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import responses
+
+from bluesnap import exceptions
+from bluesnap.client import Client
+from bluesnap.deadline import Deadline
+from bluesnap.resources import VaultedShopperResource
+from bluesnap.singleflight import AsyncSingleFlight, SingleFlight
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class SingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.single_flight = SingleFlight()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow_call(self):
+        self.calls += 1
+        self.release.wait(1)
+        return 'response', {'items': [1, 2]}
+
+    def test_concurrent_callers_share_one_call(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(self.single_flight.do, ('GET', '/a'), self.slow_call, Deadline())
+                       for _ in range(4)]
+            time.sleep(0.05)
+            self.release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual((self.single_flight.requests, self.single_flight.coalesced), (1, 3))
+        self.assertTrue(all(result == ('response', {'items': [1, 2]}) for result in results))
+        self.assertEqual(len({id(body['items']) for _, body in results}), 4)
+
+    def test_errors_are_shared(self):
+        def failing_call():
+            self.release.wait(1)
+            raise exceptions.APIError(description='Unavailable', status_code=503)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(self.single_flight.do, ('GET', '/a'), failing_call, Deadline())
+                       for _ in range(2)]
+            time.sleep(0.05)
+            self.release.set()
+
+            for future in futures:
+                with self.assertRaises(exceptions.APIError):
+                    future.result()
+
+    def test_waiting_is_bounded_by_deadline(self):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            leader = executor.submit(self.single_flight.do, ('GET', '/a'), self.slow_call, Deadline())
+            time.sleep(0.05)
+
+            with self.assertRaises(exceptions.DeadlineExceededError):
+                self.single_flight.do(('GET', '/a'), self.slow_call, Deadline(0.05))
+
+            self.release.set()
+            leader.result()
+
+        self.assertEqual(self.calls, 1)
+
+    def test_leader_deadline_is_not_shared(self):
+        def leader_call():
+            self.release.wait(1)
+            raise Deadline(0.01).exceeded(reason='read timed out')
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            leader = executor.submit(self.single_flight.do, ('GET', '/a'), leader_call, Deadline())
+            time.sleep(0.05)
+            follower = executor.submit(self.single_flight.do, ('GET', '/a'), self.slow_call, Deadline(5))
+            time.sleep(0.05)
+            self.release.set()
+
+            with self.assertRaises(exceptions.DeadlineExceededError):
+                leader.result()
+            # The follower made the request again, as the leader
+            self.assertEqual(follower.result(), ('response', {'items': [1, 2]}))
+
+        self.assertEqual((self.single_flight.requests, self.single_flight.coalesced), (2, 1))
+
+    def test_sequential_calls_are_not_coalesced(self):
+        self.release.set()
+        self.single_flight.do(('GET', '/a'), self.slow_call, Deadline())
+        self.single_flight.do(('GET', '/a'), self.slow_call, Deadline())
+
+        self.assertEqual(self.calls, 2)
+
+
+class AsyncSingleFlightTestCase(IsolatedAsyncioTestCase):
+    async def test_leader_deadline_is_not_shared(self):
+        single_flight = AsyncSingleFlight()
+
+        async def leader_call():
+            await asyncio.sleep(0.05)
+            raise Deadline(0.01).exceeded(reason='read timed out')
+
+        async def follower_call():
+            return 'response', {'items': [1, 2]}
+
+        leader = asyncio.ensure_future(single_flight.do(('GET', '/a'), leader_call, Deadline()))
+        await asyncio.sleep(0)
+
+        self.assertEqual(await single_flight.do(('GET', '/a'), follower_call, Deadline(5)),
+                         ('response', {'items': [1, 2]}))
+        with self.assertRaises(exceptions.DeadlineExceededError):
+            await leader
+        self.assertEqual((single_flight.requests, single_flight.coalesced), (2, 1))
+
+
+class ClientSingleFlightTestCase(TestCase):
+    def setUp(self):
+        self.client = Client(env='live', coalesce_requests=True, **DUMMY_CREDENTIALS)
+        self.url = self.client.endpoint_url + '/services/2/vaulted-shoppers/42'
+
+    def tearDown(self):
+        self.client.close()
+
+    @staticmethod
+    def _slow_vaulted_shopper(request):
+        time.sleep(0.1)
+        return 200, {'content-type': 'application/xml'}, \
+            '<vaulted-shopper><vaulted-shopper-id>42</vaulted-shopper-id></vaulted-shopper>'
+
+    @responses.activate
+    def test_concurrent_retrieves_are_coalesced(self):
+        responses.add_callback(responses.GET, self.url, callback=self._slow_vaulted_shopper)
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            shoppers = list(executor.map(
+                lambda _: VaultedShopperResource(client=self.client).retrieve('42'), range(5)))
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(shoppers, [{'vaulted-shopper-id': '42'}] * 5)
+
+        shoppers[0]['vaulted-shopper-id'] = 'changed'
+        self.assertEqual(shoppers[1]['vaulted-shopper-id'], '42')
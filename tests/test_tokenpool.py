@@ -0,0 +1,117 @@
+import threading
+import time
+from unittest import TestCase
+
+from bluesnap.client import Client
+from bluesnap.tokenpool import PaymentFieldsTokenPool
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class FakeResource(object):
+    """
+    Stands in for PaymentFieldsTokenResource, creating numbered tokens
+    """
+
+    def __init__(self, client, delay=0.0, error=None):
+        self.client = client
+        self.delay = delay
+        self.error = error
+        self.created = 0
+        self.lock = threading.Lock()
+
+    def create(self, shopperId=None, deadline=None):
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        with self.lock:
+            self.created += 1
+            return 'token-%d' % self.created
+
+
+def _wait_for(condition, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > end:
+            raise AssertionError('timed out')
+        time.sleep(0.005)
+
+
+class PaymentFieldsTokenPoolTestCase(TestCase):
+    def setUp(self):
+        self.client = Client(env='live', **DUMMY_CREDENTIALS)
+
+    def _pool(self, resource=None, **kwargs):
+        pool = PaymentFieldsTokenPool(client=self.client, **kwargs)
+        pool.resource = resource or FakeResource(self.client)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_fills_in_background(self):
+        pool = self._pool(size=3)
+        pool.start()
+        _wait_for(lambda: len(pool) == 3)
+
+        self.assertEqual(pool.get(), 'token-1')
+        self.assertEqual(pool.stats()['hits'], 1)
+
+    def test_refills_below_low_water_mark(self):
+        pool = self._pool(size=4, low_water_mark=2)
+        pool.start()
+        _wait_for(lambda: len(pool) == 4)
+
+        pool.get()
+        pool.get()
+        time.sleep(0.05)
+        self.assertEqual(pool.resource.created, 4)
+
+        pool.get()
+        _wait_for(lambda: len(pool) == 4)
+        self.assertEqual(pool.resource.created, 7)
+
+    def test_tokens_are_evicted_before_expiry(self):
+        pool = self._pool(size=2, max_age=0.1)
+        pool.start()
+        _wait_for(lambda: pool.resource.created >= 4)
+
+        self.assertNotIn(pool.get(), ('token-1', 'token-2'))
+        self.assertGreaterEqual(pool.stats()['evictions'], 2)
+
+    def test_creates_token_when_empty(self):
+        pool = self._pool(FakeResource(self.client, delay=0.1), size=2)
+
+        self.assertTrue(pool.get().startswith('token-'))
+        self.assertEqual(pool.stats()['misses'], 1)
+
+    def test_fetch_errors_are_counted(self):
+        pool = self._pool(FakeResource(self.client, error=ValueError('unavailable')), size=2, retry_interval=0.01)
+        pool.start()
+        _wait_for(lambda: pool.stats()['errors'] >= 2)
+
+        with self.assertRaises(ValueError):
+            pool.get()
+
+    def test_close_does_not_wait_for_a_slow_creation(self):
+        resource = FakeResource(self.client, delay=0.5)
+        pool = self._pool(resource, size=2)
+        pool.start()
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        self.assertFalse(pool.close(timeout=0.05))
+        self.assertLess(time.monotonic() - started, 0.3)
+
+        # The token being created is discarded, and no other one is
+        self.assertTrue(pool.close(timeout=None))
+        self.assertEqual((resource.created, len(pool)), (1, 0))
+
+    def test_invalid_low_water_mark(self):
+        with self.assertRaises(ValueError):
+            PaymentFieldsTokenPool(size=2, low_water_mark=3, client=self.client)
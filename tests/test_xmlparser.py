@@ -0,0 +1,95 @@
+from unittest import TestCase
+
+import responses
+
+from bluesnap import exceptions
+from bluesnap.client import Client
+from bluesnap.xmlparser import LxmlXMLParser, XMLParseError, XmltodictXMLParser
+from .mocked_api import mock_responses
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+DOCUMENTS = list(mock_responses.values()) + [
+    '<a/>',
+    '<a> </a>',
+    '<a x="1"/>',
+    '<a x="1">text</a>',
+    '<a>text<b/>more<c>1</c> tail </a>',
+    '<a>text<b/> <c/>more</a>',
+    '<a> <b/> text <c/> </a>',
+    '<a><b>1</b><b>2</b><c/><b>3</b></a>',
+    '<a xmlns="urn:a" xmlns:x="urn:x"><x:b x:y="1">q</x:b><c xmlns="urn:c"><d/></c></a>',
+    '<?xml version="1.0" encoding="ISO-8859-1"?><a>\xe9t\xe9</a>'.encode('latin-1'),
+    '<a xml:lang="en"><!-- comment --><b>&amp;&#65;</b><?pi x?></a>',
+    '<shopper xmlns="http://ws.plimus.com"><shopper-info><shopper-id>1</shopper-id><payment-info>'
+    '<credit-cards-info><credit-card-info><credit-card><card-last-four-digits>1111</card-last-four-digits>'
+    '</credit-card></credit-card-info><credit-card-info><credit-card><card-last-four-digits>2222'
+    '</card-last-four-digits></credit-card></credit-card-info></credit-cards-info></payment-info></shopper-info>'
+    '</shopper>',
+]
+
+
+class XMLParserTestCase(TestCase):
+    def test_lxml_parser_matches_xmltodict(self):
+        for document in DOCUMENTS:
+            with self.subTest(document=document):
+                self.assertEqual(LxmlXMLParser().parse(document), XmltodictXMLParser().parse(document))
+
+    def test_names_are_not_shared_between_prefixed_documents(self):
+        parser = LxmlXMLParser()
+
+        self.assertEqual(parser.parse('<a xmlns="urn:x"><b/></a>'), {'a': {'@xmlns': 'urn:x', 'b': None}})
+        self.assertEqual(parser.parse('<x:a xmlns:x="urn:x"><x:b/></x:a>'), {'x:a': {'@xmlns:x': 'urn:x', 'x:b': None}})
+
+    def test_shape(self):
+        self.assertEqual(
+            LxmlXMLParser().parse(b'<a xmlns="urn:a" x="1"><b>1</b><b>2</b><c/>text</a>'),
+            {'a': {'@xmlns': 'urn:a', '@x': '1', 'b': ['1', '2'], 'c': None, '#text': 'text'}})
+
+    def test_malformed_documents(self):
+        for parser in (LxmlXMLParser(), XmltodictXMLParser()):
+            with self.subTest(parser=parser):
+                with self.assertRaises(XMLParseError):
+                    parser.parse(b'Internal Server Error')
+
+    def test_external_entities_are_not_resolved(self):
+        document = b'<!DOCTYPE a [<!ENTITY e SYSTEM "file:///etc/passwd">]><a>&e;</a>'
+
+        self.assertEqual(LxmlXMLParser().parse(document), {'a': None})
+
+
+class ClientXMLParserTestCase(TestCase):
+    @responses.activate
+    def test_custom_parser(self):
+        class RecordingParser(LxmlXMLParser):
+            def parse(self, content):
+                self.content = content
+                return super(RecordingParser, self).parse(content)
+
+        parser = RecordingParser()
+        client = Client(env='live', xml_parser=parser, **DUMMY_CREDENTIALS)
+        responses.add(responses.GET, client.endpoint_url + '/services/2/shoppers/1', status=200,
+                      content_type='application/xml', body='<shopper><shopper-info/></shopper>')
+
+        _, body = client.request('GET', '/services/2/shoppers/1')
+
+        self.assertEqual(body, {'shopper': {'shopper-info': None}})
+        self.assertIsInstance(parser.content, bytes)
+
+    @responses.activate
+    def test_text_response_is_an_api_error(self):
+        client = Client(env='live', **DUMMY_CREDENTIALS)
+        responses.add(responses.GET, client.endpoint_url + '/services/2/shoppers/1', status=503,
+                      body='Service Unavailable')
+
+        with self.assertRaises(exceptions.APIError) as cm:
+            client.request('GET', '/services/2/shoppers/1')
+
+        self.assertEqual(cm.exception.description, 'Service Unavailable')
@@ -0,0 +1,93 @@
+from unittest import TestCase
+
+from lxml import etree
+
+from bluesnap import models
+from bluesnap.client import Client
+from bluesnap.resources import OrderResource
+from bluesnap.xmltemplate import XMLTemplate, escape, placeholder
+
+
+DUMMY_CREDENTIALS = {
+    'username': 'username',
+    'password': 'password',
+    'default_store_id': '1',
+    'seller_id': '1',
+    'default_currency': 'GBP'
+}
+
+
+class BuildingOrderResource(OrderResource):
+    def _call(self, method, path, data=None, result=None, deadline=None):
+        return data
+
+
+class XMLTemplateTestCase(TestCase):
+    def test_escape(self):
+        self.assertEqual(escape('é&<>\r\n"\''), b'&#233;&amp;&lt;&gt;&#13;\n"\'')
+        self.assertIsNone(escape('\x00'))
+        self.assertIsNone(escape('\ud800'))
+        self.assertIsNone(escape(1))
+
+    def test_render(self):
+        element = etree.Element('a')
+        etree.SubElement(element, 'b').text = placeholder('value')
+        etree.SubElement(element, 'c').text = placeholder('other_value')
+        template = XMLTemplate(element)
+
+        self.assertEqual(template.fields, ('value', 'other_value'))
+        self.assertEqual(template.render({'value': 'x & y', 'other_value': ''}), b'<a><b>x &amp; y</b><c></c></a>')
+        self.assertIsNone(template.render({'value': None, 'other_value': ''}))
+
+
+class OrderTemplateTestCase(TestCase):
+    VALUES = ['Example order', 'a & b <c> d', 'Crème brûlée \U0001f600', ' spaces\tand\r\nnewlines ', '"\'', '']
+
+    def setUp(self):
+        self.client = Client(env='live', **DUMMY_CREDENTIALS)
+        self.template = BuildingOrderResource(client=self.client)
+        self.tree = BuildingOrderResource(client=self.client)
+        self.tree.use_template = False
+
+    def assertSameDocument(self, *args, **kwargs):
+        document = self.template.create(*args, **kwargs)
+        self.assertEqual(document, self.tree.create(*args, **kwargs))
+        return document
+
+    def test_documents_are_identical(self):
+        for value in self.VALUES:
+            with self.subTest(value=value):
+                credit_card = models.CreditCardSelection(value, value, client=self.client)
+                self.assertSameDocument(value, value, 1250, credit_card=credit_card, description=value,
+                                        client_ip=value)
+                self.assertSameDocument(value, 2152762, 99, description=value)
+                self.assertSameDocument(19575974, value, 100000, credit_card=credit_card, client_ip=value)
+                self.assertSameDocument(19575974, 2152762, 1)
+
+    def test_template_is_used(self):
+        credit_card = models.CreditCardSelection('VISA', '1111', client=self.client)
+        document = self.assertSameDocument(19575974, 2152762, 1250, credit_card=credit_card, description='d')
+
+        self.assertIn((self.client.NAMESPACE, True, True), OrderResource._templates)
+        self.assertIn(b'<amount>12.50</amount>', document)
+
+    def test_invalid_values_fail_as_the_tree_builder_does(self):
+        for value in ('\x00', '\ud800'):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    self.template.create(19575974, 2152762, 1250, description=value)
+
+        credit_card = models.CreditCardSelection('VISA', 1111, client=self.client)
+        with self.assertRaises(TypeError):
+            self.template.create(19575974, 2152762, 1250, credit_card=credit_card)
+
+    def test_credit_card_subclasses_use_the_tree_builder(self):
+        class CustomCreditCard(models.CreditCardSelection):
+            def to_xml(self):
+                element = super(CustomCreditCard, self).to_xml()
+                element.append(self.client.tags['custom']('value'))
+                return element
+
+        credit_card = CustomCreditCard('VISA', '1111', client=self.client)
+        document = self.assertSameDocument(19575974, 2152762, 1250, credit_card=credit_card)
+        self.assertIn(b'<custom>value</custom>', document)